@@ -67,6 +67,7 @@ setup(
     url='http://code.google.com/p/simpleubjson/',
 
     install_requires=[],
+    extras_require={'numpy': ['numpy']},
     test_suite='simpleubjson.tests',
     zip_safe=True,
 
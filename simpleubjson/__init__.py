@@ -17,50 +17,231 @@ EOS_O = type('EndOfObjectStream', (_EOS,), {'__slots__': ()})()
 del _EOS
 
 import warnings
+from types import GeneratorType
 from .version import __version__
-from .draft8 import Draft8Decoder, Draft8Encoder
-from .draft9 import Draft9Decoder, Draft9Encoder
+from .draft8 import (
+    Draft8Decoder, Draft8BufferDecoder, Draft8Encoder, Draft8BufferEncoder
+)
+from .draft9 import (
+    Draft9Decoder, Draft9BufferDecoder, Draft9Encoder, Draft9BufferEncoder
+)
+from .reader import ChunkedReader, map_file, unmap_file
+from .cache import InternCache
+from .codec import Codec, get_spec
+from .parser import Parser
+from .query import extract, iter_items
 from .tools.inspect import pprint
+from .compat import bytes
 from .exceptions import DecodeError, EncodeError
 
-__all__ = ['decode', 'encode', 'pprint', 'NOOP', 'DecodeError', 'EncodeError',
-           '__version__']
-
-_draft8_decoder = Draft8Decoder
-_draft8_encoder = Draft8Encoder
-
-_draft9_decoder = Draft9Decoder
-_draft9_encoder = Draft9Encoder
+__all__ = ['decode', 'iter_decode', 'decode_file', 'iter_decode_file',
+           'iter_events', 'extract', 'iter_items', 'encode', 'pprint', 'NOOP',
+           'DecodeError', 'EncodeError', 'ChunkedReader', 'InternCache',
+           'Codec', 'Parser', '__version__']
 
 warnings.simplefilter('once')
-_DRAFT8_DEPRECATED = ('Draft-8 specification is too old and deprecated.'
-                      ' Please upgrade your data to fit Draft-9 spec.')
 
 
-def decode(data, allow_noop=False, spec='draft9'):
+def decode(data, allow_noop=False, spec='draft9', **options):
     """Decodes input stream of UBJSON data to Python object.
 
-    :param data: `.read([size])`-able object or source string.
+    :param data: `.read([size])`-able object, source string or any object that
+                 supports buffer protocol. In the last case data is decoded
+                 directly from the buffer without copying.
     :param allow_noop: Allow to emit :const:`~simpleubjson.NOOP` values for
                        unsized arrays and objects.
     :type allow_noop: bool
-    :param spec: UBJSON specification. Supported Draft-8 and Draft-9
-                 specifications by ``draft-8`` or ``draft-9`` keys.
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
     :type spec: str
+    :param options: Additional decoder options. See decoder of specified
+                    specification for the list of supported ones.
 
     :return: Decoded Python object. See mapping table below.
     """
+    stream_decoder, buffer_decoder, _ = get_spec(spec)
+    if hasattr(data, 'read'):
+        return stream_decoder(data, allow_noop, **options).decode_next()
+    return buffer_decoder(data, allow_noop, **options).decode_next()
+
+
+def iter_decode(data, allow_noop=False, spec='draft9', offsets=False,
+                **options):
+    """Iterates over UBJSON values that are written one after another into
+    the same stream or buffer::
+
+        >>> for offset, record in iter_decode(open('records.ubj', 'rb'),
+        ...                                   offsets=True):
+        ...     print(offset, record)
+
+    Stream sources are read by big chunks through
+    :class:`~simpleubjson.ChunkedReader`, so only the current value is kept
+    in memory. Iteration stops when data ends exactly between values, while
+    truncated value raises
+    :exc:`~simpleubjson.exceptions.EarlyEndOfStreamError`.
+    Containers are always materialized, because the next value could not be
+    decoded until the previous one is read till the end.
+
+    :param data: `.read([size])`-able object, source string or any object that
+                 supports buffer protocol.
+    :param allow_noop: Allow to emit :const:`~simpleubjson.NOOP` values.
+    :type allow_noop: bool
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+    :param offsets: Yield ``(offset, value)`` pairs where offset is position
+                    in bytes from the start of the source where decoding of
+                    the value begins, including skipped `NoOp` markers.
+    :type offsets: bool
+    :param options: Additional decoder options. Draft-9 decoder uses
+                    ``eager`` container mode by default. Object keys are
+                    cached unless ``string_cache=None`` is passed.
 
-    if spec.lower() in ['draft8', 'draft-8']:
-        warnings.warn(_DRAFT8_DEPRECATED, DeprecationWarning)
-        return _draft8_decoder(data, allow_noop).decode_next()
-    elif spec.lower() in ['draft9', 'draft-9']:
-        return _draft9_decoder(data, allow_noop).decode_next()
+    :return: Generator of decoded Python objects.
+    """
+    stream_decoder, buffer_decoder, _ = get_spec(spec)
+    if issubclass(stream_decoder, Draft9Decoder):
+        options.setdefault('container', 'eager')
+    # Keys of many values are decoded by the same decoder
+    options.setdefault('string_cache', True)
+    if hasattr(data, 'read'):
+        if not isinstance(data, ChunkedReader):
+            data = ChunkedReader(data)
+        decoder = stream_decoder(data, allow_noop, **options)
+        tell = data.tell
     else:
-        raise ValueError('Unknown or unsupported specification %s' % spec)
+        decoder = buffer_decoder(data, allow_noop, **options)
+        tell = decoder.tell
+    offset = tell()
+    for value in decoder:
+        if isinstance(value, GeneratorType):
+            value = list(value)
+        if offsets:
+            yield offset, value
+            offset = tell()
+        else:
+            yield value
+
+
+def decode_file(path, allow_noop=False, spec='draft9', mmap=True, **options):
+    """Decodes UBJSON value from the file.
+
+    By default file is memory-mapped and decoded directly from the mapping,
+    so its data is never copied into the process memory and is served by
+    OS page cache that is shared between processes. Otherwise file is read by
+    big chunks. Containers are always materialized.
+
+    :param path: Path to the file.
+    :type path: str
+    :param allow_noop: Allow to emit :const:`~simpleubjson.NOOP` values.
+    :type allow_noop: bool
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+    :param mmap: Decode file from memory map.
+    :type mmap: bool
+    :param options: Additional decoder options. Draft-9 decoder uses
+                    ``eager`` container mode by default. ``lazy`` mode keeps
+                    mapping open while lazy containers are alive.
+
+    :return: Decoded Python object.
+    """
+    stream_decoder, buffer_decoder, _ = get_spec(spec)
+    if issubclass(stream_decoder, Draft9Decoder):
+        options.setdefault('container', 'eager')
+    with open(path, 'rb') as fobj:
+        if not mmap:
+            decoder = stream_decoder(ChunkedReader(fobj), allow_noop,
+                                     **options)
+            value = decoder.decode_next()
+            if isinstance(value, GeneratorType):
+                value = list(value)
+            return value
+        data = map_file(fobj)
+        try:
+            decoder = buffer_decoder(data, allow_noop, **options)
+            value = decoder.decode_next()
+            if isinstance(value, GeneratorType):
+                value = list(value)
+            # Release the mapping view to let it be closed
+            decoder.reset(bytes())
+            return value
+        finally:
+            decoder = None
+            unmap_file(data)
+
+
+def iter_decode_file(path, allow_noop=False, spec='draft9', offsets=False,
+                     mmap=True, **options):
+    """Iterates over UBJSON values written one after another into the file.
+    See :func:`iter_decode` and :func:`decode_file` for details.
+
+    File is closed when iteration is over or generator is closed.
+
+    :param path: Path to the file.
+    :type path: str
+    :param mmap: Decode file from memory map.
+    :type mmap: bool
+
+    :return: Generator of decoded Python objects.
+    """
+    with open(path, 'rb') as fobj:
+        if not mmap:
+            for value in iter_decode(fobj, allow_noop, spec, offsets,
+                                     **options):
+                yield value
+            return
+        data = map_file(fobj)
+        values = iter_decode(data, allow_noop, spec, offsets, **options)
+        try:
+            for value in values:
+                yield value
+        finally:
+            # Closed generator releases decoder and its view of the mapping
+            values.close()
+            values = None
+            unmap_file(data)
+
+
+def iter_events(data, allow_noop=False, spec='draft9'):
+    """Iterates over parsing events of UBJSON data without building Python
+    containers, so data of any size could be filtered or inspected within
+    constant memory::
 
+        >>> for event, value, offset in iter_events(b'{Si\\x03fooi\\x2a}'):
+        ...     print(event, value, offset)
+        start_object None 0
+        key foo 1
+        value 42 6
+        end_object None 8
 
-def encode(data, output=None, default=None, spec='draft-9'):
+    Events of all values which are written one after another are emitted.
+    See :meth:`~simpleubjson.draft9.Draft9Decoder.iter_events` for the list
+    of events.
+
+    :param data: `.read([size])`-able object, source string or any object that
+                 supports buffer protocol.
+    :param allow_noop: Allow to emit :const:`~simpleubjson.NOOP` values.
+    :type allow_noop: bool
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+
+    :return: Generator of ``(event, value, offset)`` tuples.
+    """
+    stream_decoder, buffer_decoder, _ = get_spec(spec)
+    if hasattr(data, 'read'):
+        if not isinstance(data, ChunkedReader):
+            data = ChunkedReader(data)
+        return stream_decoder(data, allow_noop).iter_events()
+    return buffer_decoder(data, allow_noop).iter_events()
+
+
+def encode(data, output=None, default=None, spec='draft-9', **options):
     """Encodes Python object to Universal Binary JSON data.
 
     :param data: Python object.
@@ -70,21 +251,19 @@ def encode(data, output=None, default=None, spec='draft-9'):
                     matched for Python data type.
                     Takes encodable value as single argument and must return
                     valid UBJSON encodable value.
-    :param spec: UBJSON specification. Supported Draft-8 and Draft-9
-                 specifications by ``draft-8`` or ``draft-9`` keys.
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
     :type spec: str
+    :param options: Additional encoder options. See encoder of specified
+                    specification for the list of supported ones.
 
     :return: Encoded Python object. See mapping table below.
              If `output` param is specified, all data would be written into it
              by chunks and None will be returned.
     """
-    if spec.lower() in ['draft8', 'draft-8']:
-        warnings.warn(_DRAFT8_DEPRECATED, DeprecationWarning)
-        res = _draft8_encoder(default).encode_next(data)
-    elif spec.lower() in ['draft9', 'draft-9']:
-        res = _draft9_encoder(default).encode_next(data)
-    else:
-        raise ValueError('Unknown or unsupported specification %s' % spec)
+    _, _, encoder = get_spec(spec)
+    res = encoder(default, **options).encode_next(data)
     if output:
         output.write(res)
     else:
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+"""Decoding and encoding UBJSON data over :mod:`asyncio` streams.
+
+This module requires Python 3.6+ and isn't imported by :mod:`simpleubjson`
+package automatically.
+"""
+
+from .codec import get_spec
+from .parser import Parser
+from .reader import DEFAULT_CHUNK_SIZE
+
+__all__ = ['iter_decode', 'encode']
+
+
+async def iter_decode(reader, allow_noop=False, spec='draft9',
+                      chunk_size=DEFAULT_CHUNK_SIZE, **options):
+    """Asynchronously iterates over UBJSON values read from
+    :class:`asyncio.StreamReader`::
+
+        >>> async for value in iter_decode(reader):
+        ...     print(value)
+
+    Data is read by chunks and decoded with :class:`~simpleubjson.Parser` as
+    soon as it arrives, so the event loop isn't blocked while waiting for the
+    rest of large values.
+
+    :param reader: :class:`asyncio.StreamReader` or any object with
+                   `.read(size)` coroutine.
+    :param allow_noop: Allow to emit :const:`~simpleubjson.NOOP` values.
+    :type allow_noop: bool
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+    :param chunk_size: Maximum amount of bytes to read at once.
+    :type chunk_size: int
+    :param options: Additional decoder options. See
+                    :class:`~simpleubjson.Parser` for details.
+    """
+    parser = Parser(spec, allow_noop, **options)
+    while True:
+        chunk = await reader.read(chunk_size)
+        if not chunk:
+            break
+        for value in parser.feed(chunk):
+            yield value
+    parser.close()
+
+
+async def encode(writer, data, default=None, spec='draft-9',
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+    """Encodes Python object and writes it to :class:`asyncio.StreamWriter`.
+
+    Top-level arrays and objects are encoded by chunks of about `chunk_size`
+    bytes, split between their items. After each chunk is written,
+    :meth:`~asyncio.StreamWriter.drain` is awaited, so slow clients don't
+    make whole data to be buffered.
+
+    :param writer: :class:`asyncio.StreamWriter` or any object with
+                   `.write(data)` method and `.drain()` coroutine.
+    :param data: Python object.
+    :param default: Callable object that would be used if there is no handlers
+                    matched for Python data type.
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+    :param chunk_size: Size of chunks to write in bytes.
+    :type chunk_size: int
+    """
+    _, _, encoder = get_spec(spec)
+    for chunk in encoder(default).iter_encode(data, chunk_size):
+        writer.write(chunk)
+        await writer.drain()
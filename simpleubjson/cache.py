@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+from collections import OrderedDict, namedtuple
+
+#: Default maximal amount of entries kept by caches.
+DEFAULT_CACHE_SIZE = 1024
+
+#: Cache statistics like :func:`functools.lru_cache` provides.
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+#: Maximal amount of keys of dict that encoders look up in shape cache.
+MAX_SHAPE_KEYS = 64
+
+__all__ = ['BoundedCache', 'InternCache', 'ShapeCache', 'ShapeTree',
+           'CacheInfo', 'DEFAULT_CACHE_SIZE', 'MAX_SHAPE_KEYS']
+
+
+class BoundedCache(object):
+    """Base class of caches that keep up to `maxsize` entries and count
+    their hits and misses. When cache is full, the oldest entry is dropped
+    to free space for the new one.
+
+    :param maxsize: Maximal amount of cached entries.
+    :type maxsize: int
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError('cache size should be positive, got %r'
+                             '' % maxsize)
+        self.maxsize = maxsize
+        #: Amount of entries found in the cache.
+        self.hits = 0
+        #: Amount of entries computed and put into the cache.
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _put(self, key, value):
+        entries = self._entries
+        if len(entries) >= self.maxsize:
+            entries.popitem(last=False)
+        entries[key] = value
+
+    def info(self):
+        """Returns cache statistics as :class:`CacheInfo` tuple."""
+        return CacheInfo(self.hits, self.misses, self.maxsize,
+                         len(self._entries))
+
+    def clear(self):
+        """Drops all cached entries and resets statistics."""
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+
+class InternCache(BoundedCache):
+    """Bounded cache of decoded strings keyed by their raw UTF-8 bytes.
+    Decoders use it for object keys, so records with the same keys share
+    the same key strings instead of decoding and allocating them again::
+
+        >>> cache = InternCache()
+        >>> codec = Codec(container='eager', string_cache=cache)
+        >>> records = [codec.loads(message) for message in messages]
+        >>> cache.info()
+        CacheInfo(hits=19980, misses=20, maxsize=1024, currsize=20)
+
+    Single cache could be shared by many decoders.
+
+    :param maxsize: Maximal amount of cached strings.
+    :type maxsize: int
+    """
+
+    def decode(self, data):
+        """Returns cached string for UTF-8 `data` bytes decoding and caching
+        it if there is no such."""
+        value = self._entries.get(data)
+        if value is None:
+            self.misses += 1
+            value = data.decode('utf-8')
+            self._put(data, value)
+        else:
+            self.hits += 1
+        return value
+
+
+class ShapeCache(BoundedCache):
+    """Bounded cache of encoded object keys by object shape: the tuple of
+    its keys in iteration order. Encoders use it for dicts, so records with
+    the same keys are written by joining precomputed keys data with their
+    encoded values::
+
+        >>> codec = Codec()
+        >>> messages = [codec.dumps(record) for record in records]
+        >>> codec.encoder.shapes.info()
+        CacheInfo(hits=9998, misses=2, maxsize=1024, currsize=1)
+
+    Shape is cached only when it's met the second time, so dicts with
+    unique keys sets don't pay for encoding and evicting their keys. Only
+    dicts with up to :const:`MAX_SHAPE_KEYS` keys are looked up.
+
+    :param maxsize: Maximal amount of cached shapes.
+    :type maxsize: int
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        super(ShapeCache, self).__init__(maxsize)
+        self._seen = set()
+
+    def encode(self, shape, encode_key):
+        """Returns tuple of encoded keys of `shape` tuple or ``None`` if the
+        shape is met the first time. Shapes met again are encoded by
+        `encode_key` callable for each key and cached."""
+        keys = self._entries.get(shape)
+        if keys is not None:
+            self.hits += 1
+            return keys
+        self.misses += 1
+        seen = self._seen
+        if shape not in seen:
+            if len(seen) >= self.maxsize:
+                seen.clear()
+            seen.add(shape)
+            return None
+        seen.discard(shape)
+        keys = tuple(map(encode_key, shape))
+        self._put(shape, keys)
+        return keys
+
+    def clear(self):
+        super(ShapeCache, self).clear()
+        self._seen.clear()
+
+
+class ShapeTree(object):
+    """Transitions tree of object shapes that decoders use to speculate
+    object keys. Each node is a shape reached by some sequence of keys and
+    remembers raw data of the key which followed it the last time, so for
+    objects with the same layout the decoder compares upcoming data with
+    the expected key by single slice comparison instead of parsing and
+    decoding it::
+
+        >>> codec = Codec(container='eager', shape_tree=True)
+        >>> records = [codec.loads(message) for message in messages]
+        >>> codec.buffer_decoder.shape_tree.info()
+        CacheInfo(hits=29997, misses=3, maxsize=1024, currsize=3)
+
+    Mismatched keys are parsed in regular way and become the expected ones.
+    Containers have own root shapes depending on where they are nested, so
+    objects met at different places don't break speculations of each other.
+    When the tree grows to `maxsize` shapes it's started over.
+
+    :param maxsize: Maximal amount of shapes.
+    :type maxsize: int
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError('tree size should be positive, got %r'
+                             '' % maxsize)
+        self.maxsize = maxsize
+        self.clear()
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def new_node():
+        # Expected key data, key value, next node, all known transitions and
+        # root node of containers nested at this place
+        return [None, None, None, {}, None]
+
+    def _grow(self):
+        if self._size >= self.maxsize:
+            self.root = self.new_node()
+            self._size = 0
+            return None
+        self._size += 1
+        return self.new_node()
+
+    def follow(self, node, data, key):
+        """Returns node that follows `node` by `key` which raw `data` is just
+        parsed and makes it the expected one. Returns ``None`` if the tree
+        is full."""
+        self.misses += 1
+        transitions = node[3]
+        child = transitions.get(data)
+        if child is None:
+            child = self._grow()
+            if child is None:
+                return None
+            transitions[data] = child
+        node[0] = data
+        node[1] = key
+        node[2] = child
+        return child
+
+    def nest(self, node):
+        """Returns root node of containers nested at `node` creating it if
+        there is no such. Returns ``None`` if the tree is full."""
+        if node[4] is None:
+            node[4] = self._grow()
+        return node[4]
+
+    def info(self):
+        """Returns tree statistics as :class:`CacheInfo` tuple."""
+        return CacheInfo(self.hits, self.misses, self.maxsize, self._size)
+
+    def clear(self):
+        """Drops all shapes and resets statistics."""
+        #: Shape of empty object.
+        self.root = self.new_node()
+        self._size = 0
+        #: Amount of keys matched with expected ones.
+        self.hits = 0
+        #: Amount of keys parsed in regular way.
+        self.misses = 0
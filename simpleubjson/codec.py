@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+import warnings
+from .cache import InternCache
+from .draft8 import Draft8Decoder, Draft8BufferDecoder, Draft8BufferEncoder
+from .draft9 import Draft9Decoder, Draft9BufferDecoder, Draft9BufferEncoder
+from .draft12 import Draft12Decoder, Draft12BufferDecoder, Draft12Encoder
+from .compat import bytes
+
+__all__ = ['Codec', 'SPECS', 'get_spec']
+
+#: Stream decoder, buffer decoder and encoder classes of each specification.
+SPECS = {
+    'draft8': (Draft8Decoder, Draft8BufferDecoder, Draft8BufferEncoder),
+    'draft9': (Draft9Decoder, Draft9BufferDecoder, Draft9BufferEncoder),
+    'draft12': (Draft12Decoder, Draft12BufferDecoder, Draft12Encoder),
+}
+SPECS['draft-8'] = SPECS['draft8']
+SPECS['draft-9'] = SPECS['draft9']
+SPECS['draft-12'] = SPECS['draft12']
+
+DRAFT8_DEPRECATED = ('Draft-8 specification is too old and deprecated.'
+                     ' Please upgrade your data to fit Draft-9 spec.')
+
+
+def get_spec(spec):
+    """Returns tuple of stream decoder, buffer decoder and encoder classes
+    for specification name like ``draft-9`` or ``draft9``."""
+    classes = SPECS.get(spec.lower())
+    if classes is None:
+        raise ValueError('Unknown or unsupported specification %s' % spec)
+    if classes is SPECS['draft8']:
+        warnings.warn(DRAFT8_DEPRECATED, DeprecationWarning)
+    return classes
+
+
+class Codec(object):
+    """Preconfigured pair of decoder and encoder which are reused for every
+    message, so specification is resolved and decoders are created only
+    once. Suitable for decoding and encoding a lot of small messages::
+
+        >>> codec = Codec(container='eager')
+        >>> codec.loads(codec.dumps({'foo': [1, 2, 3]}))
+        {'foo': [1, 2, 3]}
+
+    Since decoders are reused, containers that are decoded lazily as
+    generators should be consumed before the next :meth:`loads` call.
+
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+    :param allow_noop: Allow to emit :const:`~simpleubjson.NOOP` values for
+                       unsized arrays and objects.
+    :type allow_noop: bool
+    :param default: Callable object that would be used by encoder if there is
+                    no handlers matched for Python data type.
+    :param encoder_options: Additional encoder options like
+                            ``numeric_arrays`` or ``shape_cache``. See
+                            encoder of specified specification for the list
+                            of supported ones. Dicts keys are cached unless
+                            ``shape_cache=None`` is passed.
+    :type encoder_options: dict
+    :param options: Additional decoder options. See decoder of specified
+                    specification for the list of supported ones.
+    """
+
+    def __init__(self, spec='draft9', allow_noop=False, default=None,
+                 encoder_options=None, **options):
+        stream_decoder, buffer_decoder, encoder = get_spec(spec)
+        self.spec = spec
+        if options.get('string_cache', True) is True:
+            # Both decoders share the same keys cache
+            options['string_cache'] = InternCache()
+        try:
+            self.stream_decoder = stream_decoder(bytes(), allow_noop,
+                                                 **options)
+        except ValueError:
+            # Some container modes are supported only for buffer sources
+            self.stream_decoder = None
+        self.buffer_decoder = buffer_decoder(bytes(), allow_noop, **options)
+        encoder_options = dict(encoder_options or {})
+        # Keys of many messages are encoded by the same encoder
+        encoder_options.setdefault('shape_cache', True)
+        self.encoder = encoder(default, **encoder_options)
+
+    def loads(self, data):
+        """Decodes single value from `data` which is `.read([size])`-able
+        object, source string or any object that supports buffer protocol."""
+        if hasattr(data, 'read'):
+            decoder = self.stream_decoder
+            if decoder is None:
+                raise ValueError('Stream sources are not supported with'
+                                 ' specified decoder options')
+        else:
+            decoder = self.buffer_decoder
+        decoder.reset(data)
+        return decoder.decode_next()
+
+    def dumps(self, obj):
+        """Encodes Python object to UBJSON data."""
+        return self.encoder.encode_next(obj)
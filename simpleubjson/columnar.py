@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+"""Columnar encoding of lists of records with the same keys.
+
+Records are transposed into single object of per-field arrays, so each key
+is written once per batch instead of once per record and numeric fields are
+packed as typed arrays (Draft-12) or runs of values (Draft-9)::
+
+    >>> data = encode_columns([{'id': 1, 'value': 0.5},
+    ...                        {'id': 2, 'value': 1.5}])
+    >>> columns = decode_columns(data)
+    >>> columns['id']
+    array('b', [1, 2])
+    >>> rows = decode_columns(data, rows=True)
+    >>> rows[1]
+    {'id': 2, 'value': 1.5}
+
+Encoded data is regular UBJSON object, so it could be decoded by any other
+decoder as well.
+"""
+
+from array import array
+from operator import itemgetter
+from . import decode
+from .codec import get_spec
+from .compat import Sequence
+from .draft9 import (
+    Draft9Decoder, Draft9BufferEncoder, FLOAT, DOUBLE, _common_number_type
+)
+from .draft12 import Draft12Decoder, TYPECODES
+
+__all__ = ['Rows', 'decode_columns', 'encode_columns', 'to_columns']
+
+
+def to_columns(records):
+    """Transposes list of dicts with the same keys into dict of tuples of
+    their values. Keys order follows the first record. Raises
+    :exc:`ValueError` if records keys differ."""
+    if not records:
+        return {}
+    keys = list(records[0])
+    getter = itemgetter(*keys)
+    try:
+        rows = [getter(record) for record in records
+                if len(record) == len(keys)]
+    except KeyError as err:
+        raise ValueError('records have different keys: %r is missed'
+                         '' % err.args[0])
+    if len(rows) != len(records):
+        raise ValueError('records have different keys')
+    if len(keys) == 1:
+        return {keys[0]: tuple(rows)}
+    return dict(zip(keys, zip(*rows)))
+
+
+def encode_columns(records, output=None, default=None, spec='draft9'):
+    """Encodes list of dicts with the same keys as object of per-field
+    arrays. For Draft-9 and Draft-12 arrays of numbers of the same kind are
+    packed at once, see `numeric_arrays` encoder option.
+
+    :param records: List of dicts with the same keys.
+    :param output: `.write([data])`-able object. If omitted result would be
+                   returned instead of written into.
+    :param default: Callable object that would be used if there is no
+                    handlers matched for Python data type.
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+
+    :return: Encoded data if `output` is omitted.
+    """
+    _, _, encoder = get_spec(spec)
+    if issubclass(encoder, Draft9BufferEncoder):
+        encoder = encoder(default, numeric_arrays=True)
+    else:
+        encoder = encoder(default)
+    res = encoder.encode_next(to_columns(records))
+    if output is None:
+        return res
+    output.write(res)
+
+
+def _to_array(column):
+    # Converts list of numbers of the same kind to array.array. Float
+    # columns are arrays of doubles whatever type they are written with
+    if isinstance(column, array):
+        if column.typecode == 'f':
+            return array('d', column)
+        return column
+    if isinstance(column, list):
+        marker = _common_number_type(column)
+        if marker == FLOAT or marker == DOUBLE:
+            # Floats may come as doubles even if they fit float type
+            return array('d', column)
+        if marker is not None:
+            return array(TYPECODES[marker], column)
+    return column
+
+
+def decode_columns(data, rows=False, allow_noop=False, spec='draft9',
+                   **options):
+    """Decodes object of per-field arrays encoded by :func:`encode_columns`.
+    Arrays of numbers of the same kind are returned as :class:`array.array`:
+    integers with the typecode of their narrowest type and floats always
+    with ``'d'`` typecode, regardless of specification.
+
+    :param data: `.read([size])`-able object, source string or any object that
+                 supports buffer protocol.
+    :param rows: Return :class:`Rows` sequence of records instead of dict of
+                 columns.
+    :type rows: bool
+    :param allow_noop: Allow to emit :const:`~simpleubjson.NOOP` values.
+    :type allow_noop: bool
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+    :param options: Additional decoder options. Draft-9 decoder uses
+                    ``eager`` container mode by default.
+    """
+    stream_decoder, _, _ = get_spec(spec)
+    if issubclass(stream_decoder, Draft9Decoder):
+        options.setdefault('container', 'eager')
+    if issubclass(stream_decoder, Draft12Decoder):
+        options.setdefault('typed_arrays', True)
+    columns = decode(data, allow_noop, spec, **options)
+    columns = dict((key, _to_array(column))
+                   for key, column in dict(columns).items())
+    if rows:
+        return Rows(columns)
+    return columns
+
+
+class Rows(Sequence):
+    """Read-only sequence of records over dict of columns. Each record is
+    built as dict only when it's requested.
+
+    :param columns: Dict of equal length sequences of field values.
+    :type columns: dict
+    """
+
+    def __init__(self, columns):
+        self._keys = list(columns)
+        self._columns = [columns[key] for key in self._keys]
+        lengths = set(map(len, self._columns))
+        if len(lengths) > 1:
+            raise ValueError('columns have different lengths')
+        self._length = lengths.pop() if lengths else 0
+
+    def __repr__(self):
+        return '<%s of %d records>' % (type(self).__name__, self._length)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self._length))]
+        if idx < 0:
+            idx += self._length
+        if not 0 <= idx < self._length:
+            raise IndexError('record index out of range')
+        return dict(zip(self._keys, [column[idx]
+                                     for column in self._columns]))
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, Rows)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
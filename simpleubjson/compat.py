@@ -13,6 +13,7 @@ version = '.'.join(map(str, sys.version_info[:2]))
 
 if version >= '3.0':
     from io import BytesIO
+    from collections.abc import Mapping, Sequence
     basestring = (str, bytes)
     unicode = str
     bytes = bytes
@@ -23,8 +24,18 @@ if version >= '3.0':
     dict_keysiterator = type(d.keys())
     dict_valuesiterator = type(d.values())
     dict_itemsiterator = type(d.items())
+
+    def byteview(source):
+        # Buffer of source which items are integers
+        if isinstance(source, bytes):
+            return source
+        view = memoryview(source)
+        if view.format != 'B' or view.ndim != 1:
+            view = view.cast('B')
+        return view
 else:
     from cStringIO import StringIO as BytesIO
+    from collections import Mapping, Sequence
     basestring = basestring
     unicode = unicode
     b = bytes = str
@@ -36,6 +47,11 @@ else:
     dict_valuesiterator = type(d.itervalues())
     dict_itemsiterator = type(d.iteritems())
 
+    def byteview(source):
+        # Items of str and memoryview are 1-char strings here while we need
+        # integers, so source is copied
+        return bytearray(source)
+
 try:
     from math import isinf, isnan
 except ImportError: # < Python 2.6
@@ -0,0 +1,691 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+import sys
+from array import array
+from functools import reduce
+from operator import mul
+from struct import pack, unpack
+from . import NOOP as NOOP_SENTINEL
+from .compat import BytesIO, b, bytes, unicode
+from .draft9 import (
+    Draft9Decoder, Draft9BufferDecoder, Draft9BufferEncoder,
+    NOOP, NULL, FALSE, TRUE, INT8, UINT8, INT16, INT32, INT64, FLOAT, DOUBLE,
+    CHAR, STRING, ARRAY_OPEN, ARRAY_CLOSE, OBJECT_OPEN, OBJECT_CLOSE,
+    CHARS, CONSTANTS, NUMBERS, STRINGS, OPENERS, NUMBER_STRUCTS,
+    NUMBER_FORMATS, LENGTH_STRUCTS, SMALL_INTS, _common_number_type
+)
+from .exceptions import (
+    EncodeError, MarkerError, EarlyEndOfStreamError, NoDataError
+)
+from .reader import PeekReader
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+TYPE = b('$')
+COUNT = b('#')
+
+CONTAINER_TYPES = NUMBERS | STRINGS | OPENERS | set([CHAR, NULL, FALSE, TRUE])
+CONSTANT_TYPES = {NULL: None, FALSE: False, TRUE: True}
+CLOSERS = frozenset([ARRAY_CLOSE, OBJECT_CLOSE])
+
+#: Counted arrays are preallocated, but not more than this amount of items,
+#: so broken count wouldn't exhaust memory before data ends.
+MAX_PREALLOCATED = 64 * 1024
+
+SWAP_BYTES = sys.byteorder == 'little'
+
+
+def _typecodes():
+    # array.array typecodes which items have the same size as UBJSON number
+    typecodes = {}
+    candidates = ((INT8, 'b'), (UINT8, 'B'), (INT16, 'hi'), (INT32, 'il'),
+                  (INT64, 'qlL'), (FLOAT, 'f'), (DOUBLE, 'd'))
+    for marker, codes in candidates:
+        for code in codes:
+            try:
+                itemsize = array(code).itemsize
+            except ValueError:  # no 'q' in < Python 3.3
+                continue
+            if itemsize == NUMBER_STRUCTS[marker].size:
+                typecodes[marker] = code
+                break
+    return typecodes
+
+#: Typecodes of :class:`array.array` for typed arrays of numbers.
+TYPECODES = _typecodes()
+
+
+def _array_markers():
+    # UBJSON numbers for array.array typecodes. Wide unsigned integers are
+    # widened to the next signed type
+    markers = {}
+    signed = {1: INT8, 2: INT16, 4: INT32, 8: INT64}
+    unsigned = {1: UINT8, 2: INT32, 4: INT64, 8: INT64}
+    for code in 'bBhHiIlLqQfd':
+        try:
+            itemsize = array(code).itemsize
+        except ValueError:
+            continue
+        if code in 'fd':
+            marker = FLOAT if itemsize == 4 else DOUBLE
+        elif code.islower():
+            marker = signed[itemsize]
+        else:
+            marker = unsigned[itemsize]
+        if marker in TYPECODES:
+            markers[code] = marker
+    return markers
+
+ARRAY_MARKERS = _array_markers()
+
+_tobytes = getattr(array, 'tobytes', None) or array.tostring
+
+#: Big-endian NumPy dtypes of typed arrays of numbers.
+NDARRAY_DTYPES = {
+    INT8: 'i1',
+    UINT8: 'u1',
+    INT16: '>i2',
+    INT32: '>i4',
+    INT64: '>i8',
+    FLOAT: '>f4',
+    DOUBLE: '>f8'
+}
+# UBJSON numbers for NumPy dtype kinds and sizes. Wide unsigned integers are
+# widened to the next signed type like for array.array
+NDARRAY_MARKERS = {
+    ('i', 1): INT8,
+    ('u', 1): UINT8,
+    ('i', 2): INT16,
+    ('u', 2): INT32,
+    ('i', 4): INT32,
+    ('u', 4): INT64,
+    ('i', 8): INT64,
+    ('u', 8): INT64,
+    ('f', 4): FLOAT,
+    ('f', 8): DOUBLE
+}
+
+
+__all__ = ['Draft12Decoder', 'Draft12BufferDecoder', 'Draft12Encoder']
+
+
+class Draft12Decoder(Draft9Decoder):
+    """Decoder of UBJSON data to Python object following Draft 12
+    specification. Data mapping is the same as for
+    :class:`~simpleubjson.draft9.Draft9Decoder` with next differences:
+
+    - Object keys are strings without ``S`` marker.
+    - Containers could be optimized: ``#`` marker after opening one is
+      followed by items count, while ``$`` marker defines single type of all
+      items which markers are omitted then. Counted containers have no
+      closing marker.
+    - Typed arrays of numbers are unpacked at once. Counted arrays are
+      preallocated.
+    - Containers are always decoded eagerly.
+
+    Multidimensional typed arrays of numbers which count is typed array of
+    integer dimensions, e.g. ``[$D#[$U#i\\x02\\x02\\x03`` for 2x3 matrix, are
+    simpleubjson extension of the specification written for
+    :class:`numpy.ndarray`. They are accepted only with `ndarrays` option,
+    otherwise :exc:`~simpleubjson.exceptions.MarkerError` is raised as by
+    any other decoder that follows the specification.
+
+    Source stream is wrapped with :class:`~simpleubjson.reader.PeekReader`
+    if it doesn't provide `.peek()` method since optional container header
+    should be looked ahead. The wrapper doesn't read ahead, so the stream
+    is left right after decoded value. Pass
+    :class:`~simpleubjson.ChunkedReader` explicitly to buffer reads.
+
+    Decoder options are the same as for
+    :class:`~simpleubjson.draft9.Draft9Decoder` plus:
+
+    :param typed_arrays: Decode typed arrays of numbers as
+                         :class:`array.array` instead of lists.
+    :type typed_arrays: bool
+    :param ndarrays: Decode typed arrays of numbers as
+                     :func:`numpy.frombuffer` views of big-endian dtype
+                     and accept multidimensional ones. Buffer decoder makes
+                     views over the source buffer without copying, so they
+                     are writable only for mutable sources. Requires NumPy.
+    :type ndarrays: bool
+    """
+    container_modes = ('eager',)
+    #: Stream position is unknown, so failed container can't be resumed.
+    offset = None
+
+    def __init__(self, source, allow_noop=False, container='eager',
+                 object_hook=None, object_pairs_hook=None, array_hook=None,
+                 typed_arrays=False, ndarrays=False, string_cache=None,
+                 intern_values=0):
+        if ndarrays and numpy is None:
+            raise ValueError('ndarrays option requires NumPy')
+        super(Draft12Decoder, self).__init__(source, allow_noop, container,
+                                             object_hook, object_pairs_hook,
+                                             array_hook, string_cache,
+                                             intern_values)
+        self.typed_arrays = typed_arrays
+        self.ndarrays = ndarrays
+
+    def reset(self, source):
+        if isinstance(source, unicode):
+            source = source.encode('utf-8')
+        if isinstance(source, bytes):
+            source = BytesIO(source)
+        if not hasattr(source, 'peek'):
+            source = PeekReader(source)
+        super(Draft12Decoder, self).reset(source)
+        self._peek = source.peek
+
+    def peek_marker(self):
+        """Returns the next marker without consuming it or empty string if
+        data ends."""
+        return self._peek(1)[:1]
+
+    def read_payload(self, tag):
+        """Reads payload of value which marker is `tag` or implied by
+        container type. Returns ``(length, value)`` pair like
+        :meth:`next_tlv` does."""
+        struct = NUMBER_STRUCTS.get(tag)
+        if struct is not None:
+            data = self.read(struct.size)
+            if len(data) != struct.size:
+                raise EarlyEndOfStreamError('%r value is truncated' % tag)
+            return None, struct.unpack(data)[0]
+        if tag in STRINGS:
+            ltag = self.read(1)
+            if ltag not in LENGTH_STRUCTS:
+                if not ltag:
+                    raise EarlyEndOfStreamError('string length marker missed')
+                raise MarkerError('invalid string size marker 0x%02X (%r)'
+                                  '' % (ord(ltag), ltag))
+            _, length = self.read_payload(ltag)
+            if length < 0:
+                raise MarkerError('negative string length %d' % length)
+            value = self.read(length)
+            if len(value) != length:
+                raise EarlyEndOfStreamError('%r data is truncated' % tag)
+            return length, value
+        if tag == CHAR:
+            value = self.read(1)
+            if not value:
+                raise EarlyEndOfStreamError('%r value is truncated' % tag)
+            return None, value
+        if tag in CONSTANTS:
+            return None, None
+        raise MarkerError('invalid marker %r' % tag)
+
+    def read_header(self):
+        """Reads optional header of container which opening marker is just
+        read. Returns ``(type, count, shape)`` tuple where missed parts are
+        ``None``. Shape is set only for multidimensional arrays."""
+        vtype = count = shape = None
+        marker = self.peek_marker()
+        if not marker:
+            raise EarlyEndOfStreamError('container is truncated')
+        if marker == TYPE:
+            self.read(1)
+            vtype = self.read(1)
+            if vtype not in CONTAINER_TYPES:
+                if not vtype:
+                    raise EarlyEndOfStreamError('container type missed')
+                raise MarkerError('invalid container type %r' % vtype)
+            marker = self.peek_marker()
+            if not marker:
+                raise EarlyEndOfStreamError('container count missed')
+            if marker != COUNT:
+                raise MarkerError('typed container should be counted')
+        if marker == COUNT:
+            self.read(1)
+            ctag = self.read(1)
+            if ctag == ARRAY_OPEN and vtype in NUMBER_STRUCTS:
+                if not self.ndarrays:
+                    raise MarkerError('array dimensions as count are'
+                                      ' accepted only with ndarrays option')
+                shape = self.read_shape()
+                return vtype, reduce(mul, shape, 1), shape
+            if ctag not in LENGTH_STRUCTS:
+                if not ctag:
+                    raise EarlyEndOfStreamError('container count missed')
+                raise MarkerError('invalid container count marker %r' % ctag)
+            _, count = self.read_payload(ctag)
+            if count < 0:
+                raise MarkerError('negative container count %d' % count)
+        return vtype, count, shape
+
+    def read_shape(self):
+        """Reads dimensions of multidimensional array which opening marker
+        is just read. They should be typed array of integers."""
+        vtype, count, _ = self.read_header()
+        if vtype not in LENGTH_STRUCTS:
+            raise MarkerError('dimensions should be typed array of integers')
+        size = NUMBER_STRUCTS[vtype].size * count
+        data = self.read(size)
+        if len(data) != size:
+            raise EarlyEndOfStreamError('array dimensions are truncated')
+        shape = unpack('>%d%s' % (count, NUMBER_FORMATS[vtype]), data)
+        if min(shape or (0,)) < 0:
+            raise MarkerError('negative array dimension in %r' % (shape,))
+        return shape
+
+    def read_numbers(self, vtype, count, shape=None):
+        """Reads typed array of `count` numbers of `vtype` at once. Returns
+        list, :class:`array.array` or :class:`numpy.ndarray` depending on
+        decoder options. Multidimensional arrays are shaped by `shape`."""
+        size = NUMBER_STRUCTS[vtype].size * count
+        data = self.read(size)
+        if len(data) != size:
+            raise EarlyEndOfStreamError('typed array of %d items is truncated'
+                                        '' % count)
+        if self.ndarrays:
+            values = numpy.frombuffer(data, NDARRAY_DTYPES[vtype], count)
+            return values if shape is None else values.reshape(shape)
+        if self.typed_arrays:
+            values = array(TYPECODES[vtype], data)
+            if SWAP_BYTES and values.itemsize > 1:
+                values.byteswap()
+        else:
+            values = list(unpack('>%d%s' % (count, NUMBER_FORMATS[vtype]),
+                                 data))
+        return values
+
+    def has_item(self, is_object, count, index):
+        """Checks whether container has item at `index`. Closing marker of
+        unsized container is consumed."""
+        if count is not None:
+            return index < count
+        marker = self.peek_marker()
+        if is_object or not self.allow_noop:
+            while marker == NOOP:
+                self.read(1)
+                marker = self.peek_marker()
+        if marker == (OBJECT_CLOSE if is_object else ARRAY_CLOSE):
+            self.read(1)
+            return False
+        if not marker:
+            raise EarlyEndOfStreamError('container end is missed')
+        return True
+
+    def read_key(self):
+        """Reads and decodes object key."""
+        length, value = self.read_payload(STRING)
+        return self.decode_key(STRING, length, value)
+
+    def read_value(self, vtype):
+        """Reads container item of `vtype` type or with its own marker if
+        type is ``None``. Returns ``(tag, length, value)`` like
+        :meth:`next_tlv` does."""
+        if vtype is None:
+            try:
+                tag, length, value = self.next_tlv()
+            except NoDataError:
+                raise EarlyEndOfStreamError('container item is missed')
+            if tag in CLOSERS:
+                raise MarkerError('unexpected container end %r' % tag)
+            return tag, length, value
+        if vtype in OPENERS:
+            return vtype, None, None
+        length, value = self.read_payload(vtype)
+        return vtype, length, value
+
+    def new_frame(self, tag, length):
+        """Returns decoding frame for container with specified marker after
+        reading its header. Frame is a tuple of container object, flag
+        whether it's object, pending object key, items type, count and index
+        of the next item. Typed arrays of numbers and constants are complete
+        right away."""
+        vtype, count, shape = self.read_header()
+        if tag == OBJECT_OPEN:
+            return {} if self.dict_objects else [], True, None, vtype, count, 0
+        if count is None:
+            return [], False, None, vtype, None, 0
+        if vtype in NUMBER_STRUCTS:
+            container = self.read_numbers(vtype, count, shape)
+            return container, False, None, vtype, count, count
+        if vtype in CONSTANT_TYPES:
+            container = [CONSTANT_TYPES[vtype]] * count
+            return container, False, None, vtype, count, count
+        container = [None] * min(count, MAX_PREALLOCATED)
+        return container, False, None, vtype, count, 0
+
+    def decode_frames(self, frames):
+        """Decodes containers which state is described by stack of `frames`
+        till the bottom one is complete and returns it. See :meth:`new_frame`
+        for frame details.
+
+        For buffer sources, if decoding fails, position is moved back to the
+        beginning of failed item and state of current container is pushed
+        back to the `frames`, so it could be resumed once the reason is
+        fixed.
+        """
+        dispatch = self.dispatch
+        openers = self.openers
+        has_item = self.has_item
+        read_key = self.read_key
+        read_value = self.read_value
+        dict_objects = self.dict_objects
+        object_hook = self.object_pairs_hook or self.object_hook
+        array_hook = self.array_hook
+        container, is_object, key, vtype, count, index = frames.pop()
+        try:
+            while 1:
+                start = self.offset
+                if has_item(is_object, count, index):
+                    if is_object:
+                        key = read_key()
+                    tag, length, value = read_value(vtype)
+                    if tag in openers:
+                        frame = self.new_frame(tag, length)
+                        frames.append((container, is_object, key, vtype,
+                                       count, index))
+                        container, is_object, key, vtype, count, index = frame
+                        continue
+                    if tag == NOOP:
+                        value = NOOP_SENTINEL
+                    else:
+                        value = dispatch[tag](self, tag, length, value)
+                else:
+                    value = container
+                    if is_object:
+                        if object_hook is not None:
+                            value = object_hook(value)
+                    elif array_hook is not None:
+                        value = array_hook(value)
+                    if not frames:
+                        return value
+                    container, is_object, key, vtype, count, index = \
+                        frames.pop()
+                if is_object:
+                    if dict_objects:
+                        container[key] = value
+                    else:
+                        container.append((key, value))
+                    key = None
+                elif index < len(container):
+                    container[index] = value
+                else:
+                    container.append(value)
+                index += 1
+        except BaseException:
+            if start is not None:
+                self.offset = start
+            frames.append((container, is_object, None, vtype, count, index))
+            raise
+
+    def skip_payload(self, tag):
+        """Skips payload of value which marker is `tag` or implied by
+        container type."""
+        struct = NUMBER_STRUCTS.get(tag)
+        if struct is not None:
+            self.skip(struct.size)
+        elif tag in STRINGS:
+            ltag = self.read(1)
+            if ltag not in LENGTH_STRUCTS:
+                if not ltag:
+                    raise EarlyEndOfStreamError('string length marker missed')
+                raise MarkerError('invalid string size marker 0x%02X (%r)'
+                                  '' % (ord(ltag), ltag))
+            _, length = self.read_payload(ltag)
+            if length < 0:
+                raise MarkerError('negative string length %d' % length)
+            self.skip(length)
+        elif tag == CHAR:
+            self.skip(1)
+        elif tag in CONSTANTS:
+            pass
+        elif not tag:
+            raise EarlyEndOfStreamError('unexpected end of data')
+        else:
+            raise MarkerError('invalid marker 0x%02x (%r)' % (ord(tag), tag))
+
+    def skip_header(self, tag):
+        # Reads container header and returns skipping frame of it. Typed
+        # arrays of numbers are skipped at once
+        vtype, count, _ = self.read_header()
+        if tag == ARRAY_OPEN and vtype in NUMBER_STRUCTS:
+            self.skip(NUMBER_STRUCTS[vtype].size * count)
+            return False, vtype, count, count
+        return tag == OBJECT_OPEN, vtype, count, 0
+
+    def skip_value(self, tag=None, length=None):
+        """Skips the next value without decoding it. If `tag` of just read
+        container opening marker is passed, skips the rest of that container
+        instead.
+
+        Container items are not validated while skipping.
+        """
+        if tag is None:
+            tag = self.read(1)
+            while tag == NOOP and not self.allow_noop:
+                tag = self.read(1)
+            if not tag:
+                raise NoDataError('nothing to skip')
+            if tag not in self.openers:
+                if tag in CLOSERS:
+                    raise MarkerError('unexpected container end %r' % tag)
+                self.skip_payload(tag)
+                return
+        elif tag not in self.openers:
+            return
+        stack = []
+        is_object, vtype, count, index = self.skip_header(tag)
+        while 1:
+            if not self.has_item(is_object, count, index):
+                if not stack:
+                    return
+                is_object, vtype, count, index = stack.pop()
+                continue
+            index += 1
+            if is_object:
+                self.skip_payload(STRING)
+            tag = vtype or self.read(1)
+            if tag in self.openers:
+                stack.append((is_object, vtype, count, index))
+                is_object, vtype, count, index = self.skip_header(tag)
+            elif tag in CLOSERS:
+                raise MarkerError('unexpected container end %r' % tag)
+            else:
+                self.skip_payload(tag)
+
+    def iter_container(self, tag, length=None):
+        """Iterates over items of container which opening marker `tag` is
+        just read. Yields ``(key, tag, length, value)`` tuple for each item
+        like :class:`~simpleubjson.draft9.Draft9Decoder` does. For items of
+        typed container tag is the container type."""
+        is_object = tag == OBJECT_OPEN
+        vtype, count, _ = self.read_header()
+        if not is_object and vtype in NUMBER_STRUCTS:
+            for value in self.read_numbers(vtype, count):
+                yield None, vtype, None, value
+            return
+        index = 0
+        key = None
+        while self.has_item(is_object, count, index):
+            if is_object:
+                key = self.read_key()
+            tag, length, value = self.read_value(vtype)
+            index += 1
+            yield key, tag, length, value
+
+    def iter_events(self):
+        """Iterates over parsing events of all values till the end of data
+        without building containers. Events are the same as
+        :class:`~simpleubjson.draft9.Draft9Decoder` emits. Offsets of
+        container ends are offsets of their closing markers or right after
+        the last item for counted containers."""
+        tell = self.tell
+        dispatch = self.dispatch
+        stack = []
+        frame = None
+        while 1:
+            offset = tell()
+            if frame is None:
+                try:
+                    tag, length, value = self.next_tlv()
+                except NoDataError:
+                    return
+                if tag in CLOSERS:
+                    raise MarkerError('unexpected container end %r' % tag)
+            else:
+                is_object, vtype, count, index = frame
+                if not self.has_item(is_object, count, index):
+                    yield ('end_object' if is_object else 'end_array',
+                           None, offset)
+                    frame = stack.pop()
+                    continue
+                frame = is_object, vtype, count, index + 1
+                if is_object:
+                    yield 'key', self.read_key(), offset
+                    offset = tell()
+                tag, length, value = self.read_value(vtype)
+            if tag in self.openers:
+                stack.append(frame)
+                vtype, count, _ = self.read_header()
+                frame = tag == OBJECT_OPEN, vtype, count, 0
+                yield ('start_object' if frame[0] else 'start_array',
+                       None, offset)
+            elif tag == NOOP:
+                yield 'value', NOOP_SENTINEL, offset
+            else:
+                yield 'value', dispatch[tag](self, tag, length, value), offset
+
+
+class Draft12BufferDecoder(Draft12Decoder, Draft9BufferDecoder):
+    """Decoder of UBJSON data following Draft 12 specification that walks
+    over in-memory buffer like
+    :class:`~simpleubjson.draft9.Draft9BufferDecoder` does. Data mapping and
+    options are the same as for :class:`Draft12Decoder`.
+    """
+
+    def reset(self, source):
+        Draft9BufferDecoder.reset(self, source)
+
+    def peek_marker(self):
+        pos = self.offset
+        if pos < self.size:
+            return CHARS[self.buf[pos]]
+        return bytes()
+
+    def read_numbers(self, vtype, count, shape=None):
+        if not self.ndarrays:
+            return super(Draft12BufferDecoder, self).read_numbers(vtype, count,
+                                                                  shape)
+        pos = self.offset
+        end = pos + NUMBER_STRUCTS[vtype].size * count
+        if end > self.size:
+            raise EarlyEndOfStreamError('typed array of %d items is truncated'
+                                        '' % count)
+        # View over the source buffer, so payload isn't copied at all
+        values = numpy.frombuffer(self.buf, NDARRAY_DTYPES[vtype], count, pos)
+        self.offset = end
+        return values if shape is None else values.reshape(shape)
+
+
+class Draft12Encoder(Draft9BufferEncoder):
+    """Encoder of Python objects into UBJSON data following Draft 12
+    specification. Data mapping is the same as for
+    :class:`~simpleubjson.draft9.Draft9Encoder` plus:
+
+    +-----------------------------+------------------------------------+-------+
+    | Python type                 | UBJSON type                        | Notes |
+    +=============================+====================================+=======+
+    | :class:`array.array`        | typed and counted array            | \(1)  |
+    +-----------------------------+------------------------------------+-------+
+    | :class:`numpy.ndarray`      | typed and counted array            | \(2)  |
+    +-----------------------------+------------------------------------+-------+
+
+    Notes:
+
+    (1)
+        Items are written as single big-endian block. Unsigned integers
+        wider than byte are widened to the next signed type. Arrays of
+        unicode characters are written as arrays of strings.
+
+    (2)
+        Only if NumPy is available. Arrays of integers and floats are
+        written as single big-endian block. Multidimensional ones have their
+        shape as count: it's simpleubjson extension, so such data could be
+        decoded only by :class:`Draft12Decoder` with `ndarrays` option.
+        Arrays of other dtypes are written as nested lists of their items.
+
+    Object keys are written without ``S`` marker as specification requires.
+    With `numeric_arrays` option lists and tuples of numbers of the same kind
+    are written as typed arrays too.
+    """
+
+    dispatch = Draft9BufferEncoder.dispatch.copy()
+
+    def encode_key(self, key):
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        elif isinstance(key, bytes):
+            try:
+                key.decode('utf-8')
+            except UnicodeDecodeError:
+                raise EncodeError('Invalid UTF-8 byte string: %r' % key)
+        else:
+            raise EncodeError('invalid object key %r' % key)
+        length = len(key)
+        if length < 256:
+            return SMALL_INTS[length] + key
+        return self.encode_int(length) + key
+
+    def _write_pairs(self, items, buf):
+        dispatch = self.dispatch
+        encode_key = self.encode_key
+        for key, value in items:
+            buf += encode_key(key)
+            tvalue = type(value)
+            if tvalue in dispatch:
+                dispatch[tvalue](self, value, buf)
+            else:
+                self.write_next(value, buf)
+
+    def write_numbers(self, obj, marker, buf):
+        count = len(obj)
+        buf += ARRAY_OPEN + TYPE + marker + COUNT
+        self.write_int(count, buf)
+        buf += pack('>%d%s' % (count, NUMBER_FORMATS[marker]), *obj)
+
+    def write_array(self, obj, buf):
+        marker = ARRAY_MARKERS.get(obj.typecode)
+        if marker is None:
+            return self.write_sequence(obj, buf)
+        typecode = TYPECODES[marker]
+        if obj.typecode != typecode or SWAP_BYTES and obj.itemsize > 1:
+            try:
+                obj = array(typecode, obj)
+            except OverflowError:
+                raise EncodeError('array items do not fit %r type' % marker)
+            if SWAP_BYTES and obj.itemsize > 1:
+                obj.byteswap()
+        buf += ARRAY_OPEN + TYPE + marker + COUNT
+        self.write_int(len(obj), buf)
+        buf += _tobytes(obj)
+    dispatch[array] = write_array
+
+    def write_ndarray(self, obj, buf):
+        marker = NDARRAY_MARKERS.get((obj.dtype.kind, obj.dtype.itemsize))
+        if marker is None or not obj.ndim:
+            return self.write_next(obj.tolist(), buf)
+        if obj.dtype.kind == 'u' and obj.size and obj.max() >= 2 ** 63:
+            raise EncodeError('array items do not fit %r type' % marker)
+        # No copy is made if array is already contiguous and big-endian
+        data = numpy.ascontiguousarray(obj, NDARRAY_DTYPES[marker])
+        buf += ARRAY_OPEN + TYPE + marker + COUNT
+        if obj.ndim == 1:
+            self.write_int(obj.size, buf)
+        else:
+            self.write_numbers(obj.shape, _common_number_type(obj.shape), buf)
+        buf += memoryview(data.reshape(-1).view(numpy.uint8))
+    if numpy is not None:
+        dispatch[numpy.ndarray] = write_ndarray
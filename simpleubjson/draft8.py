@@ -8,16 +8,19 @@
 #
 
 from decimal import Decimal
-from struct import pack, unpack
+from os import SEEK_CUR
+from struct import Struct, pack, unpack, error as StructError
 from . import NOOP as NOOP_SENTINEL
+from .cache import InternCache, ShapeCache, MAX_SHAPE_KEYS
 from .compat import (
-    BytesIO, b, bytes, unicode, basestring, long, xrange,
+    BytesIO, b, bytes, unicode, basestring, long, xrange, byteview,
     dict_itemsiterator, dict_keysiterator, dict_valuesiterator,
     isinf, isnan
 )
 from .exceptions import (
-    EncodeError, MarkerError, EarlyEndOfStreamError
+    EncodeError, MarkerError, EarlyEndOfStreamError, NoDataError
 )
+from .reader import DEFAULT_CHUNK_SIZE
 
 
 NOOP = b('N')
@@ -50,12 +53,51 @@ STRINGS = set([STRING_S, STRING_L, HIDEF_S, HIDEF_L])
 SHORT_OBJ = set([STRING_S, HIDEF_S, ARRAY_S, OBJECT_S])
 LARGE_OBJ = set([STRING_L, HIDEF_L, ARRAY_L, OBJECT_L])
 STREAMS = set([ARRAY_S, OBJECT_S])
+CONTAINERS = set([ARRAY_S, ARRAY_L, OBJECT_S, OBJECT_L])
+OBJECTS = set([OBJECT_S, OBJECT_L])
 OBJECT_KEYS = set([STRING_S, STRING_L])
 FORBIDDEN = set([NOOP, EOS])
 
 CHARS = dict((i, b(chr(i))) for i in range(256))
 
-__all__ = ['Draft8Decoder', 'Draft8Encoder']
+NUMBER_STRUCTS = {
+    INT8: Struct('>b'),
+    INT16: Struct('>h'),
+    INT32: Struct('>i'),
+    INT64: Struct('>q'),
+    FLOAT: Struct('>f'),
+    DOUBLE: Struct('>d')
+}
+LARGE_LENGTH = Struct('>I')
+# Same lookups, but by marker code to not deal with bytes in the buffer
+NUMBER_STRUCTS_BY_CODE = [NUMBER_STRUCTS.get(CHARS[i]) for i in range(256)]
+STRING_CODES = set(map(ord, STRINGS))
+SHORT_OBJ_CODES = set(map(ord, SHORT_OBJ))
+LARGE_OBJ_CODES = set(map(ord, LARGE_OBJ))
+CONSTANT_CODES = set(map(ord, CONSTANTS))
+CONTAINER_CODES = set(map(ord, CONTAINERS))
+CONSTANT_VALUES = {ord(NULL): None, ord(FALSE): False, ord(TRUE): True}
+NOOP_CODE = ord(NOOP)
+EOS_CODE = ord(EOS)
+STRING_S_CODE = ord(STRING_S)
+STRING_L_CODE = ord(STRING_L)
+
+# Precomputed encoded data for the most common values
+SMALL_INTS = dict((i, INT8 + CHARS[i % 256]) for i in range(-128, 128))
+STRING_HEADERS = [STRING_S + CHARS[i] for i in range(255)]
+
+__all__ = ['Draft8Decoder', 'Draft8BufferDecoder', 'Draft8Encoder',
+           'Draft8BufferEncoder']
+
+
+def container_size(tag, length):
+    """Returns amount of markers within container with specified marker and
+    length or ``-1`` for unsized one."""
+    if tag in STREAMS and length == 255:
+        return -1
+    if tag in OBJECTS:
+        return length * 2
+    return length
 
 
 class Draft8Decoder(object):
@@ -118,18 +160,46 @@ class Draft8Decoder(object):
     (3)
         Unsized objects are represented as list of 2-element tuple with object
         key and value.
+
+    :param string_cache: :class:`~simpleubjson.cache.InternCache` of object
+                         keys or ``True`` to create new one. Disabled by
+                         default since single value decoding wouldn't reuse
+                         it, while :class:`~simpleubjson.Codec`,
+                         :class:`~simpleubjson.Parser` and
+                         :func:`~simpleubjson.iter_decode` enable it.
+    :param intern_values: Put string values up to this length in bytes into
+                          `string_cache` as well.
+    :type intern_values: int
     """
 
     dispatch = {}
+    #: Markers that open containers.
+    openers = frozenset(CONTAINERS)
 
-    def __init__(self, source, allow_noop=False):
+    def __init__(self, source, allow_noop=False, string_cache=None,
+                 intern_values=0):
+        self.reset(source)
+        self.allow_noop = allow_noop
+        self.dispatch = self.dispatch.copy()
+        if string_cache is True:
+            string_cache = InternCache()
+        self.strings = string_cache
+        self.intern_values = intern_values
+
+    def reset(self, source):
+        """Switches decoder to the new source keeping all its options, so
+        single decoder instance could be reused to decode many messages."""
         if isinstance(source, unicode):
             source = source.encode('utf-8')
         if isinstance(source, bytes):
             source = BytesIO(source)
         self.read = source.read
-        self.allow_noop = allow_noop
-        self.dispatch = self.dispatch.copy()
+        self.tell = getattr(source, 'tell', None)
+        seekable = getattr(source, 'seekable', None)
+        if seekable is not None and seekable():
+            self.seek = source.seek
+        else:
+            self.seek = None
 
     def __iter__(self):
         return self
@@ -138,52 +208,75 @@ class Draft8Decoder(object):
         tag = self.read(1)
         while tag == NOOP and not self.allow_noop:
             tag = self.read(1)
-        if tag in NUMBERS:
-            if tag == INT8:
-                # Trivial operations for trivial cases saves a lot of time
-                value = ord(self.read(1))
-                if value > 128:
-                    value -= 256
-                    #value, = unpack('>b', self.read(1))
-            elif tag == INT16:
-                value, = unpack('>h', self.read(2))
-            elif tag == INT32:
-                value, = unpack('>i', self.read(4))
-            elif tag == INT64:
-                value, = unpack('>q', self.read(8))
-            elif tag == FLOAT:
-                value, = unpack('>f', self.read(4))
-            elif tag == DOUBLE:
-                value, = unpack('>d', self.read(8))
+        try:
+            if tag in NUMBERS:
+                if tag == INT8:
+                    # Trivial operations for trivial cases saves a lot of
+                    # time
+                    value = ord(self.read(1))
+                    if value > 127:
+                        value -= 256
+                        #value, = unpack('>b', self.read(1))
+                elif tag == INT16:
+                    value, = unpack('>h', self.read(2))
+                elif tag == INT32:
+                    value, = unpack('>i', self.read(4))
+                elif tag == INT64:
+                    value, = unpack('>q', self.read(8))
+                elif tag == FLOAT:
+                    value, = unpack('>f', self.read(4))
+                elif tag == DOUBLE:
+                    value, = unpack('>d', self.read(8))
+                else:
+                    raise MarkerError('tag %r not in NUMBERS %r'
+                                      '' % (tag, NUMBERS))
+                return tag, None, value
+            elif tag in SHORT_OBJ:
+                length = ord(self.read(1))
+                if tag in STRINGS:
+                    if length == 255:
+                        raise MarkerError(
+                            'Short string objects (%r) should not have length'
+                            ' 255' % tag)
+                    value = self.read(length)
+                    if len(value) != length:
+                        raise EarlyEndOfStreamError('%r data is truncated'
+                                                    '' % tag)
+                    return tag, length, value
+                return tag, length, None
+            elif tag in LARGE_OBJ:
+                length, = unpack('>I', self.read(4))
+                if tag in STRINGS:
+                    value = self.read(length)
+                    if len(value) != length:
+                        raise EarlyEndOfStreamError('%r data is truncated'
+                                                    '' % tag)
+                    return tag, length, value
+                return tag, length, None
+            elif tag in CONSTANTS:
+                return tag, None, None
+            elif not tag:
+                raise NoDataError('nothing to decode')
             else:
-                raise MarkerError('tag %r not in NUMBERS %r' % (tag, NUMBERS))
-            return tag, None, value
-        elif tag in SHORT_OBJ:
-            length = ord(self.read(1))
-            if tag in STRINGS:
-                if length == 255:
-                    raise MarkerError(
-                        'Short string objects (%r) should not have length 255'
-                        % tag)
-                return tag, length, self.read(length)
-            return tag, length, None
-        elif tag in LARGE_OBJ:
-            length, = unpack('>I', self.read(4))
-            if tag in STRINGS:
-                return tag, length, self.read(length)
-            return tag, length, None
-        elif tag in CONSTANTS:
-            return tag, None, None
-        elif not tag:
-            raise EarlyEndOfStreamError('nothing to decode')
-        else:
-            raise MarkerError('invalid marker 0x%02x (%r)' % (ord(tag), tag))
+                raise MarkerError('invalid marker 0x%02x (%r)'
+                                  '' % (ord(tag), tag))
+        except (TypeError, StructError):
+            # ord() and unpack() fail on missed bytes
+            raise EarlyEndOfStreamError('%r value is truncated' % tag)
 
     def decode_next(self):
         tag, length, value = self.next_tlv()
         return self.dispatch[tag](self, tag, length, value)
 
-    __next__ = next = decode_next
+    def __next__(self):
+        # Clean end of data between values stops iteration, while truncated
+        # value still raises an error
+        try:
+            tag, length, value = self.next_tlv()
+        except NoDataError:
+            raise StopIteration
+        return self.dispatch[tag](self, tag, length, value)
+    next = __next__
 
     def decode_noop(self, tag, length, value):
         return NOOP_SENTINEL
@@ -214,10 +307,19 @@ class Draft8Decoder(object):
     dispatch[DOUBLE] = decode_float
 
     def decode_string(self, tag, length, value):
+        if self.strings is not None and 0 < length <= self.intern_values:
+            return self.strings.decode(value)
         return value.decode('utf-8')
     dispatch[STRING_S] = decode_string
     dispatch[STRING_L] = decode_string
 
+    def decode_key(self, tag, length, value):
+        """Decodes object key which marker is just read. Keys are taken from
+        `string_cache` if it's enabled."""
+        if self.strings is not None and tag in OBJECT_KEYS:
+            return self.strings.decode(value)
+        return self.dispatch[tag](self, tag, length, value)
+
     def decode_hidef(self, tag, length, value):
         return Decimal(value.decode('utf-8'))
     dispatch[HIDEF_S] = decode_hidef
@@ -226,76 +328,43 @@ class Draft8Decoder(object):
     def decode_array(self, tag, length, value):
         if tag == ARRAY_S and length == 255:
             return self.decode_array_stream(tag, length, value)
-        res = [None] * length
-        next_tlv = self.next_tlv
-        dispatch = self.dispatch
-        forbidden = FORBIDDEN
-        streams = STREAMS
-        for _ in range(length):
-            tag, length, value = next_tlv()
-            if tag in forbidden:
-                raise MarkerError('invalid marker occurs: %02X' % ord(tag))
-            item = dispatch[tag](self, tag, length, value)
-            if tag in streams and length == 255:
-                item = list(item)
-            res[_] = item
-        return res
+        return self.decode_container(tag, length, value)
     dispatch[ARRAY_S] = decode_array
     dispatch[ARRAY_L] = decode_array
 
     def decode_object(self, tag, length, value):
         if tag == OBJECT_S and length == 255:
             return self.decode_object_stream(tag, length, value)
-        res = {}
-        key = None
-        next_tlv = self.next_tlv
-        dispatch = self.dispatch
-        forbidden = FORBIDDEN
-        object_keys = OBJECT_KEYS
-        streams = STREAMS
-        for _ in range(length * 2):
-            tag, length, value = next_tlv()
-            if tag in forbidden:
-                raise MarkerError('invalid marker found: %02X' % ord(tag))
-            if key is None and tag not in object_keys:
-                raise MarkerError('key should be string, got %r' % (tag))
-            value = dispatch[tag](self, tag, length, value)
-            if key is None:
-                key = value
-            else:
-                if tag in streams and length == 255:
-                    value = list(value)
-                res[key] = value
-                key = None
-        return res
+        return self.decode_container(tag, length, value)
     dispatch[OBJECT_S] = decode_object
     dispatch[OBJECT_L] = decode_object
 
     def decode_array_stream(self, tag, length, value):
         dispatch = self.dispatch
         next_tlv = self.next_tlv
+        decode_container = self.decode_container
         eos = EOS
-        streams = STREAMS
+        containers = CONTAINERS
         def array_stream():
             while 1:
                 tag, length, value = next_tlv()
                 if tag == eos:
                     break
-                item = dispatch[tag](self, tag, length, value)
-                if tag in streams and length == 255:
-                    yield list(item)
+                if tag in containers:
+                    yield decode_container(tag, length, value)
                 else:
-                    yield item
+                    yield dispatch[tag](self, tag, length, value)
         return array_stream()
 
     def decode_object_stream(self, tag, length, value):
         dispatch = self.dispatch
         next_tlv = self.next_tlv
+        decode_container = self.decode_container
         eos = EOS
         object_keys = OBJECT_KEYS
         noop = NOOP
         noop_sentinel = NOOP_SENTINEL
-        streams = STREAMS
+        containers = CONTAINERS
         def object_stream():
             key = None
             while 1:
@@ -311,17 +380,532 @@ class Draft8Decoder(object):
                     break
                 elif key is None and tag not in object_keys:
                     raise MarkerError('key should be string, got %r' % (tag))
+                elif key is None:
+                    key = self.decode_key(tag, length, value)
+                elif tag in containers:
+                    yield key, decode_container(tag, length, value)
+                    key = None
+                else:
+                    yield key, dispatch[tag](self, tag, length, value)
+                    key = None
+        return object_stream()
+
+    def decode_container(self, tag, length, value):
+        """Decodes whole container which opening marker is just read.
+
+        Nested containers are handled with explicit stack of frames instead
+        of recursion, so nesting depth is limited only by available memory.
+        Arrays are decoded as lists, sized objects as dicts and unsized ones
+        as lists of 2-element tuples with object key and value.
+        """
+        return self.decode_frames([self.new_frame(tag, length)])
+
+    def new_frame(self, tag, length):
+        """Returns decoding frame for container with specified marker and
+        length. See :meth:`decode_frames` for details."""
+        is_object = tag in OBJECTS
+        if tag in STREAMS and length == 255:
+            return [], is_object, None, -1
+        return {} if is_object else [], is_object, None, length
+
+    def decode_frames(self, frames):
+        """Decodes containers which state is described by stack of `frames`
+        till the bottom one is complete and returns it.
+
+        Each frame is a tuple of container object, flag whether it's object or
+        array, object key which value is expected (``None`` if there is no
+        such) and amount of items left to decode (``-1`` for unsized
+        containers). If decoding fails, state of current container is pushed
+        back to the `frames`, so it could be resumed once the reason is fixed.
+        """
+        next_tlv = self.next_tlv
+        dispatch = self.dispatch
+        new_frame = self.new_frame
+        noop = NOOP
+        eos = EOS
+        noop_sentinel = NOOP_SENTINEL
+        object_keys = OBJECT_KEYS
+        containers = CONTAINERS
+        container, is_object, key, left = frames.pop()
+        try:
+            while 1:
+                if not left:
+                    value = container
+                    if not frames:
+                        return value
+                    container, is_object, key, left = frames.pop()
+                else:
+                    tag, length, value = next_tlv()
+                    if tag in containers:
+                        if is_object and key is None:
+                            raise MarkerError('key should be string, got %r'
+                                              '' % tag)
+                        frames.append((container, is_object, key, left))
+                        container, is_object, key, left = new_frame(tag,
+                                                                    length)
+                        continue
+                    elif tag == eos or tag == noop:
+                        if left > 0:
+                            raise MarkerError('invalid marker occurs: %02X'
+                                              '' % ord(tag))
+                        if tag == noop:
+                            if is_object:
+                                if key is None:
+                                    container.append((noop_sentinel,
+                                                      noop_sentinel))
+                                continue
+                            value = noop_sentinel
+                        else:
+                            if key is not None:
+                                raise EarlyEndOfStreamError(
+                                    'value missed for key %r' % key)
+                            value = container
+                            if not frames:
+                                return value
+                            container, is_object, key, left = frames.pop()
+                    elif is_object and key is None:
+                        if tag not in object_keys:
+                            raise MarkerError('key should be string, got %r'
+                                              '' % tag)
+                        key = self.decode_key(tag, length, value)
+                        continue
+                    else:
+                        value = dispatch[tag](self, tag, length, value)
+                if is_object:
+                    if left < 0:
+                        container.append((key, value))
+                    else:
+                        container[key] = value
+                    key = None
+                else:
+                    container.append(value)
+                if left > 0:
+                    left -= 1
+        except BaseException:
+            frames.append((container, is_object, key, left))
+            raise
+
+    def skip(self, size):
+        """Skips `size` bytes of the source. Seekable sources are seeked
+        instead of reading skipped data."""
+        if self.seek is not None and size > 1:
+            # Only the last byte is read to make sure data isn't truncated
+            self.seek(size - 1, SEEK_CUR)
+            size = 1
+        if len(self.read(size)) != size:
+            raise EarlyEndOfStreamError('%d bytes expected to skip' % size)
+
+    def skip_value(self, tag=None, length=None):
+        """Skips the next value without decoding it: payload of strings and
+        numbers is stepped over by its length and containers are walked
+        through by their markers. If `tag` and `length` of just read
+        container marker are passed, skips the rest of that container
+        instead.
+
+        Container items are not validated while skipping.
+        """
+        # Amount of markers left in each open container, -1 for unsized ones
+        lefts = []
+        if tag is not None:
+            if tag not in CONTAINERS:
+                return
+            left = container_size(tag, length)
+            if not left:
+                return
+            lefts.append(left)
+        read = self.read
+        skip = self.skip
+        while 1:
+            tag = read(1)
+            if tag in NUMBERS:
+                skip(NUMBER_STRUCTS[tag].size)
+            elif tag in SHORT_OBJ or tag in LARGE_OBJ:
+                if tag in SHORT_OBJ:
+                    data = read(1)
+                    if not data:
+                        raise EarlyEndOfStreamError('%r length is truncated'
+                                                    '' % tag)
+                    length = ord(data)
+                else:
+                    try:
+                        length, = LARGE_LENGTH.unpack(read(4))
+                    except StructError:
+                        raise EarlyEndOfStreamError('%r length is truncated'
+                                                    '' % tag)
+                if tag in STRINGS:
+                    skip(length)
+                else:
+                    left = container_size(tag, length)
+                    if left:
+                        lefts.append(left)
+                        continue
+            elif tag == EOS:
+                if not lefts or lefts[-1] != -1:
+                    raise MarkerError('invalid marker occurs: %02X'
+                                      '' % ord(tag))
+                lefts.pop()
+            elif tag == NOOP:
+                if lefts:
+                    if lefts[-1] > 0:
+                        raise MarkerError('invalid marker occurs: %02X'
+                                          '' % ord(tag))
+                    continue
+                if not self.allow_noop:
+                    continue
+            elif tag in CONSTANTS:
+                pass
+            elif not tag:
+                if lefts:
+                    raise EarlyEndOfStreamError('unexpected end of data')
+                raise NoDataError('nothing to skip')
+            else:
+                raise MarkerError('invalid marker 0x%02x (%r)'
+                                  '' % (ord(tag), tag))
+            # Value is complete, so are sized containers with no items left
+            while lefts:
+                if lefts[-1] > 0:
+                    lefts[-1] -= 1
+                if lefts[-1]:
+                    break
+                lefts.pop()
+            else:
+                return
+
+    def iter_container(self, tag, length):
+        """Iterates over items of container which marker `tag` and `length`
+        are just read. Yields ``(key, tag, length, value)`` tuple for each
+        item, where key is decoded object key or ``None`` for array items and
+        the rest is the result of :meth:`next_tlv` for item marker. Each item
+        should be either decoded or skipped before the next one is requested.
+        """
+        next_tlv = self.next_tlv
+        dispatch = self.dispatch
+        is_object = tag in OBJECTS
+        if tag in STREAMS and length == 255:
+            left = -1
+        else:
+            left = length
+        key = None
+        try:
+            while left:
+                tag, length, value = next_tlv()
+                if tag == EOS or tag == NOOP:
+                    if left > 0:
+                        raise MarkerError('invalid marker occurs: %02X'
+                                          '' % ord(tag))
+                    if tag == EOS:
+                        return
+                    if is_object:
+                        continue
+                if is_object:
+                    if tag not in OBJECT_KEYS:
+                        raise MarkerError('key should be string, got %r'
+                                          '' % tag)
+                    key = self.decode_key(tag, length, value)
+                    tag, length, value = next_tlv()
+                    while tag == NOOP and left < 0:
+                        tag, length, value = next_tlv()
+                    if tag in FORBIDDEN:
+                        raise MarkerError('invalid marker occurs: %02X'
+                                          '' % ord(tag))
+                yield key, tag, length, value
+                if left > 0:
+                    left -= 1
+        except NoDataError:
+            raise EarlyEndOfStreamError('container end is missed')
+
+    def iter_events(self):
+        """Iterates over parsing events of all values till the end of data
+        without building containers. Each event is a tuple of its name, value
+        and offset of its marker in bytes:
+
+        - ``('start_array', None, offset)``
+        - ``('end_array', None, offset)``
+        - ``('start_object', None, offset)``
+        - ``('end_object', None, offset)``
+        - ``('key', key, offset)``
+        - ``('value', value, offset)`` for numbers, strings and constants
+
+        Sized containers end right after their last item, so their end events
+        have the same offset as the next marker. `NoOp` markers are reported
+        as values within unsized arrays and at the top level and are ignored
+        in objects. Requires source with `.tell()`.
+        """
+        next_tlv = self.next_tlv
+        dispatch = self.dispatch
+        tell = self.tell
+        stack = []
+        is_object = expect_key = False
+        left = -1
+        while 1:
+            offset = tell()
+            if not left:
+                # Sized container is complete
+                yield ('end_object' if is_object else 'end_array',
+                       None, offset)
+                is_object, left = stack.pop()
+                expect_key = is_object
+                if left > 0:
+                    left -= 1
+                continue
+            try:
+                tag, length, value = next_tlv()
+            except NoDataError:
+                if stack:
+                    raise EarlyEndOfStreamError('unexpected end of data at %d'
+                                                '' % offset)
+                return
+            if tag in CONTAINERS:
+                if expect_key:
+                    raise MarkerError('key should be string, got %r' % tag)
+                stack.append((is_object, left))
+                is_object = expect_key = tag in OBJECTS
+                if tag in STREAMS and length == 255:
+                    left = -1
+                else:
+                    left = length
+                yield ('start_object' if is_object else 'start_array',
+                       None, offset)
+                continue
+            elif tag == EOS:
+                if not stack or left >= 0:
+                    raise MarkerError('invalid marker occurs: %02X'
+                                      '' % ord(tag))
+                if is_object and not expect_key:
+                    raise EarlyEndOfStreamError('value missed for the key')
+                yield ('end_object' if is_object else 'end_array',
+                       None, offset)
+                is_object, left = stack.pop()
+                expect_key = is_object
+            elif tag == NOOP:
+                if left > 0:
+                    raise MarkerError('invalid marker occurs: %02X'
+                                      '' % ord(tag))
+                if is_object:
+                    continue
+                yield 'value', NOOP_SENTINEL, offset
+            elif expect_key:
+                if tag not in OBJECT_KEYS:
+                    raise MarkerError('key should be string, got %r' % tag)
+                expect_key = False
+                yield 'key', self.decode_key(tag, length, value), offset
+                continue
+            else:
+                expect_key = is_object
+                yield 'value', dispatch[tag](self, tag, length, value), offset
+            if left > 0:
+                left -= 1
+
+
+class Draft8BufferDecoder(Draft8Decoder):
+    """Decoder of UBJSON data that walks over in-memory buffer with integer
+    offset instead of reading it chunk by chunk from stream.
+
+    Source could be :class:`bytes`, :class:`bytearray`, :class:`memoryview` or
+    any other object that supports buffer protocol. Source is never copied as
+    whole: only strings payload is sliced out of it to get decoded. Data
+    mapping is the same as for :class:`Draft8Decoder`.
+
+    Containers are decoded with inlined parsing of the most common markers.
+    If `dispatch` table differs from the :class:`Draft8Decoder` one, they
+    are decoded through the table instead, so overridden handlers apply.
+    """
+
+    def reset(self, source):
+        if isinstance(source, unicode):
+            source = source.encode('utf-8')
+        self.buf = byteview(source)
+        self.size = len(self.buf)
+        self.offset = 0
+
+    def read(self, size):
+        start = self.offset
+        self.offset = min(start + size, self.size)
+        return bytes(self.buf[start:self.offset])
+
+    def tell(self):
+        return self.offset
+
+    def skip(self, size):
+        end = self.offset + size
+        if end > self.size:
+            raise EarlyEndOfStreamError('%d bytes expected to skip' % size)
+        self.offset = end
+
+    def next_tlv(self):
+        buf = self.buf
+        pos = self.offset
+        try:
+            code = buf[pos]
+            while code == NOOP_CODE and not self.allow_noop:
+                pos += 1
+                code = buf[pos]
+        except IndexError:
+            self.offset = pos
+            raise NoDataError('nothing to decode')
+        pos += 1
+        tag = CHARS[code]
+        struct = NUMBER_STRUCTS_BY_CODE[code]
+        try:
+            if struct is not None:
+                value, = struct.unpack_from(buf, pos)
+                self.offset = pos + struct.size
+                return tag, None, value
+            elif code in SHORT_OBJ_CODES:
+                length = buf[pos]
+                pos += 1
+                if code not in STRING_CODES:
+                    self.offset = pos
+                    return tag, length, None
+                if length == 255:
+                    raise MarkerError(
+                        'Short string objects (%r) should not have length 255'
+                        % tag)
+            elif code in LARGE_OBJ_CODES:
+                length, = LARGE_LENGTH.unpack_from(buf, pos)
+                pos += 4
+                if code not in STRING_CODES:
+                    self.offset = pos
+                    return tag, length, None
+            elif code in CONSTANT_CODES:
+                self.offset = pos
+                return tag, None, None
+            else:
+                raise MarkerError('invalid marker 0x%02x (%r)' % (code, tag))
+        except (IndexError, StructError):
+            raise EarlyEndOfStreamError('%r value is truncated' % tag)
+        end = pos + length
+        if end > self.size:
+            raise EarlyEndOfStreamError('%r data is truncated' % tag)
+        self.offset = end
+        value = buf[pos:end]
+        if not isinstance(value, bytes):
+            value = bytes(value)
+        return tag, length, value
+
+    def decode_frames(self, frames):
+        # Same as Draft8Decoder.decode_frames, but with inlined markers
+        # parsing for the most common types: it's twice faster than calling
+        # next_tlv and dispatch handlers for each value
+        if self.dispatch != Draft8Decoder.dispatch:
+            return Draft8Decoder.decode_frames(self, frames)
+        buf = self.buf
+        size = self.size
+        pos = start = self.offset
+        dispatch = self.dispatch
+        allow_noop = self.allow_noop
+        new_frame = self.new_frame
+        number_structs = NUMBER_STRUCTS_BY_CODE
+        constants = CONSTANT_VALUES
+        noop_sentinel = NOOP_SENTINEL
+        strings = self.strings
+        intern_values = self.intern_values if strings is not None else -1
+        container, is_object, key, left = frames.pop()
+        try:
+            while 1:
+                if not left:
+                    value = container
+                    if not frames:
+                        self.offset = pos
+                        return value
+                    container, is_object, key, left = frames.pop()
                 else:
-                    value = dispatch[tag](self, tag, length, value)
-                    if key is None:
+                    start = pos
+                    code = buf[pos]
+                    pos += 1
+                    struct = number_structs[code]
+                    if struct is not None:
+                        value, = struct.unpack_from(buf, pos)
+                        pos += struct.size
+                    elif code == STRING_S_CODE:
+                        length = buf[pos]
+                        if length == 255:
+                            raise MarkerError('Short string objects (%r)'
+                                              ' should not have length 255'
+                                              '' % STRING_S)
+                        pos += 1
+                        end = pos + length
+                        if end > size:
+                            raise IndexError
+                        value = buf[pos:end]
+                        if not isinstance(value, bytes):
+                            value = bytes(value)
+                        if 0 < length <= intern_values or (
+                                is_object and key is None
+                                and strings is not None):
+                            value = strings.decode(value)
+                        else:
+                            value = value.decode('utf-8')
+                        pos = end
+                    elif code in constants:
+                        value = constants[code]
+                    elif code in CONTAINER_CODES:
+                        if is_object and key is None:
+                            raise MarkerError('key should be string, got %r'
+                                              '' % CHARS[code])
+                        if code in SHORT_OBJ_CODES:
+                            length = buf[pos]
+                            pos += 1
+                        else:
+                            length, = LARGE_LENGTH.unpack_from(buf, pos)
+                            pos += 4
+                        frames.append((container, is_object, key, left))
+                        container, is_object, key, left = new_frame(
+                            CHARS[code], length)
+                        continue
+                    elif code == NOOP_CODE and not allow_noop:
+                        continue
+                    elif code == NOOP_CODE or code == EOS_CODE:
+                        if left > 0:
+                            raise MarkerError('invalid marker occurs: %02X'
+                                              '' % code)
+                        if code == NOOP_CODE:
+                            if is_object:
+                                if key is None:
+                                    container.append((noop_sentinel,
+                                                      noop_sentinel))
+                                continue
+                            value = noop_sentinel
+                        else:
+                            if key is not None:
+                                raise EarlyEndOfStreamError(
+                                    'value missed for key %r' % key)
+                            value = container
+                            if not frames:
+                                self.offset = pos
+                                return value
+                            container, is_object, key, left = frames.pop()
+                    else:
+                        # Rare and invalid markers are handled in regular way
+                        self.offset = start
+                        tag, length, value = self.next_tlv()
+                        pos = self.offset
+                        value = dispatch[tag](self, tag, length, value)
+                    if is_object and key is None:
+                        if code != STRING_S_CODE and code != STRING_L_CODE:
+                            raise MarkerError('key should be string, got %r'
+                                              '' % CHARS[code])
                         key = value
-                    elif tag in streams:
-                        yield key, list(value)
-                        key = None
+                        continue
+                if is_object:
+                    if left < 0:
+                        container.append((key, value))
                     else:
-                        yield key, value
-                        key = None
-        return object_stream()
+                        container[key] = value
+                    key = None
+                else:
+                    container.append(value)
+                if left > 0:
+                    left -= 1
+        except (IndexError, StructError):
+            self.offset = start
+            frames.append((container, is_object, key, left))
+            raise EarlyEndOfStreamError('unexpected end of data at %d'
+                                        '' % start)
+        except BaseException:
+            self.offset = start
+            frames.append((container, is_object, key, left))
+            raise
 
 
 class Draft8Encoder(object):
@@ -455,7 +1039,7 @@ class Draft8Encoder(object):
         if length < 255:
             return STRING_S + CHARS[length] + obj
         else:
-            return STRING_L + INT32 + pack('>i', length) + obj
+            return STRING_L + pack('>i', length) + obj
 
     def encode_bytes(self, obj):
         try:
@@ -530,3 +1114,208 @@ class Draft8Encoder(object):
             yield self.encode_next(value)
         yield EOS
     dispatch[dict_itemsiterator] = encode_dictitems
+
+
+class Draft8BufferEncoder(Draft8Encoder):
+    """Encoder of Python objects into UBJSON data following Draft 8
+    specification that writes all markers and payload into single growing
+    buffer instead of joining encoded data on each container level.
+
+    Produces the same data and follows the same mapping as
+    :class:`Draft8Encoder`.
+
+    :param default: Callable object that would be used if there is no
+                    handlers matched for Python data type.
+    :param shape_cache: :class:`~simpleubjson.cache.ShapeCache` of dicts keys
+                        or ``True`` to create new one. Disabled by default
+                        since single value encoding wouldn't reuse it, while
+                        :class:`~simpleubjson.Codec` enables it.
+    """
+
+    dispatch = {}
+
+    def __init__(self, default=None, shape_cache=None):
+        super(Draft8BufferEncoder, self).__init__(default)
+        if shape_cache is True:
+            shape_cache = ShapeCache()
+        self.shapes = shape_cache
+
+    def encode_next(self, obj):
+        buf = bytearray()
+        self.write_next(obj, buf)
+        return bytes(buf)
+
+    def write_next(self, obj, buf):
+        tobj = type(obj)
+        if tobj in self.dispatch:
+            self.dispatch[tobj](self, obj, buf)
+        else:
+            self.write_next(self._default(obj), buf)
+
+    def write_noop(self, obj, buf):
+        buf += NOOP
+    dispatch[type(NOOP_SENTINEL)] = write_noop
+
+    def write_none(self, obj, buf):
+        buf += NULL
+    dispatch[type(None)] = write_none
+
+    def write_bool(self, obj, buf):
+        buf += TRUE if obj else FALSE
+    dispatch[bool] = write_bool
+
+    def write_int(self, obj, buf):
+        if -128 <= obj <= 127:
+            buf += SMALL_INTS[obj]
+        else:
+            buf += self.encode_int(obj)
+    dispatch[int] = write_int
+    dispatch[long] = write_int
+
+    def write_float(self, obj, buf):
+        buf += self.encode_float(obj)
+    dispatch[float] = write_float
+
+    def _write_str(self, obj, buf):
+        length = len(obj)
+        if length < 255:
+            buf += STRING_HEADERS[length]
+            buf += obj
+        else:
+            buf += self._encode_str(obj)
+
+    def write_bytes(self, obj, buf):
+        try:
+            obj.decode('utf-8')
+        except UnicodeDecodeError:
+            raise EncodeError('Invalid UTF-8 byte string: %r' % obj)
+        else:
+            self._write_str(obj, buf)
+    dispatch[bytes] = write_bytes
+
+    def write_str(self, obj, buf):
+        self._write_str(obj.encode('utf-8'), buf)
+    dispatch[unicode] = write_str
+
+    def write_decimal(self, obj, buf):
+        buf += self.encode_decimal(obj)
+    dispatch[Decimal] = write_decimal
+
+    def _write_items(self, obj, buf):
+        dispatch = self.dispatch
+        for item in obj:
+            titem = type(item)
+            if titem in dispatch:
+                dispatch[titem](self, item, buf)
+            else:
+                self.write_next(item, buf)
+
+    def _write_pairs(self, items, buf):
+        dispatch = self.dispatch
+        write_str = self._write_str
+        for key, value in items:
+            if isinstance(key, unicode):
+                write_str(key.encode('utf-8'), buf)
+            elif isinstance(key, bytes):
+                self.write_bytes(key, buf)
+            else:
+                raise EncodeError('invalid object key %r' % key)
+            tvalue = type(value)
+            if tvalue in dispatch:
+                dispatch[tvalue](self, value, buf)
+            else:
+                self.write_next(value, buf)
+
+    def encode_key(self, key):
+        """Returns encoded object `key`."""
+        buf = bytearray()
+        if isinstance(key, unicode):
+            self._write_str(key.encode('utf-8'), buf)
+        elif isinstance(key, bytes):
+            self.write_bytes(key, buf)
+        else:
+            raise EncodeError('invalid object key %r' % key)
+        return bytes(buf)
+
+    def _write_values(self, keys, values, buf):
+        dispatch = self.dispatch
+        for key, value in zip(keys, values):
+            buf += key
+            tvalue = type(value)
+            if tvalue in dispatch:
+                dispatch[tvalue](self, value, buf)
+            else:
+                self.write_next(value, buf)
+
+    def _write_header(self, short, large, length, buf):
+        if length < 255:
+            buf += short
+            buf += CHARS[length]
+        else:
+            buf += large
+            buf += pack('>I', length)
+
+    def write_sequence(self, obj, buf):
+        self._write_header(ARRAY_S, ARRAY_L, len(obj), buf)
+        self._write_items(obj, buf)
+    dispatch[tuple] = write_sequence
+    dispatch[list] = write_sequence
+    dispatch[set] = write_sequence
+    dispatch[frozenset] = write_sequence
+
+    def write_dict(self, obj, buf):
+        self._write_header(OBJECT_S, OBJECT_L, len(obj), buf)
+        if self.shapes is not None and len(obj) <= MAX_SHAPE_KEYS:
+            keys = self.shapes.encode(tuple(obj), self.encode_key)
+            if keys is None:
+                self._write_pairs(obj.items(), buf)
+            else:
+                self._write_values(keys, obj.values(), buf)
+        else:
+            self._write_pairs(obj.items(), buf)
+    dispatch[dict] = write_dict
+
+    def write_generator(self, obj, buf):
+        buf += ARRAY_S + FF
+        self._write_items(obj, buf)
+        buf += EOS
+    dispatch[xrange] = write_generator
+    dispatch[type((i for i in ()))] = write_generator
+    dispatch[dict_keysiterator] = write_generator
+    dispatch[dict_valuesiterator] = write_generator
+
+    def write_dictitems(self, obj, buf):
+        buf += OBJECT_S + FF
+        self._write_pairs(obj, buf)
+        buf += EOS
+    dispatch[dict_itemsiterator] = write_dictitems
+
+    def iter_encode(self, obj, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Encodes `obj` by chunks of about `chunk_size` bytes. Top-level
+        arrays and objects are split between their items, so encoded data
+        could be sent while the rest items are not encoded yet."""
+        buf = bytearray()
+        handler = self.dispatch.get(type(obj))
+        if handler is self.write_sequence.__func__:
+            self._write_header(ARRAY_S, ARRAY_L, len(obj), buf)
+            items, write, tail = obj, self._write_items, bytes()
+        elif handler is self.write_generator.__func__:
+            buf += ARRAY_S + FF
+            items, write, tail = obj, self._write_items, EOS
+        elif handler is self.write_dict.__func__:
+            self._write_header(OBJECT_S, OBJECT_L, len(obj), buf)
+            items, write, tail = obj.items(), self._write_pairs, bytes()
+        elif handler is self.write_dictitems.__func__:
+            buf += OBJECT_S + FF
+            items, write, tail = obj, self._write_pairs, EOS
+        else:
+            self.write_next(obj, buf)
+            items, write, tail = (), None, bytes()
+        for item in items:
+            write((item,), buf)
+            if len(buf) >= chunk_size:
+                yield bytes(buf)
+                del buf[:]
+        buf += tail
+        if buf:
+            yield bytes(buf)
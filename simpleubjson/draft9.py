@@ -7,17 +7,23 @@
 # you should have received as part of this distribution.
 #
 
+from array import array
 from decimal import Decimal
-from struct import pack, unpack
+from copy import copy
+from os import SEEK_CUR
+from struct import Struct, pack, unpack, error as StructError
 from . import NOOP as NOOP_SENTINEL
 from simpleubjson.compat import (
-    BytesIO, basestring, b, bytes, unicode, long, xrange,
+    BytesIO, basestring, b, bytes, unicode, long, xrange, byteview,
     dict_itemsiterator, dict_keysiterator, dict_valuesiterator,
     isinf, isnan
 )
 from .exceptions import (
-    EncodeError, MarkerError, EarlyEndOfStreamError
+    EncodeError, MarkerError, EarlyEndOfStreamError, NoDataError
 )
+from .cache import InternCache, ShapeCache, ShapeTree, MAX_SHAPE_KEYS
+from .lazy import LazyArray, LazyObject
+from .reader import DEFAULT_CHUNK_SIZE
 
 
 NOOP = b('N')
@@ -44,13 +50,123 @@ BOS_O = object()
 
 CONSTANTS = set([NOOP, NULL, FALSE, TRUE])
 CONTAINERS = set([ARRAY_OPEN, ARRAY_CLOSE, OBJECT_OPEN, OBJECT_CLOSE])
+OPENERS = frozenset([ARRAY_OPEN, OBJECT_OPEN])
 NUMBERS = set([INT8, UINT8, INT16, INT32, INT64, FLOAT, DOUBLE])
 STRINGS = set([STRING, HIDEF])
 OBJECT_KEYS = set([CHAR, STRING])
 
 CHARS = dict((i, b(chr(i))) for i in range(256))
+NOOP_CODE = ord(NOOP)
 
-__all__ = ['Draft9Decoder', 'Draft9Encoder']
+NUMBER_STRUCTS = {
+    INT8: Struct('>b'),
+    UINT8: Struct('>B'),
+    INT16: Struct('>h'),
+    INT32: Struct('>i'),
+    INT64: Struct('>q'),
+    FLOAT: Struct('>f'),
+    DOUBLE: Struct('>d')
+}
+# Format characters to pack or unpack many numbers by single call
+NUMBER_FORMATS = {
+    INT8: 'b',
+    UINT8: 'B',
+    INT16: 'h',
+    INT32: 'i',
+    INT64: 'q',
+    FLOAT: 'f',
+    DOUBLE: 'd'
+}
+LENGTH_STRUCTS = dict((tag, NUMBER_STRUCTS[tag])
+                      for tag in (INT8, UINT8, INT16, INT32, INT64))
+# Same lookups, but by marker code to not deal with bytes in the buffer
+NUMBER_STRUCTS_BY_CODE = [NUMBER_STRUCTS.get(CHARS[i]) for i in range(256)]
+LENGTH_STRUCTS_BY_CODE = [LENGTH_STRUCTS.get(CHARS[i]) for i in range(256)]
+STRING_CODES = set(map(ord, STRINGS))
+SIMPLE_CODES = set(map(ord, CONSTANTS | CONTAINERS))
+INT8_CODE = ord(INT8)
+UINT8_CODE = ord(UINT8)
+CHAR_CODE = ord(CHAR)
+STRING_CODE = ord(STRING)
+ARRAY_OPEN_CODE = ord(ARRAY_OPEN)
+ARRAY_CLOSE_CODE = ord(ARRAY_CLOSE)
+OBJECT_OPEN_CODE = ord(OBJECT_OPEN)
+OBJECT_CLOSE_CODE = ord(OBJECT_CLOSE)
+CONSTANT_VALUES = {ord(NULL): None, ord(FALSE): False, ord(TRUE): True}
+
+CONTAINER_MODES = ('stream', 'eager')
+# Lazy containers need random access to data
+BUFFER_CONTAINER_MODES = CONTAINER_MODES + ('lazy',)
+
+# Precomputed encoded data for the most common values
+SMALL_INTS = dict((i, INT8 + CHARS[i % 256]) for i in range(-128, 128))
+SMALL_INTS.update((i, UINT8 + CHARS[i]) for i in range(128, 256))
+STRING_HEADERS = [STRING + INT8 + CHARS[i] for i in range(128)]
+STRING_HEADERS.extend(STRING + UINT8 + CHARS[i] for i in range(128, 256))
+STRING_HEADERS[1] = CHAR
+
+# Integer types from the narrowest one with their bounds
+INTEGER_RANGES = (
+    (INT8, -2 ** 7, 2 ** 7 - 1),
+    (UINT8, 0, 2 ** 8 - 1),
+    (INT16, -2 ** 15, 2 ** 15 - 1),
+    (INT32, -2 ** 31, 2 ** 31 - 1),
+    (INT64, -2 ** 63, 2 ** 63 - 1)
+)
+INTEGER_TYPES = frozenset([int, long])
+#: Ranges of integers that are written with narrower marker than the key one.
+NARROWER_RANGES = {
+    UINT8: (-2 ** 7, 2 ** 7 - 1),
+    INT16: (-2 ** 7, 2 ** 8 - 1),
+    INT32: (-2 ** 15, 2 ** 15 - 1),
+    INT64: (-2 ** 31, 2 ** 31 - 1)
+}
+NUMERIC_SEQUENCES = frozenset([list, tuple, array])
+
+__all__ = ['Draft9Decoder', 'Draft9BufferDecoder', 'Draft9Encoder',
+           'Draft9BufferEncoder']
+
+
+def _common_number_type(items):
+    # Returns the narrowest number marker which fits all items or None if
+    # they are not numbers of the same kind. Exact float zeros fit any type
+    types = set(map(type, items))
+    if not types:
+        return None
+    if types <= INTEGER_TYPES:
+        low, high = min(items), max(items)
+        for marker, lower, upper in INTEGER_RANGES:
+            if lower <= low and high <= upper:
+                return marker
+    elif types == set([float]):
+        total = sum(items)
+        if total - total:
+            # There are infinities or NaNs
+            return None
+        magnitudes = [abs(item) for item in items if item]
+        if not magnitudes or (1.18e-38 <= min(magnitudes)
+                              and max(magnitudes) <= 3.4e38):
+            return FLOAT
+        return DOUBLE
+    return None
+
+
+def _fits_own_type(items, marker):
+    # Checks that items of the common number marker would be written with
+    # the same marker one by one, so packing them doesn't widen any item.
+    # Float zeros are the exception: they are written as floats to be
+    # decoded back as such instead of decimals
+    if marker == DOUBLE:
+        for item in items:
+            if 1.18e-38 <= abs(item) <= 3.4e38:
+                return False
+        return True
+    if marker in NARROWER_RANGES:
+        lower, upper = NARROWER_RANGES[marker]
+        for item in items:
+            if lower <= item <= upper:
+                return False
+    return True
 
 
 class Draft9Decoder(object):
@@ -100,22 +216,96 @@ class Draft9Decoder(object):
         wasn't passed as ``True``.
 
     (2)
-        Nested generators are automatically converted into lists.
+        Nested generators are automatically converted into lists. In
+        ``eager`` container mode all arrays are decoded as lists.
 
     (3)
         Unsized objects are represented as list of 2-element tuple with object
-        key and value.
+        key and value. In ``eager`` container mode all objects are decoded as
+        dicts.
+
+    Decoder options:
+
+    :param allow_noop: Allow to emit :const:`~simpleubjson.NOOP` values.
+    :type allow_noop: bool
+    :param container: Containers decoding mode. In ``stream`` mode (default)
+                      top-level containers are decoded lazily as generators.
+                      In ``eager`` mode lists and dicts are built directly.
+                      In ``lazy`` mode, supported only by
+                      :class:`Draft9BufferDecoder`, containers are decoded
+                      as :class:`~simpleubjson.lazy.LazyArray` and
+                      :class:`~simpleubjson.lazy.LazyObject` proxies.
+    :type container: str
+    :param object_hook: Callable that would be called with each decoded
+                        object (dict in ``eager`` mode, list of pairs
+                        otherwise). Its result is used instead of the object.
+    :param object_pairs_hook: Callable that would be called with list of
+                              key-value pairs of each decoded object. Takes
+                              priority over `object_hook`.
+    :param array_hook: Callable that would be called with list of each
+                       decoded array. Its result is used instead of the list.
+    :param string_cache: :class:`~simpleubjson.cache.InternCache` of object
+                         keys or ``True`` to create new one. Disabled by
+                         default since single value decoding wouldn't reuse
+                         it, while :class:`~simpleubjson.Codec`,
+                         :class:`~simpleubjson.Parser` and
+                         :func:`~simpleubjson.iter_decode` enable it.
+    :param intern_values: Put string values up to this length in bytes into
+                          `string_cache` as well.
+    :type intern_values: int
+    :param shape_tree: :class:`~simpleubjson.cache.ShapeTree` to speculate
+                       object keys by layout of previously decoded objects
+                       or ``True`` to create new one. Used only by
+                       :class:`Draft9BufferDecoder` when it builds
+                       containers as lists and dicts.
     """
     dispatch = {}
+    #: Markers that open containers.
+    openers = OPENERS
+    #: Supported container modes.
+    container_modes = CONTAINER_MODES
+
+    def __init__(self, source, allow_noop=False, container='stream',
+                 object_hook=None, object_pairs_hook=None, array_hook=None,
+                 string_cache=None, intern_values=0, shape_tree=None):
+        self.reset(source)
+        self.allow_noop = allow_noop
+        self.set_container_mode(container, object_hook, object_pairs_hook,
+                                array_hook)
+        if string_cache is True:
+            string_cache = InternCache()
+        self.strings = string_cache
+        self.intern_values = intern_values
+        if shape_tree is True:
+            shape_tree = ShapeTree()
+        self.shape_tree = shape_tree
+        self.dispatch = self.dispatch.copy()
+
+    def set_container_mode(self, container, object_hook=None,
+                           object_pairs_hook=None, array_hook=None):
+        if container not in self.container_modes:
+            raise ValueError('Unsupported container mode %r' % container)
+        self.container = container
+        self.object_hook = object_hook
+        self.object_pairs_hook = object_pairs_hook
+        self.array_hook = array_hook
+        # objects are build as dicts only if there is no need in pairs
+        self.dict_objects = container != 'stream' and object_pairs_hook is None
 
-    def __init__(self, source, allow_noop=False):
+    def reset(self, source):
+        """Switches decoder to the new source keeping all its options, so
+        single decoder instance could be reused to decode many messages."""
         if isinstance(source, unicode):
             source = source.encode('utf-8')
         if isinstance(source, bytes):
             source = BytesIO(source)
         self.read = source.read
-        self.allow_noop = allow_noop
-        self.dispatch = self.dispatch.copy()
+        self.tell = getattr(source, 'tell', None)
+        seekable = getattr(source, 'seekable', None)
+        if seekable is not None and seekable():
+            self.seek = source.seek
+        else:
+            self.seek = None
 
     def __iter__(self):
         return self
@@ -124,63 +314,82 @@ class Draft9Decoder(object):
         tag = self.read(1)
         while tag == NOOP and not self.allow_noop:
             tag = self.read(1)
-        if tag in NUMBERS:
-            if tag == INT8:
-                # Trivial operations for trivial cases saves a lot of time
-                value = ord(self.read(1))
-                if value > 128:
-                    value -= 256
-                    #value, = unpack('>b', self.read(1))
-            elif tag == UINT8:
-                value = ord(self.read(1))
-            elif tag == INT16:
-                value, = unpack('>h', self.read(2))
-            elif tag == INT32:
-                value, = unpack('>i', self.read(4))
-            elif tag == INT64:
-                value, = unpack('>q', self.read(8))
-            elif tag == FLOAT:
-                value, = unpack('>f', self.read(4))
-            elif tag == DOUBLE:
-                value, = unpack('>d', self.read(8))
-            else:
-                raise MarkerError('tag %r not in NUMBERS %r' % (tag, NUMBERS))
-            return tag, None, value
-        elif tag in STRINGS:
-            # Don't be recursive for string length calculation to save time
-            ltag = self.read(1)
-            if ltag == INT8:
-                length = ord(self.read(1))
-                if length > 128:
-                    length -= 256
-            elif ltag == UINT8:
-                length = ord(self.read(1))
-            elif ltag == INT16:
-                length, = unpack('>h', self.read(2))
-            elif ltag == INT32:
-                length, = unpack('>i', self.read(4))
-            elif ltag == INT64:
-                length, = unpack('>q', self.read(8))
-            elif not ltag:
-                raise EarlyEndOfStreamError('string length marker missed')
+        try:
+            if tag in NUMBERS:
+                if tag == INT8:
+                    # Trivial operations for trivial cases saves a lot of
+                    # time
+                    value = ord(self.read(1))
+                    if value > 127:
+                        value -= 256
+                        #value, = unpack('>b', self.read(1))
+                elif tag == UINT8:
+                    value = ord(self.read(1))
+                elif tag == INT16:
+                    value, = unpack('>h', self.read(2))
+                elif tag == INT32:
+                    value, = unpack('>i', self.read(4))
+                elif tag == INT64:
+                    value, = unpack('>q', self.read(8))
+                elif tag == FLOAT:
+                    value, = unpack('>f', self.read(4))
+                elif tag == DOUBLE:
+                    value, = unpack('>d', self.read(8))
+                else:
+                    raise MarkerError('tag %r not in NUMBERS %r'
+                                      '' % (tag, NUMBERS))
+                return tag, None, value
+            elif tag in STRINGS:
+                # Don't be recursive for string length calculation to save
+                # time
+                ltag = self.read(1)
+                if ltag == INT8:
+                    length = ord(self.read(1))
+                    if length > 127:
+                        length -= 256
+                elif ltag == UINT8:
+                    length = ord(self.read(1))
+                elif ltag == INT16:
+                    length, = unpack('>h', self.read(2))
+                elif ltag == INT32:
+                    length, = unpack('>i', self.read(4))
+                elif ltag == INT64:
+                    length, = unpack('>q', self.read(8))
+                elif not ltag:
+                    raise EarlyEndOfStreamError('string length marker missed')
+                else:
+                    raise MarkerError('invalid string size marker 0x%02X (%r)'
+                                      '' % (ord(ltag), ltag))
+                value = self.read(length)
+                if len(value) != length:
+                    raise EarlyEndOfStreamError('%r data is truncated' % tag)
+                return tag, length, value
+            elif tag == CHAR:
+                return tag, None, self.read(1)
+            elif tag in CONSTANTS or tag in CONTAINERS:
+                return tag, None, None
+            elif not tag:
+                raise NoDataError('nothing to decode')
             else:
-                raise MarkerError('invalid string size marker 0x%02X (%r)'
-                                  '' % (ord(ltag), ltag))
-            return tag, length, self.read(length)
-        elif tag == CHAR:
-            return tag, None, self.read(1)
-        elif tag in CONSTANTS or tag in CONTAINERS:
-            return tag, None, None
-        elif not tag:
-            raise EarlyEndOfStreamError('nothing to decode')
-        else:
-            raise MarkerError('invalid marker 0x%02x (%r)' % (ord(tag), tag))
+                raise MarkerError('invalid marker 0x%02x (%r)'
+                                  '' % (ord(tag), tag))
+        except (TypeError, StructError):
+            # ord() and unpack() fail on missed bytes
+            raise EarlyEndOfStreamError('%r value is truncated' % tag)
 
     def decode_next(self):
         tag, length, value = self.next_tlv()
         return self.dispatch[tag](self, tag, length, value)
 
-    __next__ = next = decode_next
+    def __next__(self):
+        # Clean end of data between values stops iteration, while truncated
+        # value still raises an error
+        try:
+            tag, length, value = self.next_tlv()
+        except NoDataError:
+            raise StopIteration
+        return self.dispatch[tag](self, tag, length, value)
+    next = __next__
 
     def decode_noop(self, tag, length, value):
         return NOOP_SENTINEL
@@ -216,6 +425,8 @@ class Draft9Decoder(object):
     dispatch[CHAR] = decode_char
 
     def decode_string(self, tag, length, value):
+        if self.strings is not None and 0 < length <= self.intern_values:
+            return self.strings.decode(value)
         return value.decode('utf-8')
     dispatch[STRING] = decode_string
 
@@ -223,9 +434,17 @@ class Draft9Decoder(object):
         return Decimal(value.decode('utf-8'))
     dispatch[HIDEF] = decode_hidef
 
+    def decode_key(self, tag, length, value):
+        """Decodes object key which marker is just read. String keys are
+        taken from `string_cache` if it's enabled."""
+        if tag == STRING and self.strings is not None:
+            return self.strings.decode(value)
+        return self.dispatch[tag](self, tag, length, value)
+
     def decode_array_stream(self, tag, length, value):
         dispatch = self.dispatch
         next_tlv = self.next_tlv
+        decode_container = self.decode_container
         array_close = ARRAY_CLOSE
         container_openers = set([ARRAY_OPEN, OBJECT_OPEN])
         def array_stream():
@@ -233,13 +452,11 @@ class Draft9Decoder(object):
                 tag, length, value = next_tlv()
                 if tag == array_close:
                     break
-                item = dispatch[tag](self, tag, length, value)
                 if tag in container_openers:
-                    yield list(item)
+                    yield decode_container(tag, length, value)
                 else:
-                    yield item
+                    yield dispatch[tag](self, tag, length, value)
         return array_stream()
-    dispatch[ARRAY_OPEN] = decode_array_stream
 
     def decode_array_close(self, tag, length, value):
         raise EarlyEndOfStreamError
@@ -250,6 +467,7 @@ class Draft9Decoder(object):
             key = None
             dispatch = self.dispatch
             next_tlv = self.next_tlv
+            decode_container = self.decode_container
             noop = NOOP
             noop_sentinel = NOOP_SENTINEL
             object_close = OBJECT_CLOSE
@@ -268,23 +486,669 @@ class Draft9Decoder(object):
                     break
                 elif key is None and tag not in object_keys:
                     raise MarkerError('key should be string, got %r' % (tag))
+                elif key is None:
+                    key = self.decode_key(tag, length, value)
+                elif tag in container_openers:
+                    yield key, decode_container(tag, length, value)
+                    key = None
                 else:
-                    value = dispatch[tag](self, tag, length, value)
-                    if key is None:
-                        key = value
-                    elif tag in container_openers:
-                        yield key, list(value)
-                        key = None
-                    else:
-                        yield key, value
-                        key = None
+                    yield key, dispatch[tag](self, tag, length, value)
+                    key = None
         return object_stream()
-    dispatch[OBJECT_OPEN] = decode_object_stream
+
+    def decode_array(self, tag, length, value):
+        if self.container == 'stream':
+            return self.decode_array_stream(tag, length, value)
+        if self.container == 'lazy':
+            return self.decode_lazy(tag, length, value)
+        return self.decode_container(tag, length, value)
+    dispatch[ARRAY_OPEN] = decode_array
+
+    def decode_object(self, tag, length, value):
+        if self.container == 'stream':
+            return self.decode_object_stream(tag, length, value)
+        if self.container == 'lazy':
+            return self.decode_lazy(tag, length, value)
+        return self.decode_container(tag, length, value)
+    dispatch[OBJECT_OPEN] = decode_object
 
     def decode_object_close(self, tag, length, value):
         raise EarlyEndOfStreamError
     dispatch[OBJECT_CLOSE] = decode_object_close
 
+    def decode_container(self, tag, length, value):
+        """Decodes whole container which opening marker is just read.
+
+        Nested containers are handled with explicit stack of frames instead
+        of recursion, so nesting depth is limited only by available memory.
+        Arrays are decoded as lists, objects as dicts in ``eager`` container
+        mode or as lists of 2-element tuples with object key and value
+        otherwise. Container hooks are applied.
+        """
+        return self.decode_frames([self.new_frame(tag, length)])
+
+    def new_frame(self, tag, length):
+        """Returns decoding frame for container with specified marker and
+        length. See :meth:`decode_frames` for details."""
+        if tag == OBJECT_OPEN:
+            return {} if self.dict_objects else [], True, None
+        return [], False, None
+
+    def decode_frames(self, frames):
+        """Decodes containers which state is described by stack of `frames`
+        till the bottom one is complete and returns it.
+
+        Each frame is a tuple of container object, flag whether it's object or
+        array and object key which value is expected (``None`` if there is no
+        such). If decoding fails, state of current container is pushed back to
+        the `frames`, so it could be resumed once the reason is fixed.
+        """
+        next_tlv = self.next_tlv
+        dispatch = self.dispatch
+        decode_key = self.decode_key
+        noop = NOOP
+        noop_sentinel = NOOP_SENTINEL
+        object_keys = OBJECT_KEYS
+        dict_objects = self.dict_objects
+        object_hook = self.object_pairs_hook or self.object_hook
+        array_hook = self.array_hook
+        container, is_object, key = frames.pop()
+        try:
+            while 1:
+                tag, length, value = next_tlv()
+                if tag == ARRAY_OPEN or tag == OBJECT_OPEN:
+                    if is_object and key is None:
+                        raise MarkerError('key should be string, got %r'
+                                          '' % tag)
+                    frames.append((container, is_object, key))
+                    is_object = tag == OBJECT_OPEN
+                    container = {} if is_object and dict_objects else []
+                    key = None
+                    continue
+                elif tag == ARRAY_CLOSE or tag == OBJECT_CLOSE:
+                    if is_object != (tag == OBJECT_CLOSE):
+                        raise MarkerError('unexpected container end marker %r'
+                                          '' % tag)
+                    if key is not None:
+                        raise EarlyEndOfStreamError(
+                            'value missed for key %r' % key)
+                    value = container
+                    if is_object:
+                        if object_hook is not None:
+                            value = object_hook(value)
+                    elif array_hook is not None:
+                        value = array_hook(value)
+                    if not frames:
+                        return value
+                    container, is_object, key = frames.pop()
+                elif tag == noop:
+                    if is_object:
+                        if key is None:
+                            if dict_objects:
+                                container[noop_sentinel] = noop_sentinel
+                            else:
+                                container.append((noop_sentinel,
+                                                  noop_sentinel))
+                        continue
+                    value = noop_sentinel
+                elif is_object and key is None:
+                    if tag not in object_keys:
+                        raise MarkerError('key should be string, got %r'
+                                          '' % tag)
+                    key = decode_key(tag, length, value)
+                    continue
+                else:
+                    value = dispatch[tag](self, tag, length, value)
+                if is_object:
+                    if dict_objects:
+                        container[key] = value
+                    else:
+                        container.append((key, value))
+                    key = None
+                else:
+                    container.append(value)
+        except BaseException:
+            frames.append((container, is_object, key))
+            raise
+
+    def skip(self, size):
+        """Skips `size` bytes of the source. Seekable sources are seeked
+        instead of reading skipped data."""
+        if self.seek is not None and size > 1:
+            # Only the last byte is read to make sure data isn't truncated
+            self.seek(size - 1, SEEK_CUR)
+            size = 1
+        if len(self.read(size)) != size:
+            raise EarlyEndOfStreamError('%d bytes expected to skip' % size)
+
+    def skip_value(self, tag=None, length=None):
+        """Skips the next value without decoding it: payload of strings and
+        numbers is stepped over by its length and containers are walked
+        through by their markers. If `tag` of just read container opening
+        marker is passed, skips the rest of that container instead.
+
+        Container items are not validated while skipping.
+        """
+        if tag is None:
+            depth = 0
+        elif tag in OPENERS:
+            depth = 1
+        else:
+            return
+        read = self.read
+        skip = self.skip
+        while 1:
+            tag = read(1)
+            if tag in NUMBERS:
+                skip(NUMBER_STRUCTS[tag].size)
+            elif tag in STRINGS:
+                ltag = read(1)
+                struct = LENGTH_STRUCTS.get(ltag)
+                if struct is None:
+                    if not ltag:
+                        raise EarlyEndOfStreamError('string length marker'
+                                                    ' missed')
+                    raise MarkerError('invalid string size marker 0x%02X'
+                                      ' (%r)' % (ord(ltag), ltag))
+                try:
+                    length, = struct.unpack(read(struct.size))
+                except StructError:
+                    raise EarlyEndOfStreamError('string length is truncated')
+                if length < 0:
+                    raise MarkerError('negative string length %d' % length)
+                skip(length)
+            elif tag == CHAR:
+                skip(1)
+            elif tag == ARRAY_OPEN or tag == OBJECT_OPEN:
+                depth += 1
+                continue
+            elif tag == ARRAY_CLOSE or tag == OBJECT_CLOSE:
+                if not depth:
+                    raise MarkerError('unexpected container end %r' % tag)
+                depth -= 1
+            elif tag == NOOP:
+                if depth or not self.allow_noop:
+                    continue
+            elif tag in CONSTANTS:
+                pass
+            elif not tag:
+                if depth:
+                    raise EarlyEndOfStreamError('unexpected end of data')
+                raise NoDataError('nothing to skip')
+            else:
+                raise MarkerError('invalid marker 0x%02x (%r)'
+                                  '' % (ord(tag), tag))
+            if not depth:
+                return
+
+    def iter_container(self, tag, length=None):
+        """Iterates over items of container which opening marker `tag` is
+        just read. Yields ``(key, tag, length, value)`` tuple for each item,
+        where key is decoded object key or ``None`` for array items and the
+        rest is the result of :meth:`next_tlv` for item marker. Each item
+        should be either decoded or skipped before the next one is requested.
+        """
+        next_tlv = self.next_tlv
+        dispatch = self.dispatch
+        is_object = tag == OBJECT_OPEN
+        close = OBJECT_CLOSE if is_object else ARRAY_CLOSE
+        key = None
+        try:
+            while 1:
+                tag, length, value = next_tlv()
+                if tag == close:
+                    return
+                if is_object:
+                    if tag == NOOP:
+                        continue
+                    if tag not in OBJECT_KEYS:
+                        raise MarkerError('key should be string, got %r'
+                                          '' % tag)
+                    key = self.decode_key(tag, length, value)
+                    tag, length, value = next_tlv()
+                if tag == ARRAY_CLOSE or tag == OBJECT_CLOSE:
+                    raise MarkerError('unexpected container end %r' % tag)
+                yield key, tag, length, value
+        except NoDataError:
+            raise EarlyEndOfStreamError('container end is missed')
+
+    def iter_events(self):
+        """Iterates over parsing events of all values till the end of data
+        without building containers. Each event is a tuple of its name, value
+        and offset of its marker in bytes:
+
+        - ``('start_array', None, offset)``
+        - ``('end_array', None, offset)``
+        - ``('start_object', None, offset)``
+        - ``('end_object', None, offset)``
+        - ``('key', key, offset)``
+        - ``('value', value, offset)`` for numbers, strings and constants
+
+        `NoOp` markers are reported as values within arrays and at the top
+        level and are ignored in objects. Requires source with `.tell()`.
+        """
+        next_tlv = self.next_tlv
+        dispatch = self.dispatch
+        tell = self.tell
+        stack = []
+        is_object = expect_key = False
+        while 1:
+            offset = tell()
+            try:
+                tag, length, value = next_tlv()
+            except NoDataError:
+                if stack:
+                    raise EarlyEndOfStreamError('unexpected end of data at %d'
+                                                '' % offset)
+                return
+            if tag == ARRAY_OPEN or tag == OBJECT_OPEN:
+                if expect_key:
+                    raise MarkerError('key should be string, got %r' % tag)
+                stack.append(is_object)
+                if tag == ARRAY_OPEN:
+                    is_object = expect_key = False
+                    yield 'start_array', None, offset
+                else:
+                    is_object = expect_key = True
+                    yield 'start_object', None, offset
+            elif tag == ARRAY_CLOSE or tag == OBJECT_CLOSE:
+                if not stack or is_object != (tag == OBJECT_CLOSE):
+                    raise MarkerError('unexpected container end %r' % tag)
+                if is_object and not expect_key:
+                    raise EarlyEndOfStreamError('value missed for the key')
+                yield ('end_object' if is_object else 'end_array',
+                       None, offset)
+                is_object = expect_key = stack.pop()
+            elif expect_key:
+                if tag == NOOP:
+                    continue
+                if tag not in OBJECT_KEYS:
+                    raise MarkerError('key should be string, got %r' % tag)
+                expect_key = False
+                yield 'key', self.decode_key(tag, length, value), offset
+            else:
+                if tag == NOOP:
+                    if is_object:
+                        continue
+                    value = NOOP_SENTINEL
+                else:
+                    value = dispatch[tag](self, tag, length, value)
+                expect_key = is_object
+                yield 'value', value, offset
+
+
+class Draft9BufferDecoder(Draft9Decoder):
+    """Decoder of UBJSON data that walks over in-memory buffer with integer
+    offset instead of reading it chunk by chunk from stream.
+
+    Source could be :class:`bytes`, :class:`bytearray`, :class:`memoryview` or
+    any other object that supports buffer protocol. Source is never copied as
+    whole: only strings payload is sliced out of it to get decoded. Data
+    mapping is the same as for :class:`Draft9Decoder`.
+
+    Containers are decoded with inlined parsing of the most common markers.
+    If `dispatch` table differs from the :class:`Draft9Decoder` one, they
+    are decoded through the table instead, so overridden handlers apply.
+    """
+    container_modes = BUFFER_CONTAINER_MODES
+
+    def reset(self, source):
+        if isinstance(source, unicode):
+            source = source.encode('utf-8')
+        self.buf = byteview(source)
+        self.size = len(self.buf)
+        self.offset = 0
+
+    def read(self, size):
+        start = self.offset
+        self.offset = min(start + size, self.size)
+        return bytes(self.buf[start:self.offset])
+
+    def tell(self):
+        return self.offset
+
+    def skip(self, size):
+        end = self.offset + size
+        if end > self.size:
+            raise EarlyEndOfStreamError('%d bytes expected to skip' % size)
+        self.offset = end
+
+    def next_tlv(self):
+        buf = self.buf
+        pos = self.offset
+        try:
+            code = buf[pos]
+            while code == NOOP_CODE and not self.allow_noop:
+                pos += 1
+                code = buf[pos]
+        except IndexError:
+            self.offset = pos
+            raise NoDataError('nothing to decode')
+        pos += 1
+        tag = CHARS[code]
+        struct = NUMBER_STRUCTS_BY_CODE[code]
+        try:
+            if struct is not None:
+                value, = struct.unpack_from(buf, pos)
+                self.offset = pos + struct.size
+                return tag, None, value
+            elif code in STRING_CODES:
+                lcode = buf[pos]
+                if lcode == INT8_CODE or lcode == UINT8_CODE:
+                    # Trivial operations for trivial cases saves a lot of
+                    # time
+                    length = buf[pos + 1]
+                    if length > 127 and lcode == INT8_CODE:
+                        raise MarkerError('negative string length %d'
+                                          '' % (length - 256))
+                    pos += 2
+                else:
+                    struct = LENGTH_STRUCTS_BY_CODE[lcode]
+                    if struct is None:
+                        raise MarkerError('invalid string size marker 0x%02X'
+                                          ' (%r)' % (lcode, CHARS[lcode]))
+                    length, = struct.unpack_from(buf, pos + 1)
+                    if length < 0:
+                        raise MarkerError('negative string length %d'
+                                          '' % length)
+                    pos += 1 + struct.size
+                end = pos + length
+                if end > self.size:
+                    raise EarlyEndOfStreamError('string data is truncated')
+                self.offset = end
+                value = buf[pos:end]
+                if not isinstance(value, bytes):
+                    value = bytes(value)
+                return tag, length, value
+            elif code in SIMPLE_CODES:
+                self.offset = pos
+                return tag, None, None
+            elif tag == CHAR:
+                self.offset = pos + 1
+                return tag, None, CHARS[buf[pos]]
+        except (IndexError, StructError):
+            raise EarlyEndOfStreamError('%r value is truncated' % tag)
+        raise MarkerError('invalid marker 0x%02x (%r)' % (code, tag))
+
+    def skip_value(self, tag=None, length=None):
+        if tag is None:
+            depth = 0
+        elif tag in OPENERS:
+            depth = 1
+        else:
+            return
+        buf = self.buf
+        pos = self.offset
+        allow_noop = self.allow_noop
+        started = depth
+        try:
+            while 1:
+                code = buf[pos]
+                pos += 1
+                started = True
+                struct = NUMBER_STRUCTS_BY_CODE[code]
+                if struct is not None:
+                    pos += struct.size
+                elif code in STRING_CODES:
+                    lcode = buf[pos]
+                    struct = LENGTH_STRUCTS_BY_CODE[lcode]
+                    if struct is None:
+                        raise MarkerError('invalid string size marker 0x%02X'
+                                          ' (%r)' % (lcode, CHARS[lcode]))
+                    length, = struct.unpack_from(buf, pos + 1)
+                    if length < 0:
+                        raise MarkerError('negative string length %d'
+                                          '' % length)
+                    pos += 1 + struct.size + length
+                elif code == CHAR_CODE:
+                    pos += 1
+                elif code == ARRAY_OPEN_CODE or code == OBJECT_OPEN_CODE:
+                    depth += 1
+                    continue
+                elif code == ARRAY_CLOSE_CODE or code == OBJECT_CLOSE_CODE:
+                    if not depth:
+                        raise MarkerError('unexpected container end %r'
+                                          '' % CHARS[code])
+                    depth -= 1
+                elif code == NOOP_CODE:
+                    if depth or not allow_noop:
+                        started = depth
+                        continue
+                elif code not in SIMPLE_CODES:
+                    raise MarkerError('invalid marker 0x%02x (%r)'
+                                      '' % (code, CHARS[code]))
+                if not depth:
+                    break
+        except (IndexError, StructError):
+            if not started:
+                raise NoDataError('nothing to skip')
+            raise EarlyEndOfStreamError('unexpected end of data at %d'
+                                        '' % pos)
+        if pos > self.size:
+            raise EarlyEndOfStreamError('value is truncated')
+        self.offset = pos
+
+    def decode_lazy(self, tag, length, value):
+        """Returns lazy proxy of container which opening marker is just
+        read and skips it. Proxies of the same value share own copy of
+        decoder, so this one could be reset or reused for the next value."""
+        start = self.offset
+        self.skip_value(tag, length)
+        decoder = copy(self)
+        # NoOps are meaningless for random access
+        decoder.allow_noop = False
+        if tag == OBJECT_OPEN:
+            return LazyObject(decoder, start)
+        return LazyArray(decoder, start)
+
+    def decode_at(self, offset):
+        """Decodes value at specified offset. Nested containers are
+        returned as lazy proxies."""
+        self.offset = offset
+        tag, length, value = self.next_tlv()
+        if tag == OBJECT_OPEN:
+            return LazyObject(self, self.offset)
+        if tag == ARRAY_OPEN:
+            return LazyArray(self, self.offset)
+        return self.dispatch[tag](self, tag, length, value)
+
+    def index_container(self, offset, is_object):
+        """Returns offsets of items of container which first item is at
+        specified offset: list for array and dict by keys for object. Items
+        are only skipped, but object keys are decoded."""
+        buf = self.buf
+        dispatch = self.dispatch
+        close_code = OBJECT_CLOSE_CODE if is_object else ARRAY_CLOSE_CODE
+        index = {} if is_object else []
+        pos = offset
+        while 1:
+            while buf[pos] == NOOP_CODE:
+                pos += 1
+            if buf[pos] == close_code:
+                return index
+            self.offset = pos
+            if is_object:
+                tag, length, value = self.next_tlv()
+                if tag not in OBJECT_KEYS:
+                    raise MarkerError('key should be string, got %r' % tag)
+                key = self.decode_key(tag, length, value)
+                index[key] = self.offset
+            else:
+                index.append(pos)
+            self.skip_value()
+            pos = self.offset
+
+    def materialize(self, offset, is_object):
+        """Decodes container which first item is at specified offset to
+        lists and dicts. Container hooks are applied."""
+        self.offset = offset
+        tag = OBJECT_OPEN if is_object else ARRAY_OPEN
+        return self.decode_frames([self.new_frame(tag, None)])
+
+    def decode_frames(self, frames):
+        # Same as Draft9Decoder.decode_frames, but with inlined markers
+        # parsing for the most common types: it's twice faster than calling
+        # next_tlv and dispatch handlers for each value. With shape tree
+        # object keys are compared with the expected ones before parsing
+        if self.dispatch != Draft9Decoder.dispatch:
+            return Draft9Decoder.decode_frames(self, frames)
+        buf = self.buf
+        size = self.size
+        pos = start = self.offset
+        dispatch = self.dispatch
+        allow_noop = self.allow_noop
+        number_structs = NUMBER_STRUCTS_BY_CODE
+        length_structs = LENGTH_STRUCTS_BY_CODE
+        constants = CONSTANT_VALUES
+        noop_sentinel = NOOP_SENTINEL
+        dict_objects = self.dict_objects
+        object_hook = self.object_pairs_hook or self.object_hook
+        array_hook = self.array_hook
+        strings = self.strings
+        intern_values = self.intern_values if strings is not None else -1
+        tree = self.shape_tree
+        # Shapes of containers in frames, None for unknown ones. Arrays have
+        # shapes only to nest their items; they may be shared with objects,
+        # so keys are speculated only within objects
+        shapes = []
+        hits = 0
+        container, is_object, key = frames.pop()
+        if tree is not None and not container:
+            shape = tree.root
+        else:
+            shape = None
+        try:
+            while 1:
+                start = pos
+                if shape is not None and is_object and key is None:
+                    expected = shape[0]
+                    if expected is not None:
+                        end = pos + len(expected)
+                        if buf[pos:end] == expected:
+                            key = shape[1]
+                            shape = shape[2]
+                            pos = end
+                            hits += 1
+                            continue
+                code = buf[pos]
+                pos += 1
+                struct = number_structs[code]
+                if struct is not None:
+                    value, = struct.unpack_from(buf, pos)
+                    pos += struct.size
+                elif code == STRING_CODE:
+                    lcode = buf[pos]
+                    if lcode == INT8_CODE or lcode == UINT8_CODE:
+                        length = buf[pos + 1]
+                        if length > 127 and lcode == INT8_CODE:
+                            raise MarkerError('negative string length %d'
+                                              '' % (length - 256))
+                        pos += 2
+                    else:
+                        struct = length_structs[lcode]
+                        if struct is None:
+                            raise MarkerError('invalid string size marker'
+                                              ' 0x%02X (%r)'
+                                              '' % (lcode, CHARS[lcode]))
+                        length, = struct.unpack_from(buf, pos + 1)
+                        if length < 0:
+                            raise MarkerError('negative string length %d'
+                                              '' % length)
+                        pos += 1 + struct.size
+                    end = pos + length
+                    if end > size:
+                        raise IndexError
+                    value = buf[pos:end]
+                    if not isinstance(value, bytes):
+                        value = bytes(value)
+                    if 0 < length <= intern_values or (
+                            is_object and key is None
+                            and strings is not None):
+                        value = strings.decode(value)
+                    else:
+                        value = value.decode('utf-8')
+                    pos = end
+                elif code in constants:
+                    value = constants[code]
+                elif code == ARRAY_OPEN_CODE or code == OBJECT_OPEN_CODE:
+                    if is_object and key is None:
+                        raise MarkerError('key should be string, got %r'
+                                          '' % CHARS[code])
+                    frames.append((container, is_object, key))
+                    is_object = code == OBJECT_OPEN_CODE
+                    container = {} if is_object and dict_objects else []
+                    key = None
+                    if tree is not None:
+                        shapes.append(shape)
+                        if shape is not None:
+                            shape = shape[4] or tree.nest(shape)
+                    continue
+                elif code == ARRAY_CLOSE_CODE or code == OBJECT_CLOSE_CODE:
+                    if is_object != (code == OBJECT_CLOSE_CODE):
+                        raise MarkerError('unexpected container end marker %r'
+                                          '' % CHARS[code])
+                    if key is not None:
+                        raise EarlyEndOfStreamError(
+                            'value missed for key %r' % key)
+                    value = container
+                    if is_object:
+                        if object_hook is not None:
+                            value = object_hook(value)
+                    elif array_hook is not None:
+                        value = array_hook(value)
+                    if not frames:
+                        self.offset = pos
+                        return value
+                    container, is_object, key = frames.pop()
+                    shape = shapes.pop() if shapes else None
+                elif code == NOOP_CODE:
+                    if not allow_noop:
+                        continue
+                    if is_object:
+                        if key is None:
+                            if dict_objects:
+                                container[noop_sentinel] = noop_sentinel
+                            else:
+                                container.append((noop_sentinel,
+                                                  noop_sentinel))
+                        continue
+                    value = noop_sentinel
+                else:
+                    # Rare and invalid markers are handled in regular way
+                    self.offset = start
+                    tag, length, value = self.next_tlv()
+                    pos = self.offset
+                    value = dispatch[tag](self, tag, length, value)
+                if is_object:
+                    if key is None:
+                        if code != STRING_CODE and code != CHAR_CODE:
+                            raise MarkerError('key should be string, got %r'
+                                              '' % CHARS[code])
+                        key = value
+                        if shape is not None:
+                            shape = tree.follow(shape, bytes(buf[start:pos]),
+                                                key)
+                    else:
+                        if dict_objects:
+                            container[key] = value
+                        else:
+                            container.append((key, value))
+                        key = None
+                else:
+                    container.append(value)
+        except (IndexError, StructError):
+            self.offset = start
+            frames.append((container, is_object, key))
+            raise EarlyEndOfStreamError('unexpected end of data at %d'
+                                        '' % start)
+        except BaseException:
+            self.offset = start
+            frames.append((container, is_object, key))
+            raise
+        finally:
+            if tree is not None:
+                tree.hits += hits
+
 
 class Draft9Encoder(object):
     """Encoder of Python objects into UBJSON data following Draft 9
@@ -469,3 +1333,224 @@ class Draft9Encoder(object):
         yield OBJECT_CLOSE
     dispatch[dict] = encode_dict
     dispatch[dict_itemsiterator] = encode_dict
+
+
+class Draft9BufferEncoder(Draft9Encoder):
+    """Encoder of Python objects into UBJSON data following Draft 9
+    specification that writes all markers and payload into single growing
+    buffer instead of joining encoded data on each container level.
+
+    Produces the same data and follows the same mapping as
+    :class:`Draft9Encoder`, plus :class:`array.array` is encoded as array.
+
+    :param default: Callable object that would be used if there is no
+                    handlers matched for Python data type.
+    :param numeric_arrays: Detect lists, tuples and arrays of numbers of the
+                           same kind and pack them by single call if all
+                           items have the same narrowest type. Every item
+                           still has own marker, so arrays of numbers of
+                           different types are written item by item to not
+                           widen them.
+    :type numeric_arrays: bool
+    :param shape_cache: :class:`~simpleubjson.cache.ShapeCache` of dicts keys
+                        or ``True`` to create new one. Disabled by default
+                        since single value encoding wouldn't reuse it, while
+                        :class:`~simpleubjson.Codec` enables it.
+    """
+
+    dispatch = {}
+
+    def __init__(self, default=None, numeric_arrays=False, shape_cache=None):
+        super(Draft9BufferEncoder, self).__init__(default)
+        self.numeric_arrays = numeric_arrays
+        if shape_cache is True:
+            shape_cache = ShapeCache()
+        self.shapes = shape_cache
+
+    def encode_next(self, obj):
+        buf = bytearray()
+        self.write_next(obj, buf)
+        return bytes(buf)
+
+    def write_next(self, obj, buf):
+        tobj = type(obj)
+        if tobj in self.dispatch:
+            self.dispatch[tobj](self, obj, buf)
+        else:
+            self.write_next(self._default(obj), buf)
+
+    def write_noop(self, obj, buf):
+        buf += NOOP
+    dispatch[type(NOOP_SENTINEL)] = write_noop
+
+    def write_none(self, obj, buf):
+        buf += NULL
+    dispatch[type(None)] = write_none
+
+    def write_bool(self, obj, buf):
+        buf += TRUE if obj else FALSE
+    dispatch[bool] = write_bool
+
+    def write_int(self, obj, buf):
+        if -128 <= obj <= 255:
+            buf += SMALL_INTS[obj]
+        else:
+            buf += self.encode_int(obj)
+    dispatch[int] = write_int
+    dispatch[long] = write_int
+
+    def write_float(self, obj, buf):
+        buf += self.encode_float(obj)
+    dispatch[float] = write_float
+
+    def _write_str(self, obj, buf):
+        length = len(obj)
+        if length < 256:
+            buf += STRING_HEADERS[length]
+        else:
+            buf += STRING
+            buf += self.encode_int(length)
+        buf += obj
+
+    def write_bytes(self, obj, buf):
+        try:
+            obj.decode('utf-8')
+        except UnicodeDecodeError:
+            raise EncodeError('Invalid UTF-8 byte string: %r' % obj)
+        else:
+            self._write_str(obj, buf)
+    dispatch[bytes] = write_bytes
+
+    def write_str(self, obj, buf):
+        self._write_str(obj.encode('utf-8'), buf)
+    dispatch[unicode] = write_str
+
+    def write_decimal(self, obj, buf):
+        buf += self.encode_decimal(obj)
+    dispatch[Decimal] = write_decimal
+
+    def _write_items(self, obj, buf):
+        dispatch = self.dispatch
+        for item in obj:
+            titem = type(item)
+            if titem in dispatch:
+                dispatch[titem](self, item, buf)
+            else:
+                self.write_next(item, buf)
+
+    def write_numbers(self, obj, marker, buf):
+        """Writes array of numbers that all fit `marker` type. Numbers are
+        packed at once and then markers are interleaved with them if it's
+        the narrowest type of each of them."""
+        if not _fits_own_type(obj, marker):
+            buf += ARRAY_OPEN
+            self._write_items(obj, buf)
+            buf += ARRAY_CLOSE
+            return
+        count = len(obj)
+        size = NUMBER_STRUCTS[marker].size
+        data = pack('>%d%s' % (count, NUMBER_FORMATS[marker]), *obj)
+        run = bytearray((size + 1) * count)
+        run[::size + 1] = marker * count
+        for i in range(size):
+            run[i + 1::size + 1] = data[i::size]
+        buf += ARRAY_OPEN
+        buf += run
+        buf += ARRAY_CLOSE
+
+    def write_sequence(self, obj, buf):
+        if self.numeric_arrays and type(obj) in NUMERIC_SEQUENCES:
+            marker = _common_number_type(obj)
+            if marker is not None:
+                return self.write_numbers(obj, marker, buf)
+        buf += ARRAY_OPEN
+        self._write_items(obj, buf)
+        buf += ARRAY_CLOSE
+    dispatch[tuple] = write_sequence
+    dispatch[list] = write_sequence
+    dispatch[array] = write_sequence
+    dispatch[type((i for i in ()))] = write_sequence
+    dispatch[set] = write_sequence
+    dispatch[frozenset] = write_sequence
+    dispatch[xrange] = write_sequence
+    dispatch[dict_keysiterator] = write_sequence
+    dispatch[dict_valuesiterator] = write_sequence
+
+    def _write_pairs(self, items, buf):
+        dispatch = self.dispatch
+        write_str = self._write_str
+        for key, value in items:
+            if isinstance(key, unicode):
+                write_str(key.encode('utf-8'), buf)
+            elif isinstance(key, bytes):
+                self.write_bytes(key, buf)
+            else:
+                raise EncodeError('invalid object key %r' % key)
+            tvalue = type(value)
+            if tvalue in dispatch:
+                dispatch[tvalue](self, value, buf)
+            else:
+                self.write_next(value, buf)
+
+    def encode_key(self, key):
+        """Returns encoded object `key`."""
+        buf = bytearray()
+        if isinstance(key, unicode):
+            self._write_str(key.encode('utf-8'), buf)
+        elif isinstance(key, bytes):
+            self.write_bytes(key, buf)
+        else:
+            raise EncodeError('invalid object key %r' % key)
+        return bytes(buf)
+
+    def _write_values(self, keys, values, buf):
+        dispatch = self.dispatch
+        for key, value in zip(keys, values):
+            buf += key
+            tvalue = type(value)
+            if tvalue in dispatch:
+                dispatch[tvalue](self, value, buf)
+            else:
+                self.write_next(value, buf)
+
+    def write_dict(self, obj, buf):
+        buf += OBJECT_OPEN
+        if not isinstance(obj, dict):
+            self._write_pairs(obj, buf)
+        elif self.shapes is not None and len(obj) <= MAX_SHAPE_KEYS:
+            keys = self.shapes.encode(tuple(obj), self.encode_key)
+            if keys is None:
+                self._write_pairs(obj.items(), buf)
+            else:
+                self._write_values(keys, obj.values(), buf)
+        else:
+            self._write_pairs(obj.items(), buf)
+        buf += OBJECT_CLOSE
+    dispatch[dict] = write_dict
+    dispatch[dict_itemsiterator] = write_dict
+
+    def iter_encode(self, obj, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Encodes `obj` by chunks of about `chunk_size` bytes. Top-level
+        arrays and objects are split between their items, so encoded data
+        could be sent while the rest items are not encoded yet."""
+        buf = bytearray()
+        handler = self.dispatch.get(type(obj))
+        if handler is self.write_sequence.__func__:
+            buf += ARRAY_OPEN
+            items, write, tail = obj, self._write_items, ARRAY_CLOSE
+        elif handler is self.write_dict.__func__:
+            buf += OBJECT_OPEN
+            if isinstance(obj, dict):
+                obj = obj.items()
+            items, write, tail = obj, self._write_pairs, OBJECT_CLOSE
+        else:
+            self.write_next(obj, buf)
+            items, write, tail = (), None, bytes()
+        for item in items:
+            write((item,), buf)
+            if len(buf) >= chunk_size:
+                yield bytes(buf)
+                del buf[:]
+        buf += tail
+        if buf:
+            yield bytes(buf)
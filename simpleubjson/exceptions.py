@@ -20,5 +20,9 @@ class EarlyEndOfStreamError(DecodeError):
     """Raises when data stream unexpectedly ends."""
 
 
+class NoDataError(EarlyEndOfStreamError):
+    """Raises when data stream ends before the next value starts."""
+
+
 class EncodeError(TypeError):
     """Python object encoding error."""
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+"""Lazy proxies of UBJSON containers returned by
+:class:`~simpleubjson.draft9.Draft9BufferDecoder` in ``lazy`` container
+mode::
+
+    >>> doc = decode(data, container='lazy')
+    >>> doc['user']['id']
+    42
+
+Proxies keep offsets of their items in the original buffer, so only the
+requested items are decoded, strings included.
+"""
+
+from .compat import Mapping, Sequence
+
+__all__ = ['LazyObject', 'LazyArray', 'materialize']
+
+
+class LazyContainer(object):
+    """Base of lazy container proxies. Proxy keeps decoder over the original
+    buffer and offset of the first container item. Items are indexed on the
+    first access and each of them is decoded only when it's requested."""
+
+    is_object = False
+
+    def __init__(self, decoder, offset):
+        self._decoder = decoder
+        self._offset = offset
+        self._index = None
+        self._values = {}
+
+    def __repr__(self):
+        return '<%s at offset %d>' % (type(self).__name__, self._offset)
+
+    def _get_index(self):
+        if self._index is None:
+            self._index = self._decoder.index_container(self._offset,
+                                                        self.is_object)
+        return self._index
+
+    def _get_value(self, offset):
+        values = self._values
+        if offset not in values:
+            values[offset] = self._decoder.decode_at(offset)
+        return values[offset]
+
+    def materialize(self):
+        """Decodes whole container to plain Python objects."""
+        return self._decoder.materialize(self._offset, self.is_object)
+
+
+class LazyObject(LazyContainer, Mapping):
+    """Read-only mapping proxy of UBJSON object. Table of keys and offsets of
+    their values is built on the first access."""
+
+    is_object = True
+
+    def __getitem__(self, key):
+        return self._get_value(self._get_index()[key])
+
+    def __iter__(self):
+        return iter(self._get_index())
+
+    def __len__(self):
+        return len(self._get_index())
+
+    def __contains__(self, key):
+        return key in self._get_index()
+
+
+class LazyArray(LazyContainer, Sequence):
+    """Read-only sequence proxy of UBJSON array. List of items offsets is
+    built on the first access."""
+
+    def __getitem__(self, idx):
+        index = self._get_index()
+        if isinstance(idx, slice):
+            return [self._get_value(offset) for offset in index[idx]]
+        return self._get_value(index[idx])
+
+    def __len__(self):
+        return len(self._get_index())
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, LazyArray)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+
+def materialize(obj):
+    """Converts lazy container to plain Python objects. Other objects are
+    returned as is."""
+    if isinstance(obj, LazyContainer):
+        return obj.materialize()
+    return obj
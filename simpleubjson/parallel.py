@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+"""Decoding and encoding UBJSON data by pool of worker processes.
+
+Decoders and encoders are pure Python and hold interpreter lock, so a single
+process uses only one CPU core. Functions of this module split data into
+batches and process them in :class:`~concurrent.futures.ProcessPoolExecutor`.
+Data is pickled to be passed between processes, so it pays off for large
+amount of data only.
+
+This module requires :mod:`concurrent.futures` (Python 3.2+ or ``futures``
+backport) and isn't imported by :mod:`simpleubjson` package automatically.
+"""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from multiprocessing import cpu_count
+from . import iter_decode
+from .codec import Codec, get_spec
+from .compat import bytes
+from .draft9 import Draft9Decoder
+from .exceptions import NoDataError
+from .reader import map_file, unmap_file
+
+__all__ = ['decode_many', 'encode_many', 'iter_decode_file',
+           'split_records']
+
+#: Default amount of messages processed by worker at once.
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _set_defaults(spec, options):
+    # Generators and lazy containers could not be passed between processes
+    if issubclass(get_spec(spec)[0], Draft9Decoder):
+        options.setdefault('container', 'eager')
+    if options.get('container', 'eager') != 'eager':
+        raise ValueError('only eager containers could be decoded in parallel')
+
+
+def _decode_batch(payloads, spec, allow_noop, options):
+    loads = Codec(spec, allow_noop, **options).loads
+    return [loads(payload) for payload in payloads]
+
+
+def _decode_range(bounds, path, spec, allow_noop, options):
+    start, end = bounds
+    with open(path, 'rb') as fobj:
+        fobj.seek(start)
+        data = fobj.read(end - start)
+    return list(iter_decode(data, allow_noop, spec, **options))
+
+
+def _encode_batch(records, encoder_class, default, options):
+    encoder = encoder_class(default, **options)
+    buf = bytearray()
+    for record in records:
+        encoder.write_next(record, buf)
+    return bytes(buf)
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while 1:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _map_batches(executor, func, batches, args, max_pending, ordered=True):
+    # Yields (index, result) pairs of batches keeping no more than
+    # max_pending batches submitted, but not consumed yet. Results are
+    # yielded in order of batches or as soon as they are done
+    batches = enumerate(batches)
+    if ordered:
+        pending = deque()
+        for index, batch in batches:
+            if len(pending) >= max_pending:
+                idx, future = pending.popleft()
+                yield idx, future.result()
+            pending.append((index, executor.submit(func, batch, *args)))
+        while pending:
+            idx, future = pending.popleft()
+            yield idx, future.result()
+        return
+    pending = {}
+    while 1:
+        for index, batch in islice(batches, max_pending - len(pending)):
+            pending[executor.submit(func, batch, *args)] = index
+        if not pending:
+            return
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future.result()
+
+
+def decode_many(payloads, workers=None, ordered=True,
+                batch_size=DEFAULT_BATCH_SIZE, max_pending=None,
+                allow_noop=False, spec='draft9', **options):
+    """Decodes many UBJSON messages by pool of worker processes::
+
+        >>> list(decode_many([b'i\\x01', b'Si\\x03foo'], workers=2))
+        [1, 'foo']
+
+    Messages are sent to workers by batches of `batch_size` items and no
+    more than `max_pending` batches are decoded ahead of consumer, so memory
+    usage is bounded for payloads iterable of any size.
+
+    :param payloads: Iterable of encoded messages. They should be picklable,
+                     e.g. :class:`bytes`.
+    :param workers: Amount of worker processes. By default equals to the
+                    number of CPU cores.
+    :type workers: int
+    :param ordered: Yield values in order of payloads. Otherwise
+                    ``(index, value)`` pairs are yielded as soon as their
+                    batches are decoded.
+    :type ordered: bool
+    :param batch_size: Amount of messages decoded by worker at once.
+    :type batch_size: int
+    :param max_pending: Amount of batches decoded ahead. By default twice
+                        more than workers.
+    :type max_pending: int
+    :param allow_noop: Allow to emit :const:`~simpleubjson.NOOP` values.
+    :type allow_noop: bool
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+    :param options: Additional decoder options. Only ``eager`` containers
+                    are supported.
+
+    :return: Generator of decoded Python objects.
+    """
+    _set_defaults(spec, options)
+    workers = workers or cpu_count()
+    batches = _batches(payloads, batch_size)
+    with ProcessPoolExecutor(workers) as executor:
+        results = _map_batches(executor, _decode_batch, batches,
+                               (spec, allow_noop, options),
+                               max_pending or 2 * workers, ordered)
+        for index, values in results:
+            if ordered:
+                for value in values:
+                    yield value
+            else:
+                # All batches but the last one are full
+                for idx, value in enumerate(values, index * batch_size):
+                    yield idx, value
+
+
+def _split_records(data, parts, allow_noop, spec):
+    # Returns bounds of parts and indexes of their first records
+    if parts < 1:
+        raise ValueError('parts amount should be positive, got %r' % parts)
+    decoder = get_spec(spec)[1](data, allow_noop)
+    size = decoder.size
+    bounds = []
+    firsts = []
+    start = first = count = 0
+    target = size // parts
+    try:
+        while 1:
+            try:
+                decoder.skip_value()
+            except NoDataError:
+                break
+            count += 1
+            if decoder.offset >= target:
+                bounds.append((start, decoder.offset))
+                firsts.append(first)
+                start = decoder.offset
+                first = count
+                target = size * (len(bounds) + 1) // parts
+    finally:
+        # Release the view of data
+        decoder.reset(bytes())
+    if start < size:
+        bounds.append((start, size))
+        firsts.append(first)
+    return bounds, firsts
+
+
+def split_records(data, parts, allow_noop=False, spec='draft9'):
+    """Splits buffer of UBJSON records written one after another into about
+    equal by size parts at records boundaries. Records are only skipped,
+    not decoded.
+
+    :param data: Any object that supports buffer protocol.
+    :param parts: Desired amount of parts.
+    :type parts: int
+
+    :return: List of ``(start, end)`` offsets of parts.
+    """
+    return _split_records(data, parts, allow_noop, spec)[0]
+
+
+def iter_decode_file(path, workers=None, ordered=True, parts=None,
+                     max_pending=None, allow_noop=False, spec='draft9',
+                     **options):
+    """Iterates over UBJSON records written one after another into the file
+    decoding them by pool of worker processes.
+
+    File is scanned once by skipping records to split it into `parts` at
+    records boundaries. Each worker reads and decodes its own part and no
+    more than `max_pending` parts are decoded ahead of consumer.
+
+    :param path: Path to the file.
+    :type path: str
+    :param workers: Amount of worker processes. By default equals to the
+                    number of CPU cores.
+    :type workers: int
+    :param ordered: Yield records in order of the file. Otherwise
+                    ``(index, record)`` pairs are yielded as soon as their
+                    parts are decoded like :func:`decode_many` does.
+    :type ordered: bool
+    :param parts: Amount of parts to split the file into. By default there
+                  are 4 parts per worker.
+    :type parts: int
+    :param max_pending: Amount of parts decoded ahead. By default twice more
+                        than workers.
+    :type max_pending: int
+    :param allow_noop: Allow to emit :const:`~simpleubjson.NOOP` values.
+    :type allow_noop: bool
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+    :param options: Additional decoder options. Only ``eager`` containers
+                    are supported.
+
+    :return: Generator of decoded Python objects.
+    """
+    _set_defaults(spec, options)
+    workers = workers or cpu_count()
+    with ProcessPoolExecutor(workers) as executor:
+        if parts is None:
+            parts = 4 * workers
+        with open(path, 'rb') as fobj:
+            data = map_file(fobj)
+            try:
+                bounds, firsts = _split_records(data, parts, allow_noop,
+                                                spec)
+            finally:
+                unmap_file(data)
+        results = _map_batches(executor, _decode_range, bounds,
+                               (path, spec, allow_noop, options),
+                               max_pending or 2 * workers, ordered)
+        for index, values in results:
+            if ordered:
+                for value in values:
+                    yield value
+            else:
+                for idx, value in enumerate(values, firsts[index]):
+                    yield idx, value
+
+
+def encode_many(records, output=None, workers=None, array=False,
+                batch_size=DEFAULT_BATCH_SIZE, max_pending=None,
+                default=None, spec='draft9', **options):
+    """Encodes many Python objects by pool of worker processes and writes
+    them in the same order one after another::
+
+        >>> with open('records.ubj', 'wb') as output:
+        ...     encode_many(records, output, workers=8)
+
+    Records are sent to workers by batches of `batch_size` items and no more
+    than `max_pending` batches are encoded ahead of writing, so memory usage
+    is bounded for records iterable of any size.
+
+    :param records: Iterable of Python objects.
+    :param output: `.write([data])`-able object. If omitted result would be
+                   returned instead of written into.
+    :param workers: Amount of worker processes. By default equals to the
+                    number of CPU cores.
+    :type workers: int
+    :param array: Write records as items of single top-level unsized array.
+    :type array: bool
+    :param batch_size: Amount of records encoded by worker at once.
+    :type batch_size: int
+    :param max_pending: Amount of batches encoded ahead. By default twice
+                        more than workers.
+    :type max_pending: int
+    :param default: Callable object that would be used if there is no
+                    handlers matched for Python data type. It should be
+                    picklable, e.g. module level function.
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+    :param options: Additional encoder options. See encoder of specified
+                    specification for the list of supported ones. Each
+                    worker keeps dicts keys cache for its batch unless
+                    ``shape_cache=None`` is passed.
+
+    :return: Encoded data if `output` is omitted.
+    """
+    # Specification is resolved once, so workers don't warn about it again
+    encoder_class = get_spec(spec)[2]
+    options.setdefault('shape_cache', True)
+    chunks = None
+    if output is None:
+        chunks = []
+        write = chunks.append
+    else:
+        write = output.write
+    if array:
+        # Encoded empty unsized array is its opening and closing markers
+        markers = encoder_class().encode_next(item for item in ())
+        write(markers[:-1])
+    workers = workers or cpu_count()
+    with ProcessPoolExecutor(workers) as executor:
+        results = _map_batches(executor, _encode_batch,
+                               _batches(records, batch_size),
+                               (encoder_class, default, options),
+                               max_pending or 2 * workers)
+        for _, data in results:
+            write(data)
+    if array:
+        write(markers[-1:])
+    if chunks is not None:
+        return bytes().join(chunks)
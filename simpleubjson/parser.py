@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+from .codec import get_spec
+from .compat import bytes
+from .draft9 import Draft9Decoder
+from .exceptions import EarlyEndOfStreamError, NoDataError
+
+__all__ = ['Parser']
+
+
+class Parser(object):
+    """Push parser which decodes UBJSON values from data chunks as soon as
+    they arrive, e.g. from non-blocking socket::
+
+        >>> parser = Parser()
+        >>> parser.feed(b'[i\\x01')
+        []
+        >>> parser.feed(b'i\\x02]Si\\x03foo')
+        [[1, 2], 'foo']
+
+    Containers that are not complete yet are kept as stack of decoding frames
+    of buffer decoder, so already received items are decoded only once and
+    only bytes of the incomplete value are kept between :meth:`feed` calls.
+
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+    :param allow_noop: Allow to emit :const:`~simpleubjson.NOOP` values.
+    :type allow_noop: bool
+    :param options: Additional decoder options. Draft-9 decoder uses
+                    ``eager`` container mode by default. Object keys are
+                    cached unless ``string_cache=None`` is passed.
+    """
+
+    def __init__(self, spec='draft9', allow_noop=False, **options):
+        _, buffer_decoder, _ = get_spec(spec)
+        if issubclass(buffer_decoder, Draft9Decoder):
+            options.setdefault('container', 'eager')
+        options.setdefault('string_cache', True)
+        self.decoder = buffer_decoder(bytes(), allow_noop, **options)
+        # Decoded ndarrays are views of the source, so they shouldn't refer
+        # to the buffer that is reused for the next chunks
+        self._copy = getattr(self.decoder, 'ndarrays', False)
+        self._buffer = bytearray()
+        self._frames = None
+
+    @property
+    def pending(self):
+        """Amount of received bytes that don't form complete value yet."""
+        return len(self._buffer)
+
+    def feed(self, chunk):
+        """Feeds next data chunk to the parser and returns list of values
+        that are completed by it."""
+        buf = self._buffer
+        if buf:
+            buf += chunk
+            # Decode pending data in place instead of copying it on each call
+            data = bytes(buf) if self._copy else memoryview(buf)
+        else:
+            data = chunk
+        decoder = self.decoder
+        decoder.reset(data)
+        dispatch = decoder.dispatch
+        openers = decoder.openers
+        frames = self._frames
+        values = []
+        try:
+            while 1:
+                start = decoder.offset
+                try:
+                    if frames is None:
+                        try:
+                            tag, length, value = decoder.next_tlv()
+                        except NoDataError:
+                            # Skipped NoOps between values are consumed
+                            break
+                        if tag in openers:
+                            frames = [decoder.new_frame(tag, length)]
+                            value = decoder.decode_frames(frames)
+                        else:
+                            value = dispatch[tag](decoder, tag, length, value)
+                    else:
+                        value = decoder.decode_frames(frames)
+                except EarlyEndOfStreamError:
+                    # Value is incomplete, wait for more data
+                    if frames is None:
+                        decoder.offset = start
+                    break
+                values.append(value)
+                frames = None
+            consumed = decoder.offset
+        finally:
+            # Views of the buffer should be gone to let it be resized
+            decoder.reset(bytes())
+            data = None
+        self._frames = frames
+        if buf:
+            del buf[:consumed]
+        else:
+            buf += chunk[consumed:]
+        return values
+
+    def close(self):
+        """Checks that all fed data was decoded. Raises
+        :exc:`~simpleubjson.exceptions.EarlyEndOfStreamError` otherwise."""
+        if self._frames is not None or self._buffer:
+            raise EarlyEndOfStreamError('%d bytes of incomplete value left'
+                                        '' % len(self._buffer))
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+from .codec import get_spec
+from .draft9 import Draft9Decoder
+
+__all__ = ['extract', 'iter_items', 'parse_path']
+
+#: Path segment that matches any object key or array index.
+WILDCARD = '*'
+#: Prefix segment that matches any array item.
+ITEM = 'item'
+
+
+def parse_path(path):
+    """Splits JSON-Pointer-like path to the tuple of its segments. ``~1`` and
+    ``~0`` sequences are unescaped to ``/`` and ``~`` respectively::
+
+        >>> parse_path('/entities/urls/*/url')
+        ('entities', 'urls', '*', 'url')
+        >>> parse_path('')
+        ()
+    """
+    if not path:
+        return ()
+    if not path.startswith('/'):
+        raise ValueError('path should start with "/", got %r' % path)
+    return tuple(segment.replace('~1', '/').replace('~0', '~')
+                 for segment in path[1:].split('/'))
+
+
+def _make_decoder(data, allow_noop, spec):
+    stream_decoder, buffer_decoder, _ = get_spec(spec)
+    if hasattr(data, 'read'):
+        decoder_class = stream_decoder
+    else:
+        decoder_class = buffer_decoder
+    if issubclass(decoder_class, Draft9Decoder):
+        return decoder_class(data, allow_noop, container='eager')
+    return decoder_class(data, allow_noop)
+
+
+def _decode_item(decoder, tag, length, value):
+    # Decodes value which marker is just read
+    if tag in decoder.openers:
+        return decoder.decode_container(tag, length, value)
+    return decoder.dispatch[tag](decoder, tag, length, value)
+
+
+def _lookup(obj, segments):
+    # Finds values matched by path segments in already decoded object
+    if not segments:
+        yield obj
+        return
+    segment, rest = segments[0], segments[1:]
+    if isinstance(obj, dict):
+        if segment == WILDCARD:
+            for value in obj.values():
+                for match in _lookup(value, rest):
+                    yield match
+        elif segment in obj:
+            for match in _lookup(obj[segment], rest):
+                yield match
+    elif isinstance(obj, list):
+        if segment == WILDCARD:
+            for value in obj:
+                for match in _lookup(value, rest):
+                    yield match
+        elif segment.isdigit() and int(segment) < len(obj):
+            for match in _lookup(obj[int(segment)], rest):
+                yield match
+
+
+def _walk(decoder, tag, length, value, paths, depth, found):
+    """Walks over value which marker is just read and calls `found` callback
+    with each path of `paths` and value matched by it. Only values matched by
+    paths are decoded, the rest are skipped. Walking stops once `found`
+    returns true value, which is returned then."""
+    complete = [path for path in paths if len(path) == depth]
+    if complete:
+        obj = _decode_item(decoder, tag, length, value)
+        for path in paths:
+            for match in _lookup(obj, path[depth:]):
+                if found(path, match):
+                    return True
+        return False
+    if tag not in decoder.openers:
+        return False
+    index = 0
+    for key, tag, length, value in decoder.iter_container(tag, length):
+        if key is None:
+            key = str(index)
+            index += 1
+        matched = [path for path in paths
+                   if path[depth] == key or path[depth] == WILDCARD]
+        if matched:
+            if _walk(decoder, tag, length, value, matched, depth + 1, found):
+                return True
+        elif tag in decoder.openers:
+            decoder.skip_value(tag, length)
+    return False
+
+
+def _iter_prefix(decoder, tag, length, value, segments, depth):
+    # Yields values matched by prefix segments decoding them one by one
+    if depth == len(segments):
+        yield _decode_item(decoder, tag, length, value)
+        return
+    if tag not in decoder.openers:
+        return
+    segment = segments[depth]
+    for key, tag, length, value in decoder.iter_container(tag, length):
+        if segment == (ITEM if key is None else key):
+            for item in _iter_prefix(decoder, tag, length, value, segments,
+                                     depth + 1):
+                yield item
+        elif tag in decoder.openers:
+            decoder.skip_value(tag, length)
+
+
+def extract(data, paths, allow_noop=False, spec='draft9'):
+    """Decodes only values matched by JSON-Pointer-like `paths` skipping the
+    rest of data::
+
+        >>> extract(data, ['/user/id', '/entities/urls/*/url'])
+        {'/user/id': 42, '/entities/urls/*/url': ['http://example.com']}
+
+    Path segment ``*`` matches any object key or array index. Paths with
+    wildcards are mapped to the list of all matched values, the others to the
+    single matched value. Paths that match nothing are omitted in result.
+    Data is read only till all the paths without wildcards are matched, if
+    there are no paths with wildcards.
+
+    :param data: `.read([size])`-able object, source string or any object that
+                 supports buffer protocol.
+    :param paths: List of paths to extract.
+    :param allow_noop: Allow to emit :const:`~simpleubjson.NOOP` values.
+    :type allow_noop: bool
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+
+    :return: dict of extracted values by their paths.
+    """
+    parsed = dict((parse_path(path), path) for path in paths)
+    result = {}
+    # Paths without wildcards that are not matched yet
+    pending = set(path for path in parsed if WILDCARD not in path)
+    stop_early = len(pending) == len(parsed)
+
+    def found(path, value):
+        if WILDCARD in path:
+            result.setdefault(parsed[path], []).append(value)
+            return False
+        result[parsed[path]] = value
+        pending.discard(path)
+        return stop_early and not pending
+
+    decoder = _make_decoder(data, allow_noop, spec)
+    tag, length, value = decoder.next_tlv()
+    _walk(decoder, tag, length, value, list(parsed), 0, found)
+    return result
+
+
+def iter_items(data, prefix='', allow_noop=False, spec='draft9'):
+    """Iterates over values found by ijson-like `prefix` decoding them one
+    by one, so huge containers are never loaded entirely::
+
+        >>> for row in iter_items(data, 'rows.item'):
+        ...     print(row)
+
+    Prefix is dot separated list of object keys and ``item`` segments which
+    match any array item. Empty prefix matches whole value. Only values
+    matched by prefix are built, the rest of data is skipped.
+
+    :param data: `.read([size])`-able object, source string or any object that
+                 supports buffer protocol.
+    :param prefix: Path to the values to iterate over.
+    :type prefix: str
+    :param allow_noop: Allow to emit :const:`~simpleubjson.NOOP` values.
+    :type allow_noop: bool
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+    """
+    segments = tuple(prefix.split('.')) if prefix else ()
+    decoder = _make_decoder(data, allow_noop, spec)
+    tag, length, value = decoder.next_tlv()
+    return _iter_prefix(decoder, tag, length, value, segments, 0)
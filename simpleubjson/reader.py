@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+import os
+from mmap import ACCESS_READ, mmap as memory_map
+from .compat import b, bytes
+
+CHARS = [b(chr(i)) for i in range(256)]
+
+#: Default amount of bytes to read ahead from the source.
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+__all__ = ['ChunkedReader', 'PeekReader', 'map_file', 'unmap_file',
+           'DEFAULT_CHUNK_SIZE']
+
+
+class ChunkedReader(object):
+    """Read-ahead wrapper of `.read([size])`-able stream that fetches data
+    by big chunks into reusable buffer, so decoders which read source byte by
+    byte wouldn't cause system call for each marker::
+
+        >>> reader = ChunkedReader(sock.makefile('rb'))
+        >>> first = Draft9Decoder(reader).decode_next()
+        >>> second = Draft9Decoder(reader).decode_next()
+
+    Since reader fetches more data than decoder actually consumes, it should
+    be shared between all decoders that read the same source. Bytes that are
+    already fetched, but not consumed, are available via :meth:`unconsumed`.
+
+    :param source: `.read([size])`-able object. If it also provides
+                   `.readinto(buffer)` method, data will be read directly into
+                   reader's buffer.
+    :param chunk_size: Size of read-ahead buffer in bytes.
+    :type chunk_size: int
+    """
+
+    def __init__(self, source, chunk_size=DEFAULT_CHUNK_SIZE):
+        if chunk_size <= 0:
+            raise ValueError('chunk size should be positive, got %r'
+                             '' % chunk_size)
+        self.source = source
+        self.chunk_size = chunk_size
+        self._chunk = bytearray(chunk_size)
+        self._view = memoryview(self._chunk)
+        self._readinto = getattr(source, 'readinto', None)
+        self._pos = 0
+        self._end = 0
+        self._fetched = 0
+        self._eof = False
+
+    def _fill(self):
+        # Fetches next chunk from the source. Returns amount of fetched bytes.
+        if self._eof:
+            return 0
+        self._fetched += self._end
+        self._pos = self._end = 0
+        if self._readinto is not None:
+            size = self._readinto(self._chunk) or 0
+        else:
+            data = self.source.read(self.chunk_size)
+            size = len(data)
+            self._chunk[:size] = data
+        if not size:
+            self._eof = True
+        self._end = size
+        return size
+
+    def read(self, size=-1):
+        """Reads up to `size` bytes. If `size` is negative, reads all data
+        till the end of the stream."""
+        pos = self._pos
+        if size == 1 and pos < self._end:
+            # Decoders read markers byte by byte, so it's the hottest path
+            self._pos = pos + 1
+            return CHARS[self._chunk[pos]]
+        end = pos + size
+        if 0 <= size and end <= self._end:
+            self._pos = end
+            return self._view[pos:end].tobytes()
+        chunks = [self._view[pos:self._end].tobytes()]
+        self._pos = self._end
+        if size < 0:
+            while self._fill():
+                chunks.append(self._view[:self._end].tobytes())
+                self._pos = self._end
+            return bytes().join(chunks)
+        size -= len(chunks[0])
+        if size >= self.chunk_size and not self._eof:
+            # There is no reason to pass large data through read-ahead buffer
+            self._fetched += self._end
+            self._pos = self._end = 0
+            while size:
+                data = self.source.read(size)
+                if not data:
+                    self._eof = True
+                    break
+                self._fetched += len(data)
+                chunks.append(data)
+                size -= len(data)
+            return bytes().join(chunks)
+        while size and self._fill():
+            chunk = self._view[:min(size, self._end)].tobytes()
+            self._pos = len(chunk)
+            chunks.append(chunk)
+            size -= len(chunk)
+        return bytes().join(chunks)
+
+    def peek(self, size=1):
+        """Returns up to `size` bytes from the read-ahead buffer without
+        consuming them. Fetches next chunk if buffer is empty. Returns empty
+        string only if source is exhausted."""
+        if self._pos >= self._end:
+            self._fill()
+        end = min(self._pos + size, self._end)
+        return self._view[self._pos:end].tobytes()
+
+    def tell(self):
+        """Returns amount of bytes consumed from the source."""
+        return self._fetched + self._pos
+
+    def unconsumed(self):
+        """Returns bytes that were fetched from the source, but not consumed
+        yet. They are kept in the buffer, so reading continues from them."""
+        return self._view[self._pos:self._end].tobytes()
+
+
+class PeekReader(object):
+    """Minimal `.peek()` shim over `.read([size])`-able stream. Unlike
+    :class:`ChunkedReader` it never reads ahead more than was asked to peek,
+    so the source position stays right after the consumed data and other
+    readers could continue from it::
+
+        >>> stream = PeekReader(sock.makefile('rb'))
+        >>> stream.peek(1)
+        '['
+        >>> stream.read(1)
+        '['
+
+    :param source: `.read([size])`-able object.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._pending = bytes()
+
+    def read(self, size=-1):
+        """Reads up to `size` bytes, peeked ones first. If `size` is
+        negative, reads all data till the end of the stream."""
+        pending = self._pending
+        if not pending:
+            return self.source.read(size)
+        if 0 <= size <= len(pending):
+            self._pending = pending[size:]
+            return pending[:size]
+        self._pending = bytes()
+        if size < 0:
+            return pending + self.source.read()
+        return pending + self.source.read(size - len(pending))
+
+    def peek(self, size=1):
+        """Returns up to `size` bytes without consuming them. Returns empty
+        string only if source is exhausted."""
+        pending = self._pending
+        if len(pending) < size:
+            pending += self.source.read(size - len(pending))
+            self._pending = pending
+        return pending[:size]
+
+    def tell(self):
+        """Returns position of the source minus peeked bytes."""
+        return self.source.tell() - len(self._pending)
+
+
+def map_file(fobj):
+    """Returns read-only memory map of whole opened file `fobj` or empty
+    string for empty file since it could not be mapped."""
+    if not os.fstat(fobj.fileno()).st_size:
+        return bytes()
+    return memory_map(fobj.fileno(), 0, access=ACCESS_READ)
+
+
+def unmap_file(data):
+    """Closes memory map returned by :func:`map_file`. Mapping that is still
+    referred by views, e.g. by lazy containers, is left to be closed once
+    they are gone."""
+    try:
+        data.close()
+    except AttributeError:  # empty file
+        pass
+    except BufferError:
+        pass
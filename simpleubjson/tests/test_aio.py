@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+import sys
+import unittest
+import simpleubjson
+from simpleubjson.compat import b
+if sys.version_info >= (3, 6):
+    import asyncio
+    from simpleubjson import aio
+else:  # Coroutines syntax isn't supported
+    aio = None
+
+
+class DrainingWriter(object):
+
+    def __init__(self):
+        self.chunks = []
+        self.drains = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+
+    def drain(self):
+        self.drains += 1
+        done = asyncio.Future()
+        done.set_result(None)
+        return done
+
+
+@unittest.skipIf(aio is None, 'asyncio support requires Python 3.6+')
+class AsyncioTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def decode_all(self, chunks, **kwargs):
+        reader = asyncio.StreamReader()
+        for chunk in chunks:
+            reader.feed_data(chunk)
+        reader.feed_eof()
+        values = aio.iter_decode(reader, **kwargs)
+        result = []
+        while 1:
+            try:
+                result.append(self.run_async(values.__anext__()))
+            except StopAsyncIteration:
+                return result
+
+    def test_iter_decode(self):
+        data = self.decode_all([b('i\x01[i\x02'), b('{Si\x03fooZ}]Si\x03bar')],
+                               chunk_size=3)
+        self.assertEqual(data, [1, [2, {'foo': None}], 'bar'])
+
+    def test_iter_decode_empty_stream(self):
+        self.assertEqual(self.decode_all([]), [])
+
+    def test_fail_iter_decode_truncated_value(self):
+        self.assertRaises(ValueError, self.decode_all, [b('[i\x01')])
+
+    def test_encode_by_chunks(self):
+        data = [{'id': i, 'name': 'x' * 10} for i in range(100)]
+        writer = DrainingWriter()
+        self.run_async(aio.encode(writer, data, chunk_size=100))
+        self.assertTrue(len(writer.chunks) > 1)
+        self.assertEqual(writer.drains, len(writer.chunks))
+        self.assertEqual(bytes().join(writer.chunks),
+                         simpleubjson.encode(data))
+
+    def test_encode_scalar(self):
+        writer = DrainingWriter()
+        self.run_async(aio.encode(writer, 'foo'))
+        self.assertEqual(writer.chunks, [simpleubjson.encode('foo')])
+
+    def test_roundtrip(self):
+        data = {'foo': list(range(1000)), 'bar': None}
+        writer = DrainingWriter()
+        self.run_async(aio.encode(writer, data, chunk_size=64))
+        self.assertEqual(self.decode_all(writer.chunks), [data])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+import unittest
+import warnings
+import simpleubjson
+from simpleubjson.cache import CacheInfo, InternCache, ShapeCache, ShapeTree
+from simpleubjson.compat import BytesIO as StringIO, b, u
+from simpleubjson.draft8 import Draft8BufferDecoder, Draft8BufferEncoder
+from simpleubjson.draft9 import (
+    Draft9Decoder, Draft9BufferDecoder, Draft9BufferEncoder
+)
+from simpleubjson.draft12 import Draft12Encoder
+from simpleubjson.exceptions import (
+    EarlyEndOfStreamError, EncodeError, MarkerError
+)
+
+
+class InternCacheTestCase(unittest.TestCase):
+
+    def test_count_hits_and_misses(self):
+        cache = InternCache()
+        first = cache.decode(b('foo'))
+        self.assertEqual(first, 'foo')
+        self.assertTrue(cache.decode(b('foo')) is first)
+        cache.decode(b('bar'))
+        self.assertEqual(cache.info(), CacheInfo(1, 2, 1024, 2))
+
+    def test_drop_oldest_entries(self):
+        cache = InternCache(2)
+        for key in ('a', 'b', 'c'):
+            cache.decode(b(key))
+        self.assertEqual(len(cache), 2)
+        cache.decode(b('c'))
+        cache.decode(b('a'))
+        self.assertEqual(cache.info(), CacheInfo(1, 4, 2, 2))
+
+    def test_clear(self):
+        cache = InternCache()
+        cache.decode(b('foo'))
+        cache.clear()
+        self.assertEqual(cache.info(), CacheInfo(0, 0, 1024, 0))
+
+    def test_fail_on_invalid_size(self):
+        self.assertRaises(ValueError, InternCache, 0)
+
+
+class DecoderCacheTestCase(unittest.TestCase):
+
+    records = [{'id': i, 'name': 'x' * (i % 3)} for i in range(10)]
+
+    def setUp(self):
+        self.data = simpleubjson.encode(self.records)
+
+    def check_keys_shared(self, value):
+        keys = [sorted(record) for record in value]
+        for record_keys in keys[1:]:
+            for key, first in zip(record_keys, keys[0]):
+                self.assertTrue(key is first)
+
+    def test_share_keys_between_records(self):
+        cache = InternCache()
+        value = simpleubjson.decode(self.data, container='eager',
+                                    string_cache=cache)
+        self.assertEqual(value, self.records)
+        self.check_keys_shared(value)
+        self.assertEqual(cache.info(), CacheInfo(18, 2, 1024, 2))
+
+    def test_share_keys_with_stream_decoder(self):
+        cache = InternCache()
+        value = simpleubjson.decode(StringIO(self.data), container='eager',
+                                    string_cache=cache)
+        self.assertEqual(value, self.records)
+        self.check_keys_shared(value)
+        self.assertEqual(cache.misses, 2)
+
+    def test_keep_values_out_of_cache(self):
+        cache = InternCache()
+        decoder = Draft9BufferDecoder(self.data, container='eager',
+                                      string_cache=cache)
+        decoder.decode_next()
+        self.assertEqual(len(cache), 2)
+
+    def test_intern_short_values(self):
+        cache = InternCache()
+        for decoder_class in (Draft9Decoder, Draft9BufferDecoder):
+            decoder = decoder_class(self.data, container='eager',
+                                    string_cache=cache, intern_values=2)
+            self.assertEqual(decoder.decode_next(), self.records)
+        self.assertEqual(len(cache), 3)
+
+    def test_disable_cache(self):
+        value = simpleubjson.decode(self.data, container='eager',
+                                    string_cache=None)
+        self.assertEqual(value, self.records)
+
+    def test_enable_cache_only_for_reused_decoders(self):
+        decoder = Draft9BufferDecoder(self.data, container='eager')
+        self.assertTrue(decoder.strings is None)
+        decoder = Draft9BufferDecoder(self.data, string_cache=True)
+        self.assertTrue(isinstance(decoder.strings, InternCache))
+        parser = simpleubjson.Parser()
+        self.assertTrue(isinstance(parser.decoder.strings, InternCache))
+        values = list(simpleubjson.iter_decode(self.data + self.data))
+        self.assertEqual(values, [self.records, self.records])
+        self.check_keys_shared(values[0] + values[1])
+
+    def test_share_cache_between_messages(self):
+        codec = simpleubjson.Codec(container='eager')
+        for record in self.records:
+            self.assertEqual(codec.loads(codec.dumps(record)), record)
+        cache = codec.buffer_decoder.strings
+        self.assertTrue(codec.stream_decoder.strings is cache)
+        self.assertEqual(cache.misses, 2)
+
+    def test_draft8_keys(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            data = simpleubjson.encode(self.records, spec='draft8')
+        cache = InternCache()
+        decoder = Draft8BufferDecoder(data, string_cache=cache)
+        value = decoder.decode_next()
+        self.assertEqual(value, self.records)
+        self.check_keys_shared(value)
+        self.assertEqual(len(cache), 2)
+        value = simpleubjson.decode(StringIO(data), spec='draft8',
+                                    string_cache=cache)
+        self.assertEqual(value, self.records)
+        self.assertEqual(cache.misses, 2)
+
+    def test_draft12_keys(self):
+        data = simpleubjson.encode(self.records, spec='draft12')
+        cache = InternCache()
+        value = simpleubjson.decode(data, spec='draft12', string_cache=cache)
+        self.assertEqual(value, self.records)
+        self.check_keys_shared(value)
+        self.assertEqual(len(cache), 2)
+
+
+class ShapeCacheTestCase(unittest.TestCase):
+
+    def test_cache_shapes_met_twice(self):
+        cache = ShapeCache()
+        self.assertEqual(cache.encode(('a', 'b'), b), None)
+        self.assertEqual(cache.encode(('a', 'b'), b), (b('a'), b('b')))
+        self.assertEqual(cache.encode(('a', 'b'), b), (b('a'), b('b')))
+        self.assertEqual(cache.info(), CacheInfo(1, 2, 1024, 1))
+
+    def test_drop_oldest_shapes(self):
+        cache = ShapeCache(2)
+        for shape in ('a', 'a', 'b', 'b', 'c', 'c'):
+            cache.encode((shape,), b)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.encode(('a',), b), None)
+        self.assertEqual(cache.encode(('c',), b), (b('c'),))
+        cache.clear()
+        self.assertEqual(cache.encode(('c',), b), None)
+
+
+class EncoderCacheTestCase(unittest.TestCase):
+
+    records = [{'id': i, 'name': 'x', u('\u0444'): [{'a': i}]}
+               for i in range(10)]
+
+    def check_same_output(self, encoder_class):
+        cache = ShapeCache()
+        encoder = encoder_class(shape_cache=cache)
+        data = encoder.encode_next(self.records)
+        self.assertEqual(data, encoder_class(shape_cache=None)
+                         .encode_next(self.records))
+        self.assertEqual(cache.info(), CacheInfo(16, 4, 1024, 2))
+        return data
+
+    def test_draft9(self):
+        data = self.check_same_output(Draft9BufferEncoder)
+        self.assertEqual(simpleubjson.decode(data, container='eager'),
+                         self.records)
+
+    def test_draft8(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            data = self.check_same_output(Draft8BufferEncoder)
+        self.assertEqual(simpleubjson.decode(data, spec='draft8'),
+                         self.records)
+
+    def test_draft12(self):
+        data = self.check_same_output(Draft12Encoder)
+        self.assertEqual(simpleubjson.decode(data, spec='draft12'),
+                         self.records)
+
+    def test_share_cache_between_messages(self):
+        codec = simpleubjson.Codec()
+        for record in self.records:
+            codec.dumps(record)
+        self.assertEqual(codec.encoder.shapes.info().currsize, 2)
+
+    def test_disable_cache_by_default(self):
+        self.assertTrue(Draft9BufferEncoder().shapes is None)
+        self.assertTrue(Draft12Encoder().shapes is None)
+
+    def test_fail_on_invalid_keys(self):
+        encoder = Draft9BufferEncoder(shape_cache=True)
+        for key in (1, b('\xff')):
+            for _ in range(3):
+                self.assertRaises(EncodeError, encoder.encode_next,
+                                  {key: 1})
+        self.assertEqual(len(encoder.shapes), 0)
+
+
+class ShapeTreeTestCase(unittest.TestCase):
+
+    def test_follow_keys(self):
+        tree = ShapeTree()
+        node = tree.follow(tree.root, b('Si\x01a'), 'a')
+        self.assertEqual(tree.root[:3], [b('Si\x01a'), 'a', node])
+        self.assertTrue(tree.nest(node) is tree.nest(node))
+        self.assertTrue(tree.follow(tree.root, b('Si\x01a'), 'a') is node)
+        self.assertEqual(tree.info(), CacheInfo(0, 2, 1024, 2))
+
+    def test_start_over_when_full(self):
+        tree = ShapeTree(2)
+        root = tree.root
+        node = tree.follow(root, b('Si\x01a'), 'a')
+        tree.follow(node, b('Si\x01b'), 'b')
+        self.assertEqual(tree.nest(root), None)
+        self.assertFalse(tree.root is root)
+        self.assertEqual(len(tree), 0)
+
+
+class SpeculativeDecoderTestCase(unittest.TestCase):
+
+    records = [{'id': i, 'name': 'x' * (i % 3), 'point': {'x': i, 'y': 0},
+                'tags': [{'a': 1}, {'a': 2}]} for i in range(10)]
+
+    def decode(self, data, **options):
+        tree = ShapeTree()
+        value = simpleubjson.decode(data, container='eager', shape_tree=tree,
+                                    **options)
+        return value, tree
+
+    def test_speculate_keys(self):
+        data = simpleubjson.encode(self.records)
+        for source in (data, bytearray(data), memoryview(data)):
+            value, tree = self.decode(source)
+            self.assertEqual(value, self.records)
+            # Only the first record and the first tag are parsed
+            self.assertEqual(tree.info(), CacheInfo(73, 7, 1024, 11))
+
+    def test_fallback_on_mismatch(self):
+        records = [{'a': 1, 'b': 2}, {'a': 1, 'c': 3}, {'b': 2}, {},
+                   {'a': 1, 'b': 2}, {'a': 1, 'bb': 2}, {'a': 1, 'b': 2}]
+        value, tree = self.decode(simpleubjson.encode(records))
+        self.assertEqual(value, records)
+        self.assertEqual(tree.hits, 3)
+
+    def test_arrays_at_place_of_objects(self):
+        for values in ([[{'x': 1}, ['x']]],
+                       [{'x': 1}, ['x', 2]],
+                       [{'a': {'x': 1}}, {'a': ['x', 'y']}]):
+            tree = ShapeTree()
+            for value in values:
+                data = simpleubjson.encode(value)
+                self.assertEqual(simpleubjson.decode(data, container='eager',
+                                                     shape_tree=tree),
+                                 value)
+
+    def test_object_pairs(self):
+        data = simpleubjson.encode(self.records)
+        value, tree = self.decode(data, object_pairs_hook=dict)
+        self.assertEqual(value, self.records)
+        self.assertEqual(tree.hits, 73)
+
+    def test_fail_on_truncated_data(self):
+        data = simpleubjson.encode(self.records)
+        self.assertRaises(EarlyEndOfStreamError, self.decode, data[:-3])
+        self.assertRaises(MarkerError, self.decode,
+                          b('[{Si\x01ai\x01}{i\x01i\x01}]'))
+
+    def test_share_tree_between_messages(self):
+        codec = simpleubjson.Codec(container='eager', shape_tree=True)
+        for record in self.records:
+            self.assertEqual(codec.loads(codec.dumps(record)), record)
+        self.assertEqual(codec.buffer_decoder.shape_tree.misses, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+import unittest
+import warnings
+import simpleubjson
+from simpleubjson.compat import BytesIO as StringIO, b
+
+
+class CodecTestCase(unittest.TestCase):
+
+    def test_roundtrip_many_messages(self):
+        codec = simpleubjson.Codec(container='eager')
+        for i in range(10):
+            data = {'id': i, 'items': list(range(i))}
+            self.assertEqual(codec.loads(codec.dumps(data)), data)
+
+    def test_loads_from_stream_and_buffer(self):
+        codec = simpleubjson.Codec()
+        self.assertEqual(codec.loads(StringIO(b('i\x2a'))), 42)
+        self.assertEqual(codec.loads(bytearray(b('Si\x03foo'))), 'foo')
+        self.assertEqual(codec.loads(b('Z')), None)
+
+    def test_reuse_decoders(self):
+        codec = simpleubjson.Codec()
+        decoder = codec.buffer_decoder
+        codec.loads(b('i\x01'))
+        codec.loads(b('i\x02'))
+        self.assertTrue(codec.buffer_decoder is decoder)
+
+    def test_lazy_containers(self):
+        codec = simpleubjson.Codec(container='lazy')
+        self.assertEqual(codec.loads(b('[i\x01]')), [1])
+        self.assertRaises(ValueError, codec.loads, StringIO(b('[i\x01]')))
+
+    def test_loads_after_failure(self):
+        codec = simpleubjson.Codec(container='eager')
+        self.assertRaises(ValueError, codec.loads, b('[i\x01'))
+        self.assertEqual(codec.loads(b('[i\x01]')), [1])
+
+    def test_dumps_with_default(self):
+        codec = simpleubjson.Codec(default=str)
+        self.assertEqual(codec.dumps(object), codec.dumps(str(object)))
+
+    def test_dumps_with_encoder_options(self):
+        codec = simpleubjson.Codec(spec='draft12', container='eager',
+                                   encoder_options={'numeric_arrays': True,
+                                                    'shape_cache': None})
+        self.assertEqual(codec.dumps([1, 2, 3]), b('[$i#i\x03\x01\x02\x03'))
+        self.assertTrue(codec.encoder.shapes is None)
+        self.assertEqual(codec.loads(codec.dumps([1, 2, 3])), [1, 2, 3])
+
+    def test_draft8(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            codec = simpleubjson.Codec(spec='draft-8')
+        self.assertEqual(codec.dumps([1]), simpleubjson.encode([1],
+                                                               spec='draft8'))
+        self.assertEqual(codec.loads(codec.dumps({'a': 1})), {'a': 1})
+
+    def test_fail_on_unknown_spec(self):
+        self.assertRaises(ValueError, simpleubjson.Codec, spec='draft-42')
+
+
+if __name__ == '__main__':
+    unittest.main()
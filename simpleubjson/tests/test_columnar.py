@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+import unittest
+import warnings
+import simpleubjson
+from array import array
+from simpleubjson.columnar import (
+    Rows, decode_columns, encode_columns, to_columns
+)
+from simpleubjson.compat import BytesIO as StringIO
+
+
+class ColumnarTestCase(unittest.TestCase):
+
+    records = [{'id': i, 'value': i * 0.5, 'name': 'n%d' % i, 'ok': i % 2 == 0}
+               for i in range(200)]
+
+    def test_to_columns(self):
+        columns = to_columns(self.records[:2])
+        self.assertEqual(columns, {'id': (0, 1), 'value': (0.0, 0.5),
+                                   'name': ('n0', 'n1'),
+                                   'ok': (True, False)})
+        self.assertEqual(to_columns([{'a': 1}, {'a': 2}]), {'a': (1, 2)})
+        self.assertEqual(to_columns([]), {})
+
+    def test_fail_on_different_keys(self):
+        for records in ([{'a': 1}, {'b': 2}], [{'a': 1}, {'a': 1, 'b': 2}],
+                        [{'a': 1, 'b': 2}, {'a': 1}]):
+            self.assertRaises(ValueError, to_columns, records)
+
+    def test_roundtrip(self):
+        for spec in ('draft9', 'draft12'):
+            data = encode_columns(self.records, spec=spec)
+            self.assertTrue(len(data) <
+                            len(simpleubjson.encode(self.records, spec=spec)))
+            self.assertEqual(decode_columns(data, rows=True, spec=spec),
+                             self.records)
+
+    def test_decode_numeric_columns_as_arrays(self):
+        for spec in ('draft9', 'draft12'):
+            data = encode_columns(self.records, spec=spec)
+            columns = decode_columns(StringIO(data), spec=spec)
+            self.assertEqual(columns['id'], array('B', range(200)))
+            self.assertEqual(columns['value'].typecode, 'd')
+            self.assertEqual(list(columns['ok']),
+                             [i % 2 == 0 for i in range(200)])
+
+    def test_decode_float_columns_as_doubles(self):
+        records = [{'a': 0.5}, {'a': 1.25}]
+        for spec in ('draft9', 'draft12'):
+            columns = decode_columns(encode_columns(records, spec=spec),
+                                     spec=spec)
+            self.assertEqual(columns['a'], array('d', [0.5, 1.25]))
+            self.assertEqual(columns['a'].typecode, 'd')
+
+    def test_draft8_columns(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            data = encode_columns(self.records[:3], spec='draft8')
+            self.assertEqual(decode_columns(data, rows=True, spec='draft8'),
+                             self.records[:3])
+
+    def test_rows(self):
+        rows = Rows({'a': [1, 2, 3], 'b': 'xyz'})
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[-1], {'a': 3, 'b': 'z'})
+        self.assertEqual(rows[:2], [{'a': 1, 'b': 'x'}, {'a': 2, 'b': 'y'}])
+        self.assertRaises(IndexError, rows.__getitem__, 3)
+        self.assertEqual(list(Rows({})), [])
+        self.assertRaises(ValueError, Rows, {'a': [1], 'b': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from io import StringIO as TextIO
+import simpleubjson
+from simpleubjson.compat import BytesIO as StringIO, b, bytes
+from simpleubjson.tools.index import (
+    RecordIndex, build_index, index_path, main
+)
+
+
+class RecordIndexTestCase(unittest.TestCase):
+
+    records = [{'id': i, 'name': 'x' * i} for i in range(20)]
+
+    def setUp(self):
+        self.source = bytes().join(simpleubjson.encode(record)
+                                   for record in self.records)
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def decode(self, data):
+        return simpleubjson.decode(data, container='eager')
+
+    def test_index_buffer(self):
+        for step in (1, 3, 20, 50):
+            index = build_index(self.source, step)
+            self.assertEqual(len(index), 20)
+            self.assertEqual(len(index.offsets), (20 + step - 1) // step)
+            self.assertEqual(index.end, len(self.source))
+            for n in range(20):
+                offset = index.seek_record(self.source, n)
+                self.assertEqual(self.decode(self.source[offset:]),
+                                 self.records[n])
+
+    def test_seek_stream(self):
+        stream = StringIO(self.source)
+        index = build_index(stream, 7)
+        for n in (19, 0, 8, 7):
+            index.seek_record(stream, n)
+            self.assertEqual(self.decode(stream), self.records[n])
+
+    def test_count_noop_records(self):
+        self.assertEqual(len(build_index(b('NNi\x01N'))), 1)
+        self.assertEqual(len(build_index(b('NNi\x01N'), allow_noop=True)), 4)
+
+    def test_update_growing_data(self):
+        index = RecordIndex(3)
+        half = build_index(self.source).offsets[10]
+        self.assertEqual(index.update(self.source[:half]), 10)
+        self.assertEqual(index.update(self.source), 10)
+        self.assertEqual(list(index.offsets),
+                         list(build_index(self.source, 3).offsets))
+
+    def test_keep_index_of_complete_records(self):
+        index = RecordIndex()
+        self.assertRaises(ValueError, index.update, self.source[:-1])
+        self.assertEqual(len(index), 19)
+        self.assertEqual(index.update(self.source), 1)
+
+    def test_fail_on_record_out_of_index(self):
+        index = build_index(self.source)
+        self.assertRaises(IndexError, index.seek_record, self.source, 20)
+        self.assertRaises(IndexError, index.seek_record, self.source, -1)
+
+    def test_save_and_load(self):
+        path = index_path(os.path.join(self.tmpdir, 'records.ubj'))
+        index = build_index(self.source, 4)
+        index.save(path)
+        loaded = RecordIndex.load(path)
+        self.assertEqual(list(loaded.offsets), list(index.offsets))
+        self.assertEqual((loaded.step, loaded.count, loaded.end, loaded.spec),
+                         (4, 20, len(self.source), 'draft9'))
+
+    def test_fail_to_load_invalid_file(self):
+        path = os.path.join(self.tmpdir, 'records.idx')
+        build_index(self.source, 4).save(path)
+        with open(path, 'rb') as fobj:
+            data = fobj.read()
+        for broken in (data[:10], b('X') + data[1:], data[:-1]):
+            with open(path, 'wb') as fobj:
+                fobj.write(broken)
+            self.assertRaises(ValueError, RecordIndex.load, path)
+
+    def test_fail_on_invalid_step(self):
+        self.assertRaises(ValueError, RecordIndex, 0)
+
+
+class IndexToolTestCase(unittest.TestCase):
+
+    records = RecordIndexTestCase.records
+
+    def setUp(self):
+        self.source = bytes().join(simpleubjson.encode(record)
+                                   for record in self.records)
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'records.ubj')
+        self.write(self.source)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, data):
+        with open(self.path, 'wb') as fobj:
+            fobj.write(data)
+
+    def main(self, *argv):
+        stdout = sys.stdout
+        sys.stdout = StringIO() if str is bytes else TextIO()
+        try:
+            main(list(argv))
+        finally:
+            sys.stdout = stdout
+
+    def test_reject_conflicting_step(self):
+        self.main('--step=4', self.path)
+        self.assertRaises(SystemExit, self.main, '--step=2', self.path)
+        self.assertEqual(RecordIndex.load(index_path(self.path)).step, 4)
+        self.main('--step=4', self.path)
+        self.main('--step=2', '--force', self.path)
+        self.assertEqual(RecordIndex.load(index_path(self.path)).step, 2)
+
+    def test_save_index_of_complete_records(self):
+        self.write(self.source[:-1])
+        self.assertRaises(SystemExit, self.main, self.path)
+        index = RecordIndex.load(index_path(self.path))
+        self.assertEqual(len(index), 19)
+        self.write(self.source)
+        self.main(self.path)
+        self.assertEqual(len(RecordIndex.load(index_path(self.path))), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+import simpleubjson
+from concurrent.futures import ThreadPoolExecutor
+from simpleubjson import parallel
+from simpleubjson.compat import BytesIO as StringIO, b, bytes
+
+
+def encode_complex(obj):
+    return [obj.real, obj.imag]
+
+
+class ParallelDecodeTestCase(unittest.TestCase):
+
+    records = [{'id': i, 'tags': ['x'] * (i % 5)} for i in range(100)]
+
+    def setUp(self):
+        self.payloads = [simpleubjson.encode(record)
+                         for record in self.records]
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'records.ubj')
+        with open(self.path, 'wb') as fobj:
+            fobj.write(bytes().join(self.payloads))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_decode_many(self):
+        values = parallel.decode_many(self.payloads, workers=2, batch_size=7)
+        self.assertEqual(list(values), self.records)
+
+    def test_decode_many_unordered(self):
+        values = parallel.decode_many(iter(self.payloads), workers=2,
+                                      ordered=False, batch_size=30)
+        self.assertEqual(sorted(values), list(enumerate(self.records)))
+
+    def test_decode_many_unordered_bounded(self):
+        consumed = []
+
+        def payloads():
+            for payload in self.payloads:
+                consumed.append(payload)
+                yield payload
+        values = parallel.decode_many(payloads(), workers=2, ordered=False,
+                                      batch_size=10, max_pending=2)
+        next(values)
+        self.assertTrue(len(consumed) <= 30)
+        self.assertEqual(len(list(values)), len(self.records) - 1)
+
+    def test_map_batches_bounded(self):
+        for ordered in (True, False):
+            submitted = []
+
+            def batches():
+                for i in range(100):
+                    submitted.append(i)
+                    yield [i]
+            with ThreadPoolExecutor(2) as executor:
+                results = parallel._map_batches(executor, sum, batches(),
+                                                (), 3, ordered)
+                for count, (idx, value) in enumerate(results):
+                    self.assertEqual(idx, value)
+                    # Ordered mode takes the next batch before yielding
+                    self.assertTrue(len(submitted) <= count + 4)
+            self.assertEqual(len(submitted), 100)
+
+    def test_fail_on_not_eager_containers(self):
+        values = parallel.decode_many(self.payloads, container='lazy')
+        self.assertRaises(ValueError, list, values)
+
+    def test_split_records(self):
+        data = bytes().join(self.payloads)
+        for parts in (1, 3, 10, 1000):
+            bounds = parallel.split_records(data, parts)
+            self.assertTrue(len(bounds) <= parts)
+            self.assertEqual(bounds[0][0], 0)
+            self.assertEqual(bounds[-1][1], len(data))
+            for (_, end), (start, _) in zip(bounds, bounds[1:]):
+                self.assertEqual(end, start)
+            values = []
+            for start, end in bounds:
+                values.extend(simpleubjson.iter_decode(data[start:end]))
+            self.assertEqual(values, self.records)
+
+    def test_split_empty_data(self):
+        self.assertEqual(parallel.split_records(bytes(), 4), [])
+
+    def test_fail_to_split_truncated_data(self):
+        self.assertRaises(ValueError, parallel.split_records,
+                          b('i\x01[i\x02'), 2)
+
+    def test_iter_decode_file(self):
+        values = parallel.iter_decode_file(self.path, workers=2, parts=5,
+                                           max_pending=2)
+        self.assertEqual(list(values), self.records)
+
+    def test_iter_decode_file_unordered(self):
+        values = parallel.iter_decode_file(self.path, workers=2,
+                                           ordered=False, max_pending=1)
+        self.assertEqual(sorted(values), list(enumerate(self.records)))
+
+
+class ParallelEncodeTestCase(unittest.TestCase):
+
+    records = [{'id': i, 'tags': ['x'] * (i % 5)} for i in range(100)]
+
+    def setUp(self):
+        self.source = bytes().join(simpleubjson.encode(record)
+                                   for record in self.records)
+
+    def test_encode_many(self):
+        data = parallel.encode_many(self.records, workers=2, batch_size=7)
+        self.assertEqual(data, self.source)
+
+    def test_write_to_output(self):
+        output = StringIO()
+        self.assertEqual(parallel.encode_many(iter(self.records), output,
+                                              workers=2, batch_size=3,
+                                              max_pending=1), None)
+        self.assertEqual(output.getvalue(), self.source)
+
+    def test_encode_as_array(self):
+        data = parallel.encode_many(self.records, workers=2, array=True)
+        self.assertEqual(data, b('[') + self.source + b(']'))
+        self.assertEqual(simpleubjson.decode(data, container='eager'),
+                         self.records)
+
+    def test_encode_as_draft8_array(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            data = parallel.encode_many([1, 2], workers=1, array=True,
+                                        spec='draft8')
+        self.assertEqual(data, b('a\xffB\x01B\x02E'))
+
+    def test_encode_nothing(self):
+        self.assertEqual(parallel.encode_many([], workers=1), bytes())
+        self.assertEqual(parallel.encode_many([], workers=1, array=True),
+                         b('[]'))
+
+    def test_use_default_handler(self):
+        data = parallel.encode_many([1 + 2j], workers=1,
+                                    default=encode_complex)
+        self.assertEqual(data, simpleubjson.encode([1.0, 2.0]))
+
+    def test_pass_encoder_options(self):
+        records = [[i] * 5 for i in range(20)]
+        data = parallel.encode_many(records, workers=2, batch_size=3,
+                                    spec='draft12', numeric_arrays=True,
+                                    shape_cache=None)
+        self.assertEqual(data, bytes().join(
+            simpleubjson.encode(record, spec='draft12', numeric_arrays=True)
+            for record in records))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+import json
+import os
+import unittest
+import warnings
+import simpleubjson
+from simpleubjson.compat import b
+from simpleubjson.parser import Parser
+
+
+class Draft9ParserTestCase(unittest.TestCase):
+
+    spec = 'draft9'
+    source = b('i\x01[i\x02{Si\x03foo[]}]NSi\x03barZ')
+    expected = [1, [2, {'foo': []}], 'bar', None]
+
+    def parser(self, **kwargs):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return Parser(self.spec, **kwargs)
+
+    def feed_by(self, parser, source, size):
+        values = []
+        for idx in range(0, len(source), size):
+            values.extend(parser.feed(source[idx:idx + size]))
+        return values
+
+    def test_feed_whole_data(self):
+        parser = self.parser()
+        self.assertEqual(parser.feed(self.source), self.expected)
+        self.assertEqual(parser.pending, 0)
+        parser.close()
+
+    def test_feed_by_byte(self):
+        parser = self.parser()
+        self.assertEqual(self.feed_by(parser, self.source, 1), self.expected)
+        parser.close()
+
+    def test_feed_by_chunks(self):
+        for size in range(2, 8):
+            parser = self.parser()
+            self.assertEqual(self.feed_by(parser, self.source, size),
+                             self.expected)
+            parser.close()
+
+    def test_feed_bytearray(self):
+        parser = self.parser()
+        self.assertEqual(parser.feed(bytearray(self.source)), self.expected)
+
+    def test_keep_only_incomplete_value(self):
+        parser = self.parser()
+        self.assertEqual(parser.feed(self.source[:2]), [1])
+        self.assertEqual(parser.pending, 0)
+        self.assertEqual(parser.feed(self.source[2:9]), [])
+        # Items of incomplete containers are already decoded
+        self.assertTrue(0 < parser.pending < 7)
+
+    def test_drop_trailing_noops(self):
+        parser = self.parser()
+        source = self.source[:2] + b('NN')
+        self.assertEqual(parser.feed(source), [self.expected[0]])
+        self.assertEqual(parser.feed(b('N')), [])
+        self.assertEqual(parser.pending, 0)
+        parser.close()
+
+    def test_fail_close_with_incomplete_value(self):
+        parser = self.parser()
+        parser.feed(self.source[:-2])
+        self.assertRaises(ValueError, parser.close)
+
+    def test_fail_on_invalid_data(self):
+        parser = self.parser()
+        self.assertRaises(ValueError, parser.feed, b('\x01'))
+
+    def test_keep_feeding_after_failure(self):
+        parser = self.parser()
+        self.assertEqual(parser.feed(self.source[:1]), [])
+        self.assertRaises(ValueError, parser.feed, b('\x01\x01'))
+        # Buffer isn't locked by views left from the failed call
+        self.assertRaises(ValueError, parser.feed, b('\x01'))
+        self.assertEqual(parser.pending, 4)
+
+    def test_feed_encoded_data_files(self):
+        dirname = os.path.join(os.path.dirname(__file__), 'data')
+        for name in sorted(os.listdir(dirname)):
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(dirname, name)) as fobj:
+                data = json.load(fobj)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                source = simpleubjson.encode(data, spec=self.spec)
+                expected = list(simpleubjson.iter_decode(source,
+                                                         spec=self.spec))
+            parser = self.parser()
+            self.assertEqual(self.feed_by(parser, source, 7), expected)
+
+
+class Draft8ParserTestCase(Draft9ParserTestCase):
+
+    spec = 'draft8'
+    source = b('B\x01a\x02B\x02o\x01s\x03fooa\xffENs\x03barZ')
+    expected = [1, [2, {'foo': []}], 'bar', None]
+
+    def test_feed_unsized_containers(self):
+        parser = self.parser()
+        source = b('a\xffB\x01o\xffs\x03fooB\x02EEZ')
+        self.assertEqual(self.feed_by(parser, source, 1),
+                         [[1, [('foo', 2)]], None])
+
+    def test_long_strings(self):
+        parser = self.parser()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            source = simpleubjson.encode(['x' * 300], spec=self.spec)
+        self.assertEqual(self.feed_by(parser, source, 100), [['x' * 300]])
+
+
+if __name__ == '__main__':
+    unittest.main()
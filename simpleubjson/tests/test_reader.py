@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+import unittest
+import simpleubjson
+from simpleubjson.compat import BytesIO as StringIO, b, bytes
+from simpleubjson.reader import ChunkedReader, PeekReader
+
+
+class CountingStream(object):
+
+    def __init__(self, data):
+        self.stream = StringIO(data)
+        self.calls = 0
+
+    def read(self, size=-1):
+        self.calls += 1
+        return self.stream.read(size)
+
+
+class ChunkedReaderTestCase(unittest.TestCase):
+
+    def test_read_across_chunks(self):
+        reader = ChunkedReader(StringIO(b('foobarbaz')), chunk_size=2)
+        self.assertEqual(reader.read(1), b('f'))
+        self.assertEqual(reader.read(4), b('ooba'))
+        self.assertEqual(reader.read(10), b('rbaz'))
+        self.assertEqual(reader.read(1), bytes())
+
+    def test_read_all(self):
+        reader = ChunkedReader(StringIO(b('foobarbaz')), chunk_size=4)
+        reader.read(2)
+        self.assertEqual(reader.read(), b('obarbaz'))
+
+    def test_read_large_data_bypassing_buffer(self):
+        reader = ChunkedReader(StringIO(b('x' * 100)), chunk_size=8)
+        self.assertEqual(reader.read(3), b('xxx'))
+        self.assertEqual(reader.read(50), b('x' * 50))
+        self.assertEqual(reader.tell(), 53)
+        self.assertEqual(reader.read(), b('x' * 47))
+
+    def test_read_source_by_chunks(self):
+        source = CountingStream(b('[') + b('i\x01') * 100 + b(']'))
+        reader = ChunkedReader(source, chunk_size=64)
+        data = list(simpleubjson.decode(reader))
+        self.assertEqual(data, [1] * 100)
+        self.assertEqual(source.calls, 4)
+
+    def test_use_readinto(self):
+        source = StringIO(b('Si\x03foo'))
+        reader = ChunkedReader(source)
+        self.assertEqual(simpleubjson.decode(reader), 'foo')
+
+    def test_decode_concatenated_values(self):
+        reader = ChunkedReader(StringIO(b('i\x01Si\x03fooZ')), chunk_size=3)
+        self.assertEqual(simpleubjson.decode(reader), 1)
+        self.assertEqual(simpleubjson.decode(reader), 'foo')
+        self.assertEqual(reader.tell(), 8)
+        self.assertEqual(reader.unconsumed(), b('Z'))
+        self.assertEqual(simpleubjson.decode(reader), None)
+
+    def test_peek(self):
+        reader = ChunkedReader(StringIO(b('ab')), chunk_size=1)
+        self.assertEqual(reader.peek(), b('a'))
+        self.assertEqual(reader.read(1), b('a'))
+        self.assertEqual(reader.peek(), b('b'))
+        reader.read(1)
+        self.assertEqual(reader.peek(), bytes())
+
+    def test_fail_on_invalid_chunk_size(self):
+        self.assertRaises(ValueError, ChunkedReader, StringIO(), 0)
+
+
+class PeekReaderTestCase(unittest.TestCase):
+
+    def test_peek_without_read_ahead(self):
+        source = StringIO(b('abcd'))
+        reader = PeekReader(source)
+        self.assertEqual(reader.peek(), b('a'))
+        self.assertEqual(source.tell(), 1)
+        self.assertEqual(reader.tell(), 0)
+        self.assertEqual(reader.read(2), b('ab'))
+        self.assertEqual(source.tell(), 2)
+        self.assertEqual(reader.peek(2), b('cd'))
+        self.assertEqual(reader.read(1), b('c'))
+        self.assertEqual(reader.read(), b('d'))
+        self.assertEqual(reader.peek(), bytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
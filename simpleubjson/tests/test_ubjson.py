@@ -7,11 +7,17 @@
 # you should have received as part of this distribution.
 #
 
+import json
+import os
 import unittest
 import simpleubjson
+from simpleubjson.reader import ChunkedReader
+from simpleubjson.draft8 import STRING_S
 from types import GeneratorType
 from decimal import Decimal
-from simpleubjson.compat import BytesIO as StringIO, b, u, long, xrange
+from simpleubjson.compat import (
+    BytesIO as StringIO, b, u, bytes, long, xrange
+)
 
 
 class Draft8TestCase(unittest.TestCase):
@@ -45,6 +51,181 @@ class DecoderTestCase(Draft8TestCase):
         self.assertRaises(TypeError, self.decode, b('%'), default=dummy)
 
 
+class BufferDecoderTestCase(Draft8TestCase):
+
+    source = b('o\x02s\x03foos\x03bars\x03baza\x02B\x01i\x30\x39')
+
+    def test_decode_bytearray(self):
+        data = self.decode(bytearray(self.source))
+        self.assertEqual(data, {'foo': 'bar', 'baz': [1, 12345]})
+
+    def test_decode_memoryview(self):
+        data = self.decode(memoryview(self.source))
+        self.assertEqual(data, {'foo': 'bar', 'baz': [1, 12345]})
+
+    def test_same_result_as_stream_decoder(self):
+        expected = self.decode(StringIO(self.source))
+        self.assertEqual(self.decode(self.source), expected)
+
+    def test_decode_min_byte(self):
+        self.assertEqual(self.decode(b('B\x80')), -128)
+        self.assertEqual(self.decode(StringIO(b('B\x80'))), -128)
+
+    def test_fail_on_truncated_string(self):
+        self.assertRaises(ValueError, self.decode, b('s\x05foo'))
+
+    def test_apply_overridden_handlers(self):
+        decoder = simpleubjson.Draft8BufferDecoder(self.source)
+        decoder.dispatch[STRING_S] = lambda self, tag, length, value: (
+            value.decode('utf-8').upper())
+        self.assertEqual(decoder.decode_next(),
+                         {'FOO': 'BAR', 'BAZ': [1, 12345]})
+
+
+class IterDecodeTestCase(Draft8TestCase):
+
+    source = b('B\x01a\x01B\x02NNa\xffB\x03EB\x04')
+
+    def iter_decode(self, data, **kwargs):
+        return simpleubjson.iter_decode(data, spec='draft-8', **kwargs)
+
+    def test_iter_decode(self):
+        expected = [(0, 1), (2, [2]), (6, [3]), (13, 4)]
+        data = list(self.iter_decode(self.source, offsets=True))
+        self.assertEqual(data, expected)
+        data = list(self.iter_decode(StringIO(self.source), offsets=True))
+        self.assertEqual(data, expected)
+
+    def test_fail_on_truncated_record(self):
+        self.assertRaises(ValueError, list, self.iter_decode(self.source[:-1]))
+        self.assertRaises(ValueError, list,
+                          self.iter_decode(StringIO(self.source[:-1])))
+        self.assertRaises(ValueError, list,
+                          self.iter_decode(StringIO(self.source[:-3])))
+
+
+class EventsTestCase(Draft8TestCase):
+
+    def iter_events(self, data, **kwargs):
+        return list(simpleubjson.iter_events(data, spec='draft-8', **kwargs))
+
+    def test_events(self):
+        source = b('o\x02s\x01aa\x02B\x01o\x00s\x01ba\xffZEs\x03foo')
+        expected = [
+            ('start_object', None, 0),
+            ('key', 'a', 2),
+            ('start_array', None, 5),
+            ('value', 1, 7),
+            ('start_object', None, 9),
+            ('end_object', None, 11),
+            ('end_array', None, 11),
+            ('key', 'b', 11),
+            ('start_array', None, 14),
+            ('value', None, 16),
+            ('end_array', None, 17),
+            ('end_object', None, 18),
+            ('value', 'foo', 18),
+        ]
+        self.assertEqual(self.iter_events(source), expected)
+        self.assertEqual(self.iter_events(StringIO(source)), expected)
+
+    def test_fail_on_truncated_container(self):
+        self.assertRaises(ValueError, self.iter_events, b('a\x02B\x01'))
+        self.assertRaises(ValueError, self.iter_events, b('a\xffB\x01'))
+
+    def test_fail_on_unexpected_end_marker(self):
+        self.assertRaises(ValueError, self.iter_events, b('a\x02E'))
+        self.assertRaises(ValueError, self.iter_events, b('E'))
+
+
+class SkipValueTestCase(Draft8TestCase):
+
+    source = b('o\x02s\x01aa\x03B\x01h\x013o\x00s\x01ba\xffS\x00\x00\x00'
+               '\x03fooEB\x2a')
+
+    def decoders(self, data, **kwargs):
+        yield simpleubjson.Draft8Decoder(data, **kwargs)
+        yield simpleubjson.Draft8Decoder(ChunkedReader(StringIO(data)),
+                                         **kwargs)
+        yield simpleubjson.Draft8BufferDecoder(data, **kwargs)
+
+    def test_skip_value(self):
+        for decoder in self.decoders(self.source):
+            decoder.skip_value()
+            self.assertEqual(decoder.decode_next(), 42)
+            self.assertRaises(ValueError, decoder.skip_value)
+
+    def test_skip_rest_of_container(self):
+        for decoder in self.decoders(self.source):
+            tag, length, value = decoder.next_tlv()
+            self.assertEqual(decoder.decode_next(), 'a')
+            tag, length, value = decoder.next_tlv()
+            decoder.skip_value(tag, length)
+            self.assertEqual(decoder.decode_next(), 'b')
+
+    def test_skip_unsized_containers(self):
+        source = b('a\xffNo\xffs\x01aB\x01EEZ')
+        for decoder in self.decoders(source):
+            decoder.skip_value()
+            self.assertEqual(decoder.decode_next(), None)
+
+    def test_fail_on_truncated_value(self):
+        for source in (b('a\x02B\x01'), b('s\x05foo'), b('a\xffB\x01')):
+            for decoder in self.decoders(source):
+                self.assertRaises(ValueError, decoder.skip_value)
+
+    def test_fail_on_invalid_marker(self):
+        for source in (b('E'), b('a\x02NB\x01B\x02')):
+            for decoder in self.decoders(source):
+                self.assertRaises(ValueError, decoder.skip_value)
+
+
+class ExtractTestCase(Draft8TestCase):
+
+    data = {'user': {'id': 42, 'name': 'foo'},
+            'entities': {'urls': [{'url': 'a'}, {'url': 'b', 'idx': [1]}]}}
+
+    def setUp(self):
+        super(ExtractTestCase, self).setUp()
+        self.source = self.encode(self.data)
+
+    def extract(self, data, paths):
+        return simpleubjson.extract(data, paths, spec='draft8')
+
+    def test_extract_values(self):
+        for data in (self.source, StringIO(self.source)):
+            result = self.extract(data, ['/user/id', '/entities/urls/*/url'])
+            self.assertEqual(result, {'/user/id': 42,
+                                      '/entities/urls/*/url': ['a', 'b']})
+
+    def test_extract_from_unsized_containers(self):
+        source = b('o\xffs\x01aa\xffB\x01B\x02Es\x01bB\x03E')
+        self.assertEqual(self.extract(source, ['/a/1', '/b']),
+                         {'/a/1': 2, '/b': 3})
+
+    def test_stop_after_last_match(self):
+        stream = StringIO(b('o\x02s\x01aB\x01s\x01ba\x01'))
+        self.assertEqual(self.extract(stream, ['/a']), {'/a': 1})
+        self.assertEqual(stream.tell(), 7)
+
+
+class IterItemsTestCase(Draft8TestCase):
+
+    def iter_items(self, source, prefix):
+        for data in (source, StringIO(source)):
+            yield list(simpleubjson.iter_items(data, prefix, spec='draft8'))
+
+    def test_iter_sized_array_items(self):
+        source = self.encode({'meta': None, 'rows': [[1], {'a': 2}, 'b']})
+        for items in self.iter_items(source, 'rows.item'):
+            self.assertEqual(items, [[1], {'a': 2}, 'b'])
+
+    def test_iter_unsized_array_items(self):
+        source = b('o\xffs\x04rowsa\xffa\x01B\x01a\xffB\x02EEE')
+        for items in self.iter_items(source, 'rows.item.item'):
+            self.assertEqual(items, [1, 2])
+
+
 class EncoderTestCase(Draft8TestCase):
 
     def test_fail_if_no_handler_matches(self):
@@ -65,6 +246,57 @@ class EncoderTestCase(Draft8TestCase):
         self.assertEqual(data, b('a\x01s\x08sentinel'))
 
 
+class BufferEncoderTestCase(Draft8TestCase):
+
+    def assert_same_as_encoder(self, data):
+        expected = simpleubjson.Draft8Encoder().encode_next(data)
+        self.assertEqual(simpleubjson.Draft8BufferEncoder().encode_next(data),
+                         expected)
+
+    def test_encode_test_data(self):
+        for name in ('CouchDB4k', 'MediaContent', 'TwitterTimeline'):
+            fname = os.path.join(os.path.dirname(__file__), 'data',
+                                 name + '.compact.json')
+            with open(fname) as f:
+                self.assert_same_as_encoder(json.load(f))
+
+    def test_encode_nested_containers(self):
+        data = [1, [2, [3, {'foo': [4, xrange(3)]}]], 'bar' * 100]
+        self.assert_same_as_encoder(data)
+
+    def test_encode_deeply_nested_array(self):
+        data = []
+        for _ in range(100):
+            data = [data, 1]
+        self.assert_same_as_encoder(data)
+
+    def test_custom_default_handler(self):
+        sentinel = object()
+        data = self.encode([sentinel], default=lambda value: 42)
+        self.assertEqual(data, self.encode([42]))
+
+    def test_iter_encode(self):
+        encoder = simpleubjson.Draft8BufferEncoder()
+        data = [{'foo': i} for i in range(100)]
+        chunks = list(encoder.iter_encode(data, 50))
+        self.assertTrue(len(chunks) > 1)
+        self.assertTrue(all(len(chunk) < 60 for chunk in chunks))
+        self.assertEqual(bytes().join(chunks), self.encode(data))
+        chunks = list(encoder.iter_encode({'foo': data}, 50))
+        self.assertEqual(bytes().join(chunks), self.encode({'foo': data}))
+
+    def test_iter_encode_scalar(self):
+        encoder = simpleubjson.Draft8BufferEncoder()
+        self.assertEqual(list(encoder.iter_encode('foo', 1)),
+                         [self.encode('foo')])
+
+    def test_iter_encode_unsized_containers(self):
+        encoder = simpleubjson.Draft8BufferEncoder()
+        chunks = list(encoder.iter_encode((i for i in range(100)), 10))
+        self.assertEqual(bytes().join(chunks),
+                         self.encode((i for i in range(100))))
+
+
 class NoopTestCase(Draft8TestCase):
 
     def test_decode(self):
@@ -300,6 +532,11 @@ class StringTestCase(Draft8TestCase):
         data = self.encode(u('привет'))
         self.assertEqual(data, expected)
 
+    def test_encode_long_string(self):
+        data = self.encode('x' * 300)
+        self.assertEqual(data, b('S\x00\x00\x01\x2c') + b('x') * 300)
+        self.assertEqual(self.decode(data), 'x' * 300)
+
 
 class ArrayTestCase(Draft8TestCase):
 
@@ -434,6 +671,35 @@ class StreamTestCase(Draft8TestCase):
         self.assertEqual(list(data), [0, N, 1, N, 2, N, 3, N, 4])
 
 
+class NestingTestCase(Draft8TestCase):
+
+    depth = 10000
+
+    def assert_depth(self, data, depth):
+        for _ in range(depth):
+            self.assertEqual(len(data), 1)
+            data = data[0]
+        self.assertEqual(data, {'foo': 42})
+
+    def test_decode_deeply_nested_arrays(self):
+        source = b('a\x01') * self.depth + b('o\x01s\x03fooB\x2a')
+        self.assert_depth(self.decode(source), self.depth)
+
+    def test_decode_deeply_nested_arrays_from_stream(self):
+        source = b('a\x01') * self.depth + b('o\x01s\x03fooB\x2a')
+        self.assert_depth(self.decode(StringIO(source)), self.depth)
+
+    def test_decode_deeply_nested_unsized_arrays(self):
+        source = (b('a\xff') * self.depth + b('o\x01s\x03fooB\x2a')
+                  + b('E') * self.depth)
+        self.assert_depth(list(self.decode(source)), self.depth)
+
+    def test_fail_on_truncated_nested_container(self):
+        self.assertRaises(ValueError, self.decode, b('a\x02a\x01B\x01'))
+        self.assertRaises(ValueError, self.decode,
+                          StringIO(b('a\x02a\x01B\x01')))
+
+
 class ObjectTestCase(Draft8TestCase):
 
     def test_decode_object(self):
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+
+import gc
+import os
+import shutil
+import tempfile
+import unittest
+import simpleubjson
+from array import array
+from simpleubjson.compat import BytesIO as StringIO, b, u
+from simpleubjson.draft12 import Draft12BufferDecoder
+from simpleubjson.exceptions import (
+    EarlyEndOfStreamError, EncodeError, MarkerError
+)
+from simpleubjson.parser import Parser
+from simpleubjson.tools.index import build_index
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Draft12TestCase(unittest.TestCase):
+    def setUp(self):
+        self.decode = lambda *a, **k: simpleubjson.decode(spec='draft-12',
+                                                          *a, **k)
+        self.encode = lambda *a, **k: simpleubjson.encode(spec='draft-12',
+                                                          *a, **k)
+
+
+class ContainerTestCase(Draft12TestCase):
+
+    def test_decode_unsized_containers(self):
+        data = b('{i\x03foo[i\x01Si\x03barZ]i\x01x{}}')
+        self.assertEqual(self.decode(data),
+                         {'foo': [1, 'bar', None], 'x': {}})
+
+    def test_decode_counted_containers(self):
+        data = b('[#i\x02{#i\x01i\x01ai\x05[]')
+        self.assertEqual(self.decode(data), [{'a': 5}, []])
+
+    def test_decode_typed_numbers(self):
+        data = b('[$I#i\x03\x00\x01\x01\x00\xff\xff')
+        self.assertEqual(self.decode(data), [1, 256, -1])
+        self.assertEqual(self.decode(b('[$d#i\x00')), [])
+
+    def test_decode_typed_numbers_as_array(self):
+        value = self.decode(b('[$l#i\x02\x00\x00\x00\x01\xff\xff\xff\xfe'),
+                            typed_arrays=True)
+        self.assertTrue(isinstance(value, array))
+        self.assertEqual(list(value), [1, -2])
+
+    def test_decode_typed_constants_and_strings(self):
+        self.assertEqual(self.decode(b('[$T#i\x02')), [True, True])
+        self.assertEqual(self.decode(b('{$S#i\x01i\x01ai\x02xy')),
+                         {'a': 'xy'})
+
+    def test_decode_typed_containers(self):
+        data = b('[$[#i\x02$i#i\x01\x07$U#i\x00')
+        self.assertEqual(self.decode(data), [[7], []])
+
+    def test_decode_from_stream(self):
+        data = b('{i\x01a[$i#i\x02\x01\x02i\x01b[i\x01]}')
+        self.assertEqual(self.decode(StringIO(data)),
+                         {'a': [1, 2], 'b': [1]})
+
+    def test_decode_consecutive_values_from_stream(self):
+        data = self.encode({'a': [1, 2]})
+        stream = StringIO(data + data)
+        self.assertEqual(self.decode(stream), {'a': [1, 2]})
+        self.assertEqual(stream.tell(), len(data))
+        self.assertEqual(self.decode(stream), {'a': [1, 2]})
+        codec = simpleubjson.Codec(spec='draft12')
+        stream = StringIO(data + data)
+        self.assertEqual(codec.loads(stream), {'a': [1, 2]})
+        self.assertEqual(codec.loads(stream), {'a': [1, 2]})
+
+    def test_apply_hooks(self):
+        data = b('[#i\x02{#i\x01i\x01ai\x01[$i#i\x01\x02')
+        self.assertEqual(self.decode(data, object_pairs_hook=tuple,
+                                     array_hook=tuple),
+                         ((('a', 1),), (2,)))
+
+    def test_fail_on_untyped_count(self):
+        self.assertRaises(MarkerError, self.decode, b('[$i\x01]'))
+
+    def test_fail_on_truncated_containers(self):
+        for data in ('[$i#i\x03\x01\x02', '[#i\x02i\x01', '{i\x01a', '[$'):
+            self.assertRaises(EarlyEndOfStreamError, self.decode, b(data))
+
+    def test_fail_on_unsupported_container_mode(self):
+        self.assertRaises(ValueError, self.decode, b('[]'), container='lazy')
+
+
+class MultidimensionalArrayTestCase(Draft12TestCase):
+
+    data = b('[$I#[$U#i\x02\x02\x02\x00\x01\x00\x02\x00\x03\x00\x04Z')
+
+    def test_reject_extension_by_default(self):
+        self.assertRaises(MarkerError, self.decode, self.data)
+        self.assertRaises(MarkerError, build_index, self.data, spec='draft12')
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_decode_with_ndarrays(self):
+        for source in (self.data, StringIO(self.data)):
+            value = simpleubjson.decode(source, spec='draft12',
+                                        ndarrays=True)
+            self.assertEqual(value.shape, (2, 2))
+            self.assertEqual(value.tolist(), [[1, 2], [3, 4]])
+        value = self.decode(b('[$i#[$U#i\x02\x02\x00'), ndarrays=True)
+        self.assertEqual(value.shape, (2, 0))
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_skip_as_flat_array(self):
+        decoder = Draft12BufferDecoder(self.data, ndarrays=True)
+        decoder.skip_value()
+        self.assertEqual(decoder.offset, len(self.data) - 1)
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_fail_on_invalid_dimensions(self):
+        for data in ('[$i#[$d#i\x01\x00\x00\x00\x00',
+                     '[$i#[i\x01]\x01', '[#[$i#i\x01\x01Z'):
+            self.assertRaises(MarkerError, self.decode, b(data),
+                              ndarrays=True)
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class NDArrayTestCase(Draft12TestCase):
+
+    def test_encode_ndarray(self):
+        value = numpy.array([1.5, -2], dtype='<f8')
+        self.assertEqual(self.encode(value),
+                         self.encode(array('d', [1.5, -2])))
+        value = numpy.array([1, 65535], dtype=numpy.uint16)
+        self.assertEqual(self.encode(value),
+                         b('[$l#i\x02\x00\x00\x00\x01\x00\x00\xff\xff'))
+
+    def test_encode_multidimensional_ndarray(self):
+        value = numpy.arange(6, dtype=numpy.int8).reshape(2, 3)
+        self.assertEqual(self.encode(value),
+                         b('[$i#[$i#i\x02\x02\x03\x00\x01\x02\x03\x04\x05'))
+
+    def test_encode_other_dtypes_as_lists(self):
+        self.assertEqual(self.encode(numpy.array([True, False])),
+                         self.encode([True, False]))
+        self.assertEqual(self.encode(numpy.array(2.5)), self.encode(2.5))
+
+    def test_decode_views_of_buffer(self):
+        value = numpy.arange(12, dtype=numpy.int32).reshape(3, 4)
+        source = bytearray(self.encode({'x': value}))
+        decoded = self.decode(source, ndarrays=True)['x']
+        self.assertEqual(decoded.shape, (3, 4))
+        self.assertTrue((decoded == value).all())
+        # The last byte is object closing marker
+        source[-2] = 42
+        self.assertEqual(decoded[2, 3], 42)
+
+    def test_keep_views_valid_after_source_release(self):
+        value = numpy.arange(1000, dtype=numpy.int64)
+        source = bytearray(self.encode(value))
+        decoded = self.decode(source, ndarrays=True)
+        del source
+        gc.collect()
+        self.assertTrue((decoded == value).all())
+        # Arrays refer to the underlying buffer, not the passed view
+        view = memoryview(self.encode(value))
+        decoded = self.decode(view, ndarrays=True)
+        view.release()
+        gc.collect()
+        self.assertTrue((decoded == value).all())
+
+    def test_keep_views_valid_after_file_is_closed(self):
+        value = numpy.arange(1000, dtype=numpy.int64)
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'data.ubj')
+            with open(path, 'wb') as fobj:
+                fobj.write(self.encode(value))
+            decoded = simpleubjson.decode_file(path, spec='draft12',
+                                               ndarrays=True)
+            gc.collect()
+            self.assertTrue((decoded == value).all())
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def test_parse_by_chunks(self):
+        value = numpy.arange(10, dtype=numpy.int32)
+        source = self.encode(value) * 2
+        parser = Parser('draft12', ndarrays=True)
+        values = []
+        for i in range(0, len(source), 7):
+            values.extend(parser.feed(source[i:i + 7]))
+        parser.close()
+        self.assertEqual(len(values), 2)
+        for decoded in values:
+            self.assertTrue((decoded == value).all())
+
+    def test_decode_from_stream(self):
+        value = numpy.linspace(0, 1, 5)
+        decoded = self.decode(StringIO(self.encode(value)), ndarrays=True)
+        self.assertTrue((decoded == value).all())
+
+    def test_fail_on_too_big_unsigned_integers(self):
+        value = numpy.array([2 ** 64 - 1], dtype=numpy.uint64)
+        self.assertRaises(EncodeError, self.encode, value)
+
+
+class EncoderTestCase(Draft12TestCase):
+
+    def test_encode_object_keys_without_marker(self):
+        self.assertEqual(self.encode({'a': [1, None]}),
+                         b('{i\x01a[i\x01Z]}'))
+
+    def test_encode_typed_array(self):
+        data = self.encode(array('h', [1, -2]))
+        self.assertEqual(data, b('[$I#i\x02\x00\x01\xff\xfe'))
+        self.assertEqual(self.decode(data), [1, -2])
+
+    def test_widen_unsigned_array(self):
+        data = self.encode(array('H', [65535]))
+        self.assertEqual(data, b('[$l#i\x01\x00\x00\xff\xff'))
+
+    def test_encode_unicode_array_as_strings(self):
+        self.assertEqual(self.decode(self.encode(array('u', u('ab')))),
+                         ['a', 'b'])
+
+    def test_encode_numeric_arrays_as_typed(self):
+        data = self.encode({'a': [1, 200], 'b': (0.5,)}, numeric_arrays=True)
+        self.assertEqual(data, b('{i\x01a[$U#i\x02\x01\xc8'
+                                 'i\x01b[$d#i\x01\x3f\x00\x00\x00}'))
+        self.assertEqual(self.decode(data), {'a': [1, 200], 'b': [0.5]})
+
+    def test_pack_zeros_as_floats(self):
+        data = self.encode([0.0] * 3, numeric_arrays=True)
+        self.assertEqual(data, b('[$d#i\x03') + b('\x00') * 12)
+        self.assertEqual(len(data), 18)
+        self.assertEqual(self.decode(data), [0.0] * 3)
+        data = self.encode([0.0, -1.5], numeric_arrays=True)
+        self.assertEqual(data, b('[$d#i\x02\x00\x00\x00\x00'
+                                 '\xbf\xc0\x00\x00'))
+
+    def test_roundtrip(self):
+        value = {'id': 1, 'tags': ['x', 'y'], 'nested': [{'k': [1.5]}],
+                 'values': array('d', [0.5, 2.0])}
+        expected = dict(value, values=[0.5, 2.0])
+        self.assertEqual(self.decode(self.encode(value)), expected)
+
+
+class ToolsTestCase(Draft12TestCase):
+
+    source = b('[$i#i\x02\x01\x02{i\x01a[#i\x01Z}Si\x01x')
+
+    def test_skip_values(self):
+        index = build_index(self.source, spec='draft12')
+        self.assertEqual(list(index.offsets), [0, 8, 18])
+        self.assertEqual(index.end, len(self.source))
+
+    def test_iter_decode(self):
+        self.assertEqual(list(simpleubjson.iter_decode(StringIO(self.source),
+                                                       spec='draft12')),
+                         [[1, 2], {'a': [None]}, 'x'])
+
+    def test_parse_by_chunks(self):
+        parser = Parser('draft12')
+        values = []
+        for i in range(len(self.source)):
+            values.extend(parser.feed(self.source[i:i + 1]))
+        parser.close()
+        self.assertEqual(values, [[1, 2], {'a': [None]}, 'x'])
+
+    def test_iter_events(self):
+        events = list(simpleubjson.iter_events(b('{i\x01a[$i#i\x01\x05}'),
+                                               spec='draft12'))
+        self.assertEqual(events, [('start_object', None, 0),
+                                  ('key', 'a', 1),
+                                  ('start_array', None, 4),
+                                  ('value', 5, 10),
+                                  ('end_array', None, 11),
+                                  ('end_object', None, 11)])
+
+    def test_extract(self):
+        data = b('{i\x01a[$i#i\x02\x01\x02i\x01b{#i\x01i\x01cSi\x01x')
+        self.assertEqual(simpleubjson.extract(data, ['/b/c', '/a/1'],
+                                              spec='draft12'),
+                         {'/b/c': 'x', '/a/1': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,11 +7,21 @@
 # you should have received as part of this distribution.
 #
 
+import json
+import os
+import shutil
+import tempfile
 import unittest
 import simpleubjson
+from array import array
+from simpleubjson.draft9 import INT8, STRING
+from simpleubjson.lazy import LazyArray, LazyObject, materialize
+from simpleubjson.reader import ChunkedReader
 from types import GeneratorType
 from decimal import Decimal
-from simpleubjson.compat import BytesIO as StringIO, b, u, long, xrange
+from simpleubjson.compat import (
+    BytesIO as StringIO, b, u, bytes, long, xrange
+)
 
 
 class Draft9TestCase(unittest.TestCase):
@@ -45,6 +55,57 @@ class DecoderTestCase(Draft9TestCase):
         self.assertRaises(TypeError, self.decode, b('%'), default=dummy)
 
 
+class BufferDecoderTestCase(Draft9TestCase):
+
+    source = b('{Si\x03fooSi\x03barSi\x03baz[i\x01I\x30\x39d\x40\x48\xf5\xc3]}')
+
+    def test_decode_bytearray(self):
+        data = dict(self.decode(bytearray(self.source)))
+        self.assertEqual(data['foo'], 'bar')
+        self.assertEqual(data['baz'][:2], [1, 12345])
+
+    def test_decode_memoryview(self):
+        data = dict(self.decode(memoryview(self.source)))
+        self.assertEqual(data['foo'], 'bar')
+        self.assertEqual(data['baz'][:2], [1, 12345])
+
+    def test_same_result_as_stream_decoder(self):
+        expected = dict(self.decode(StringIO(self.source)))
+        self.assertEqual(dict(self.decode(self.source)), expected)
+
+    def test_track_offset(self):
+        decoder = simpleubjson.Draft9BufferDecoder(b('NNi\x01Si\x03foo'))
+        self.assertEqual(decoder.decode_next(), 1)
+        self.assertEqual(decoder.tell(), 4)
+        self.assertEqual(decoder.decode_next(), 'foo')
+        self.assertEqual(decoder.tell(), 10)
+
+    def test_decode_min_int8(self):
+        self.assertEqual(self.decode(b('i\x80')), -128)
+        self.assertEqual(self.decode(StringIO(b('i\x80'))), -128)
+
+    def test_fail_on_truncated_number(self):
+        self.assertRaises(ValueError, self.decode, b('l\x00\x01'))
+
+    def test_fail_on_truncated_string(self):
+        self.assertRaises(ValueError, self.decode, b('Si\x05foo'))
+
+    def test_apply_overridden_handlers(self):
+        class Decoder(simpleubjson.Draft9BufferDecoder):
+            dispatch = simpleubjson.Draft9BufferDecoder.dispatch.copy()
+
+            def decode_string(self, tag, length, value):
+                return value.decode('utf-8').upper()
+            dispatch[STRING] = decode_string
+        decoder = Decoder(self.source, container='eager')
+        self.assertEqual(decoder.decode_next(),
+                         {'FOO': 'BAR', 'BAZ': [1, 12345, 3.140000104904175]})
+        decoder = simpleubjson.Draft9BufferDecoder(self.source,
+                                                   container='eager')
+        decoder.dispatch[INT8] = lambda self, tag, length, value: -value
+        self.assertEqual(decoder.decode_next()['baz'][0], -1)
+
+
 class EncoderTestCase(Draft9TestCase):
 
     def test_fail_if_no_handler_matches(self):
@@ -65,6 +126,85 @@ class EncoderTestCase(Draft9TestCase):
         self.assertEqual(data, b('[Si\x08sentinel]'))
 
 
+class BufferEncoderTestCase(Draft9TestCase):
+
+    def assert_same_as_encoder(self, data):
+        expected = simpleubjson.Draft9Encoder().encode_next(data)
+        self.assertEqual(simpleubjson.Draft9BufferEncoder().encode_next(data),
+                         expected)
+
+    def test_encode_test_data(self):
+        for name in ('CouchDB4k', 'MediaContent', 'TwitterTimeline'):
+            fname = os.path.join(os.path.dirname(__file__), 'data',
+                                 name + '.compact.json')
+            with open(fname) as f:
+                self.assert_same_as_encoder(json.load(f))
+
+    def test_encode_nested_containers(self):
+        data = [1, [2, [3, {'foo': [4, xrange(3)]}]], 'bar' * 100]
+        self.assert_same_as_encoder(data)
+
+    def test_encode_deeply_nested_array(self):
+        data = []
+        for _ in range(100):
+            data = [data, 1]
+        self.assert_same_as_encoder(data)
+
+    def test_custom_default_handler(self):
+        sentinel = object()
+        data = self.encode([sentinel], default=lambda value: 42)
+        self.assertEqual(data, self.encode([42]))
+
+    def test_iter_encode(self):
+        encoder = simpleubjson.Draft9BufferEncoder()
+        data = [{'foo': i} for i in range(100)]
+        chunks = list(encoder.iter_encode(data, 50))
+        self.assertTrue(len(chunks) > 1)
+        self.assertTrue(all(len(chunk) < 60 for chunk in chunks))
+        self.assertEqual(bytes().join(chunks), self.encode(data))
+        chunks = list(encoder.iter_encode({'foo': data}, 50))
+        self.assertEqual(bytes().join(chunks), self.encode({'foo': data}))
+
+    def test_iter_encode_scalar(self):
+        encoder = simpleubjson.Draft9BufferEncoder()
+        self.assertEqual(list(encoder.iter_encode('foo', 1)),
+                         [self.encode('foo')])
+
+    def test_pack_numeric_arrays(self):
+        self.assertEqual(self.encode([1000, -2000, 300], numeric_arrays=True),
+                         b('[I\x03\xe8I\xf8\x30I\x01\x2c]'))
+        self.assertEqual(self.encode((1.5, 0.0), numeric_arrays=True),
+                         b('[d\x3f\xc0\x00\x00d\x00\x00\x00\x00]'))
+        data = [[200, 100], [0.5, 2.5], array('l', [2 ** 40])]
+        self.assertEqual(self.decode(self.encode(data, numeric_arrays=True),
+                                     container='eager'),
+                         [[200, 100], [0.5, 2.5], [2 ** 40]])
+
+    def test_pack_zeros_as_floats(self):
+        # Zeros fit any float type instead of widening the run to doubles
+        data = self.encode([0.0] * 3, numeric_arrays=True)
+        self.assertEqual(data, b('[d\x00\x00\x00\x00d\x00\x00\x00\x00'
+                                 'd\x00\x00\x00\x00]'))
+        self.assertEqual(len(data), 17)
+        self.assertEqual(self.decode(data, container='eager'), [0.0] * 3)
+
+    def test_never_widen_items(self):
+        for data in ([1, -2, 300], [150, -115], [-126, 242, 186, 21, -11],
+                     [2 ** 40, 1], [1.5, 1e300], [0, 255], [128, 255]):
+            self.assertTrue(len(self.encode(data, numeric_arrays=True))
+                            <= len(self.encode(data)))
+            self.assertEqual(self.decode(self.encode(data,
+                                                     numeric_arrays=True),
+                                         container='eager'),
+                             self.decode(self.encode(data), container='eager'))
+
+    def test_skip_packing_of_mixed_arrays(self):
+        for data in ([1, 2.5], [1, True], [2 ** 64, 1], [1.0, float('inf')],
+                     ['a', 'b']):
+            self.assertEqual(self.encode(data, numeric_arrays=True),
+                             self.encode(data))
+
+
 class NoopTestCase(Draft9TestCase):
 
     def test_decode(self):
@@ -458,6 +598,470 @@ class StreamTestCase(Draft9TestCase):
         self.assertEqual(list(data), [0, N, 1, N, 2, N, 3, N, 4])
 
 
+class NestingTestCase(Draft9TestCase):
+
+    depth = 10000
+
+    def assert_depth(self, data, depth):
+        for _ in range(depth):
+            self.assertEqual(len(data), 1)
+            data = data[0]
+        self.assertEqual(data, [('foo', 42)])
+
+    def test_decode_deeply_nested_arrays(self):
+        source = (b('[') * self.depth + b('{Si\x03fooi\x2a}')
+                  + b(']') * self.depth)
+        self.assert_depth(list(self.decode(source)), self.depth)
+
+    def test_decode_deeply_nested_arrays_from_stream(self):
+        source = (b('[') * self.depth + b('{Si\x03fooi\x2a}')
+                  + b(']') * self.depth)
+        self.assert_depth(list(self.decode(StringIO(source))), self.depth)
+
+    def test_decode_container(self):
+        decoder = simpleubjson.Draft9Decoder(b('[[i\x01]{Si\x03fooZ}]'))
+        tag, length, value = decoder.next_tlv()
+        data = decoder.decode_container(tag, length, value)
+        self.assertEqual(data, [[1], [('foo', None)]])
+
+    def test_fail_on_mismatched_container_end(self):
+        self.assertRaises(ValueError, list, self.decode(b('[[i\x01}]')))
+        self.assertRaises(ValueError, list, self.decode(b('[{Si\x03fooZ]]')))
+
+    def test_fail_on_truncated_nested_container(self):
+        self.assertRaises(ValueError, list, self.decode(b('[[[i\x01]')))
+        self.assertRaises(ValueError, list,
+                          self.decode(StringIO(b('[[[i\x01]'))))
+
+
+class EagerContainerTestCase(Draft9TestCase):
+
+    def setUp(self):
+        super(EagerContainerTestCase, self).setUp()
+        self.decode = lambda data, container='eager', **k: \
+            simpleubjson.decode(data, spec='draft-9', container=container, **k)
+
+    def test_decode_array_as_list(self):
+        data = self.decode(b('[i\x01i\x02[i\x03]]'))
+        self.assertEqual(data, [1, 2, [3]])
+
+    def test_decode_object_as_dict(self):
+        data = self.decode(b('{Si\x03foo{Si\x03bar[i\x2a]}}'))
+        self.assertEqual(data, {'foo': {'bar': [42]}})
+
+    def test_decode_from_stream(self):
+        data = self.decode(StringIO(b('[{Si\x03fooi\x2a}[]]')))
+        self.assertEqual(data, [{'foo': 42}, []])
+
+    def test_decode_noop_in_object(self):
+        data = self.decode(b('{NSi\x03fooi\x2a}'), allow_noop=True)
+        N = simpleubjson.NOOP
+        self.assertEqual(data, {N: N, 'foo': 42})
+
+    def test_array_hook(self):
+        data = self.decode(b('[i\x01[i\x02]]'), array_hook=tuple)
+        self.assertEqual(data, (1, (2,)))
+
+    def test_object_hook(self):
+        def hook(obj):
+            return sorted(obj.items())
+        data = self.decode(b('[{Si\x03fooi\x01Si\x03bari\x02}]'),
+                           object_hook=hook)
+        self.assertEqual(data, [[('bar', 2), ('foo', 1)]])
+
+    def test_object_pairs_hook(self):
+        data = self.decode(StringIO(b('{Si\x01bi\x01Si\x01ai\x02}')),
+                           object_pairs_hook=list)
+        self.assertEqual(data, [('b', 1), ('a', 2)])
+
+    def test_object_pairs_hook_overrides_object_hook(self):
+        data = self.decode(b('{Si\x01bi\x01}'), object_hook=len,
+                           object_pairs_hook=list)
+        self.assertEqual(data, [('b', 1)])
+
+    def test_hooks_in_stream_mode(self):
+        data = self.decode(b('[[i\x01]{Si\x01ai\x02}]'),
+                           container='stream', array_hook=tuple,
+                           object_pairs_hook=dict)
+        self.assertEqual(list(data), [(1,), {'a': 2}])
+
+    def test_fail_on_unknown_container_mode(self):
+        self.assertRaises(ValueError, self.decode, b('[]'), container='foo')
+
+
+class LazyContainerTestCase(Draft9TestCase):
+
+    data = {'id': 42, 'name': 'foo', 'tags': ['a', 'b', {'c': None}],
+            'meta': {}}
+
+    def setUp(self):
+        super(LazyContainerTestCase, self).setUp()
+        self.decode = lambda data, **k: \
+            simpleubjson.decode(data, spec='draft-9', container='lazy', **k)
+        self.source = self.encode(self.data)
+
+    def test_decode_object_as_mapping(self):
+        for source in (self.source, bytearray(self.source)):
+            obj = self.decode(source)
+            self.assertTrue(isinstance(obj, LazyObject))
+            self.assertEqual(obj['id'], 42)
+            self.assertEqual(obj.get('foo'), None)
+            self.assertTrue('name' in obj)
+            self.assertEqual(len(obj), 4)
+            self.assertEqual(sorted(obj), ['id', 'meta', 'name', 'tags'])
+            self.assertEqual(obj, self.data)
+
+    def test_decode_array_as_sequence(self):
+        arr = self.decode(self.source)['tags']
+        self.assertTrue(isinstance(arr, LazyArray))
+        self.assertEqual(arr[0], 'a')
+        self.assertEqual(arr[-1]['c'], None)
+        self.assertEqual(arr[:2], ['a', 'b'])
+        self.assertEqual(len(arr), 3)
+        self.assertEqual(arr.index('b'), 1)
+        self.assertRaises(IndexError, arr.__getitem__, 3)
+
+    def test_decode_members_once(self):
+        obj = self.decode(self.source)
+        self.assertTrue(obj['tags'] is obj['tags'])
+
+    def test_materialize(self):
+        obj = self.decode(self.source)
+        data = obj.materialize()
+        self.assertEqual(data, self.data)
+        self.assertTrue(type(data) is dict)
+        self.assertTrue(type(data['tags']) is list)
+        self.assertEqual(materialize(obj['tags'][2]), {'c': None})
+        self.assertEqual(materialize(obj['id']), 42)
+
+    def test_materialize_with_hooks(self):
+        obj = self.decode(b('{Si\x01a[i\x01]}'), array_hook=tuple)
+        self.assertEqual(obj.materialize(), {'a': (1,)})
+
+    def test_skip_noop(self):
+        obj = self.decode(b('{NSi\x01aN[Ni\x01N]N}'), allow_noop=True)
+        self.assertEqual(obj, {'a': [1]})
+
+    def test_decode_many_values(self):
+        decoder = simpleubjson.Draft9BufferDecoder(b('[i\x01][i\x02]'),
+                                                   container='lazy')
+        first, second = list(decoder)
+        decoder.reset(b('[i\x03]'))
+        self.assertEqual(decoder.decode_next(), [3])
+        self.assertEqual((first, second), ([1], [2]))
+
+    def test_fail_on_stream_source(self):
+        self.assertRaises(ValueError, self.decode, StringIO(self.source))
+
+    def test_fail_on_truncated_container(self):
+        self.assertRaises(ValueError, self.decode, self.source[:-1])
+
+
+class IterDecodeTestCase(Draft9TestCase):
+
+    source = b('i\x01[i\x02]NN{Si\x03fooZ}Si\x03bar')
+
+    def iter_decode(self, data, **kwargs):
+        return simpleubjson.iter_decode(data, spec='draft-9', **kwargs)
+
+    def test_iter_decode_buffer(self):
+        data = list(self.iter_decode(self.source))
+        self.assertEqual(data, [1, [2], {'foo': None}, 'bar'])
+
+    def test_iter_decode_stream(self):
+        data = list(self.iter_decode(StringIO(self.source)))
+        self.assertEqual(data, [1, [2], {'foo': None}, 'bar'])
+
+    def test_iter_decode_stream_mode(self):
+        data = list(self.iter_decode(self.source, container='stream'))
+        self.assertEqual(data, [1, [2], [('foo', None)], 'bar'])
+
+    def test_offsets(self):
+        expected = [(0, 1), (2, [2]), (6, {'foo': None}), (17, 'bar')]
+        data = list(self.iter_decode(self.source, offsets=True))
+        self.assertEqual(data, expected)
+        data = list(self.iter_decode(StringIO(self.source), offsets=True))
+        self.assertEqual(data, expected)
+
+    def test_empty_source(self):
+        self.assertEqual(list(self.iter_decode(bytes())), [])
+        self.assertEqual(list(self.iter_decode(StringIO(bytes()))), [])
+
+    def test_fail_on_truncated_record(self):
+        for source in (self.source[:-1], self.source[:5]):
+            self.assertRaises(ValueError, list, self.iter_decode(source))
+            self.assertRaises(ValueError, list,
+                              self.iter_decode(StringIO(source)))
+
+    def test_decoder_stops_iteration_on_clean_end(self):
+        decoder = simpleubjson.Draft9BufferDecoder(b('i\x01i\x02'))
+        self.assertEqual(list(decoder), [1, 2])
+        decoder = simpleubjson.Draft9Decoder(b('i\x01i'))
+        self.assertRaises(ValueError, list, decoder)
+
+
+class DecodeFileTestCase(Draft9TestCase):
+
+    source = b('[i\x01]NSi\x03foo{Si\x03barZ}')
+
+    def setUp(self):
+        super(DecodeFileTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = self.write(self.source)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, data, name='data.ubj'):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'wb') as fobj:
+            fobj.write(data)
+        return path
+
+    def test_decode_file(self):
+        for mmap in (True, False):
+            self.assertEqual(simpleubjson.decode_file(self.path, mmap=mmap),
+                             [1])
+
+    def test_materialize_stream_containers(self):
+        value = simpleubjson.decode_file(self.path, container='stream')
+        self.assertEqual(value, [1])
+
+    def test_decode_lazy_containers(self):
+        path = self.write(self.encode({'foo': ['bar']}))
+        value = simpleubjson.decode_file(path, container='lazy')
+        self.assertEqual(value['foo'][0], 'bar')
+
+    def test_iter_decode_file(self):
+        for mmap in (True, False):
+            values = simpleubjson.iter_decode_file(self.path, offsets=True,
+                                                   mmap=mmap)
+            self.assertEqual(list(values),
+                             [(0, [1]), (4, 'foo'), (11, {'bar': None})])
+
+    def test_close_iteration(self):
+        values = simpleubjson.iter_decode_file(self.path)
+        self.assertEqual(next(values), [1])
+        values.close()
+
+    def test_empty_file(self):
+        path = self.write(bytes(), 'empty.ubj')
+        self.assertEqual(list(simpleubjson.iter_decode_file(path)), [])
+        self.assertRaises(ValueError, simpleubjson.decode_file, path)
+
+    def test_fail_on_truncated_file(self):
+        path = self.write(self.source[:-1], 'truncated.ubj')
+        values = simpleubjson.iter_decode_file(path)
+        self.assertRaises(ValueError, list, values)
+
+
+class EventsTestCase(Draft9TestCase):
+
+    def iter_events(self, data, **kwargs):
+        return list(simpleubjson.iter_events(data, spec='draft-9', **kwargs))
+
+    def test_events(self):
+        source = b('{Si\x01a[i\x01{}]CbZ}Si\x03foo')
+        expected = [
+            ('start_object', None, 0),
+            ('key', 'a', 1),
+            ('start_array', None, 5),
+            ('value', 1, 6),
+            ('start_object', None, 8),
+            ('end_object', None, 9),
+            ('end_array', None, 10),
+            ('key', 'b', 11),
+            ('value', None, 13),
+            ('end_object', None, 14),
+            ('value', 'foo', 15),
+        ]
+        self.assertEqual(self.iter_events(source), expected)
+        self.assertEqual(self.iter_events(StringIO(source)), expected)
+
+    def test_noop_events(self):
+        source = b('N[N]{NCaNZ}')
+        N = simpleubjson.NOOP
+        self.assertEqual(self.iter_events(source, allow_noop=True), [
+            ('value', N, 0),
+            ('start_array', None, 1),
+            ('value', N, 2),
+            ('end_array', None, 3),
+            ('start_object', None, 4),
+            ('key', 'a', 6),
+            ('value', None, 9),
+            ('end_object', None, 10),
+        ])
+        self.assertEqual(len(self.iter_events(source)), 6)
+
+    def test_no_events_for_empty_data(self):
+        self.assertEqual(self.iter_events(bytes()), [])
+
+    def test_fail_on_truncated_container(self):
+        self.assertRaises(ValueError, self.iter_events, b('[i\x01'))
+        self.assertRaises(ValueError, self.iter_events, b('{Si\x01a}'))
+
+    def test_fail_on_mismatched_container_end(self):
+        self.assertRaises(ValueError, self.iter_events, b('[}'))
+        self.assertRaises(ValueError, self.iter_events, b(']'))
+
+    def test_fail_on_non_string_key(self):
+        self.assertRaises(ValueError, self.iter_events, b('{i\x01i\x02}'))
+
+
+class Output(list):
+
+    write = list.append
+
+    def flush(self):
+        pass
+
+
+class SkipValueTestCase(Draft9TestCase):
+
+    source = b('{Si\x01a[i\x01Hi\x013{}]CbSI\x00\x03foo}NNi\x2a')
+
+    def decoders(self, data, **kwargs):
+        yield simpleubjson.Draft9Decoder(data, **kwargs)
+        yield simpleubjson.Draft9Decoder(ChunkedReader(StringIO(data)),
+                                         **kwargs)
+        yield simpleubjson.Draft9BufferDecoder(data, **kwargs)
+
+    def test_skip_value(self):
+        for decoder in self.decoders(self.source):
+            decoder.skip_value()
+            self.assertEqual(decoder.decode_next(), 42)
+            self.assertRaises(ValueError, decoder.skip_value)
+
+    def test_skip_rest_of_container(self):
+        for decoder in self.decoders(self.source):
+            tag, length, value = decoder.next_tlv()
+            self.assertEqual(decoder.decode_next(), 'a')
+            tag, length, value = decoder.next_tlv()
+            decoder.skip_value(tag, length)
+            self.assertEqual(decoder.decode_next(), 'b')
+
+    def test_skip_noop(self):
+        for decoder in self.decoders(b('Ni\x01'), allow_noop=True):
+            decoder.skip_value()
+            self.assertEqual(decoder.decode_next(), 1)
+
+    def test_fail_on_truncated_value(self):
+        for source in (b('[i\x01'), b('Si\x05foo'), b('{Si')):
+            for decoder in self.decoders(source):
+                self.assertRaises(ValueError, decoder.skip_value)
+
+    def test_fail_on_invalid_marker(self):
+        for source in (b(']'), b('[i\x01\x00]')):
+            for decoder in self.decoders(source):
+                self.assertRaises(ValueError, decoder.skip_value)
+
+    def test_pprint_skips_hidden_levels(self):
+        output = Output()
+        simpleubjson.pprint(b('[[i\x01]i\x02]'), output, max_level=0)
+        self.assertEqual(''.join(output), '[[]\n[]]\n')
+
+
+class ExtractTestCase(Draft9TestCase):
+
+    data = {'user': {'id': 42, 'name': 'foo'},
+            'entities': {'urls': [{'url': 'a'}, {'url': 'b', 'idx': [1]}]}}
+
+    def setUp(self):
+        super(ExtractTestCase, self).setUp()
+        self.source = self.encode(self.data)
+
+    def extract(self, paths, **kwargs):
+        for data in (self.source, StringIO(self.source)):
+            yield simpleubjson.extract(data, paths, **kwargs)
+
+    def test_extract_values(self):
+        for result in self.extract(['/user/id', '/entities/urls/1/url']):
+            self.assertEqual(result, {'/user/id': 42,
+                                      '/entities/urls/1/url': 'b'})
+
+    def test_extract_containers(self):
+        for result in self.extract(['/user', '']):
+            self.assertEqual(result, {'/user': self.data['user'],
+                                      '': self.data})
+
+    def test_extract_by_wildcard(self):
+        for result in self.extract(['/entities/urls/*/url', '/user/*']):
+            self.assertEqual(result['/entities/urls/*/url'], ['a', 'b'])
+            self.assertEqual(sorted(result['/user/*'], key=str), [42, 'foo'])
+
+    def test_omit_missed_paths(self):
+        paths = ['/foo', '/user/id/foo', '/entities/urls/2', '/user/*/foo']
+        for result in self.extract(paths):
+            self.assertEqual(result, {})
+
+    def test_stop_after_last_match(self):
+        source = b('{Si\x01ai\x01Si\x01b[i\x02')
+        stream = StringIO(source)
+        self.assertEqual(simpleubjson.extract(stream, ['/a']), {'/a': 1})
+        self.assertEqual(stream.tell(), 7)
+        self.assertRaises(ValueError, simpleubjson.extract, source, ['/b/*'])
+
+    def test_unescape_path(self):
+        source = self.encode({'a/b': {'~': 1}})
+        self.assertEqual(simpleubjson.extract(source, ['/a~1b/~0']),
+                         {'/a~1b/~0': 1})
+
+    def test_fail_on_relative_path(self):
+        self.assertRaises(ValueError, simpleubjson.extract, self.source,
+                          ['user'])
+
+    def test_iter_container(self):
+        decoder = simpleubjson.Draft9BufferDecoder(b('[Si\x01a{}]'))
+        tag, length, value = decoder.next_tlv()
+        items = []
+        for key, tag, length, value in decoder.iter_container(tag, length):
+            if tag in decoder.openers:
+                decoder.skip_value(tag, length)
+            items.append((key, tag))
+        self.assertEqual(items, [(None, b('S')), (None, b('{'))])
+
+
+class IterItemsTestCase(Draft9TestCase):
+
+    data = {'meta': {'count': 2}, 'rows': [{'id': 1, 'tags': ['a']},
+                                           {'id': 2, 'tags': ['b', 'c']}]}
+
+    def setUp(self):
+        super(IterItemsTestCase, self).setUp()
+        self.source = self.encode(self.data)
+
+    def iter_items(self, prefix):
+        for data in (self.source, StringIO(self.source)):
+            yield list(simpleubjson.iter_items(data, prefix))
+
+    def test_iter_array_items(self):
+        for items in self.iter_items('rows.item'):
+            self.assertEqual(items, self.data['rows'])
+
+    def test_iter_nested_items(self):
+        for items in self.iter_items('rows.item.tags.item'):
+            self.assertEqual(items, ['a', 'b', 'c'])
+
+    def test_iter_object_value(self):
+        for items in self.iter_items('meta'):
+            self.assertEqual(items, [{'count': 2}])
+
+    def test_iter_whole_value(self):
+        for items in self.iter_items(''):
+            self.assertEqual(items, [self.data])
+
+    def test_iter_nothing_for_missed_prefix(self):
+        for prefix in ('foo', 'rows.foo', 'meta.item', 'rows.item.id.item'):
+            for items in self.iter_items(prefix):
+                self.assertEqual(items, [])
+
+    def test_yield_items_before_end_of_data(self):
+        source = b('[[i\x01][i\x02')
+        items = simpleubjson.iter_items(StringIO(source), 'item')
+        self.assertEqual(next(items), [1])
+        self.assertRaises(ValueError, next, items)
+
+
 class ObjectTestCase(Draft9TestCase):
 
     def test_decode_object(self):
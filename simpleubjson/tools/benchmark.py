@@ -12,7 +12,12 @@ import getopt
 import pickle
 import sys
 import time
+from multiprocessing import cpu_count
 import simpleubjson
+try:
+    from simpleubjson import parallel
+except ImportError:
+    parallel = None
 try:
     import json
 except ImportError:
@@ -70,11 +75,16 @@ def make_benchmark(name, count):
     print
 
     src = simpleubjson.encode(data, spec='draft-9')
-    func = lambda *a, **k: list(simpleubjson.decode(*a, **k))
-    total = run_test(func, count, src, spec='draft-9')
+    total = run_test(simpleubjson.decode, count, src, spec='draft-9',
+                     container='eager')
     print(format_results('simpleubjson',  simpleubjson.__version__,
                          'Decoded Draft-9', total, count))
 
+    total = run_test(simpleubjson.decode, count, src, spec='draft-9',
+                     container='eager', string_cache=True)
+    print(format_results('simpleubjson',  simpleubjson.__version__,
+                         'Decoded Draft-9 with string cache', total, count))
+
     total = run_test(simpleubjson.encode, count, data, spec='draft-9')
     print(format_results('simpleubjson',  simpleubjson.__version__,
                          'Encoded Draft-9', total, count))
@@ -152,6 +162,57 @@ def make_benchmark(name, count):
                          'Encoded', total, count))
 
 
+RPC_MESSAGE = {'id': 42, 'method': 'ping', 'params': [1, 2.5, None]}
+
+
+def make_overhead_benchmark(count):
+    data = RPC_MESSAGE
+    src = simpleubjson.encode(data)
+
+    total = run_test(simpleubjson.decode, count, src, container='eager')
+    print(format_results('simpleubjson',  simpleubjson.__version__,
+                         'Decoded Draft-9 with decode()', total, count))
+
+    total = run_test(simpleubjson.encode, count, data)
+    print(format_results('simpleubjson',  simpleubjson.__version__,
+                         'Encoded Draft-9 with encode()', total, count))
+
+    print
+
+    codec = simpleubjson.Codec(container='eager')
+    total = run_test(codec.loads, count, src)
+    print(format_results('simpleubjson',  simpleubjson.__version__,
+                         'Decoded Draft-9 with Codec.loads()', total, count))
+
+    total = run_test(codec.dumps, count, data)
+    print(format_results('simpleubjson',  simpleubjson.__version__,
+                         'Encoded Draft-9 with Codec.dumps()', total, count))
+
+
+def make_parallel_benchmark(count):
+    data = load_case('TwitterTimeline.compact.json')
+    payloads = [simpleubjson.encode(data)] * count
+
+    codec = simpleubjson.Codec(container='eager')
+    total = run_test(lambda: [codec.loads(src) for src in payloads], 1)
+    print(format_results('simpleubjson',  simpleubjson.__version__,
+                         'Decoded Draft-9 in single process', total, count))
+
+    for workers in sorted(set([1, 2, 4, cpu_count()])):
+        total = run_test(lambda: list(parallel.decode_many(payloads, workers)),
+                         1)
+        print(format_results('simpleubjson',  simpleubjson.__version__,
+                             'Decoded Draft-9 by %d workers' % workers,
+                             total, count))
+
+
+def test_0(count):
+    print('* [test_0] RPC message per-call overhead %d times' % count)
+    make_overhead_benchmark(count)
+    print
+    print
+
+
 def test_1(count):
     print('* [test_1] CouchDB4k.compact.json %d times' % count)
     make_benchmark('CouchDB4k.compact.json', count)
@@ -173,12 +234,23 @@ def test_3(count):
     print
 
 
+def test_4(count):
+    print('* [test_4] TwitterTimeline.compact.json decoding by worker'
+          ' processes %d times' % count)
+    make_parallel_benchmark(count)
+    print
+    print
+
+
 def run(count):
     print('sys.version : %r' % (sys.version,))
     print('sys.platform : %r' % (sys.platform,))
+    test_0(count)
     test_1(count)
     test_2(count)
     test_3(count)
+    if parallel:
+        test_4(count)
 
 
 def main():
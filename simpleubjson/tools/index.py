@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011-2014 Alexander Shorin
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE, which
+# you should have received as part of this distribution.
+#
+"""Offset index of files with UBJSON records written one after another.
+
+Index is built by single pass that only skips records without decoding them
+and is stored in sidecar file next to the data, so reader could jump to
+any record or resume reading from the checkpoint without rescanning
+the data::
+
+    >>> index = build_index(open('records.ubj', 'rb'), step=100)
+    >>> index.save(index_path('records.ubj'))
+    ...
+    >>> index = RecordIndex.load(index_path('records.ubj'))
+    >>> source = open('records.ubj', 'rb')
+    >>> index.seek_record(source, 12345)
+    >>> record = decode(source)
+"""
+
+import getopt
+import os
+import sys
+from array import array
+from struct import Struct
+from ..codec import get_spec
+from ..compat import b
+from ..exceptions import DecodeError, NoDataError
+from ..reader import ChunkedReader
+
+__all__ = ['RecordIndex', 'build_index', 'index_path']
+
+try:
+    OFFSET_TYPECODE = 'Q'
+    array(OFFSET_TYPECODE)
+except ValueError:  # < Python 3.3
+    OFFSET_TYPECODE = 'L'
+
+INDEX_MAGIC = b('UBJX')
+#: Magic, spec name, NoOp flag, offset size, step, records count and offset
+#: where indexing stopped. Offsets follow as little-endian integers.
+INDEX_HEADER = Struct('<4s8sBBxxIQQ')
+
+
+def index_path(path):
+    """Returns path of sidecar index file for data file `path`."""
+    return path + '.idx'
+
+
+class RecordIndex(object):
+    """Index of records offsets. Offset of every `step`-th record is kept in
+    :class:`array.array`, so memory footprint is about 8 bytes per indexed
+    record. The rest records are reached by skipping them from the nearest
+    indexed one.
+
+    :param step: Index every `step`-th record.
+    :type step: int
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+    :param allow_noop: Count top-level `NoOp` markers as records.
+    :type allow_noop: bool
+    """
+
+    def __init__(self, step=1, spec='draft9', allow_noop=False):
+        if step < 1:
+            raise ValueError('step should be positive, got %r' % step)
+        get_spec(spec)
+        self.step = step
+        self.spec = spec.lower().replace('-', '')
+        self.allow_noop = allow_noop
+        self.offsets = array(OFFSET_TYPECODE)
+        #: Amount of indexed records.
+        self.count = 0
+        #: Offset right after the last indexed record.
+        self.end = 0
+
+    def __len__(self):
+        return self.count
+
+    def _decoder(self, source, offset):
+        # Returns decoder that starts at offset and function that returns
+        # its current offset
+        stream_decoder, buffer_decoder, _ = get_spec(self.spec)
+        if hasattr(source, 'read'):
+            source.seek(offset)
+            reader = ChunkedReader(source)
+            decoder = stream_decoder(reader, self.allow_noop)
+            return decoder, lambda: offset + reader.tell()
+        decoder = buffer_decoder(source, self.allow_noop)
+        decoder.offset = offset
+        return decoder, decoder.tell
+
+    def update(self, source):
+        """Indexes records of `source` starting from :attr:`end` offset, so
+        index of growing file could be updated without its rescanning.
+
+        If the last record is truncated,
+        :exc:`~simpleubjson.exceptions.EarlyEndOfStreamError` is raised,
+        while index stays valid for all the preceding records.
+
+        :param source: Seekable `.read([size])`-able object or any object that
+                       supports buffer protocol.
+        :return: Amount of newly indexed records.
+        """
+        decoder, tell = self._decoder(source, self.end)
+        offsets = self.offsets
+        step = self.step
+        count = start = self.count
+        try:
+            while 1:
+                offset = tell()
+                try:
+                    decoder.skip_value()
+                except NoDataError:
+                    break
+                if not count % step:
+                    offsets.append(offset)
+                count += 1
+                self.end = tell()
+        finally:
+            self.count = count
+        return count - start
+
+    def locate(self, n):
+        """Returns offset of the nearest indexed record before record `n` and
+        amount of records to skip from it."""
+        if not 0 <= n < self.count:
+            raise IndexError('record %r is out of index' % n)
+        return self.offsets[n // self.step], n % self.step
+
+    def seek_record(self, source, n):
+        """Moves seekable `source` to the beginning of record `n` and returns
+        its offset. For buffer sources offset is only returned."""
+        offset, skip = self.locate(n)
+        if skip:
+            decoder, tell = self._decoder(source, offset)
+            for _ in range(skip):
+                decoder.skip_value()
+            offset = tell()
+        if hasattr(source, 'seek'):
+            source.seek(offset)
+        return offset
+
+    def save(self, path):
+        """Writes index to the file."""
+        offsets = self.offsets
+        if sys.byteorder != 'little':
+            offsets = array(OFFSET_TYPECODE, offsets)
+            offsets.byteswap()
+        with open(path, 'wb') as fobj:
+            fobj.write(INDEX_HEADER.pack(INDEX_MAGIC, b(self.spec),
+                                         self.allow_noop, offsets.itemsize,
+                                         self.step, self.count, self.end))
+            offsets.tofile(fobj)
+
+    @classmethod
+    def load(cls, path):
+        """Reads index from the file."""
+        with open(path, 'rb') as fobj:
+            header = fobj.read(INDEX_HEADER.size)
+            if len(header) != INDEX_HEADER.size:
+                raise ValueError('%s is not an index file' % path)
+            magic, spec, allow_noop, itemsize, step, count, end = \
+                INDEX_HEADER.unpack(header)
+            if magic != INDEX_MAGIC:
+                raise ValueError('%s is not an index file' % path)
+            index = cls(step, spec.rstrip(b('\0')).decode('ascii'),
+                        bool(allow_noop))
+            if itemsize != index.offsets.itemsize:
+                raise ValueError('%d bytes offsets are not supported'
+                                 '' % itemsize)
+            try:
+                index.offsets.fromfile(fobj, (count + step - 1) // step)
+            except EOFError:
+                raise ValueError('index file %s is truncated' % path)
+            if sys.byteorder != 'little':
+                index.offsets.byteswap()
+        index.count = count
+        index.end = end
+        return index
+
+
+def build_index(source, step=1, allow_noop=False, spec='draft9'):
+    """Scans all records of `source` and returns their
+    :class:`RecordIndex`.
+
+    :param source: Seekable `.read([size])`-able object or any object that
+                   supports buffer protocol.
+    :param step: Index every `step`-th record.
+    :type step: int
+    :param allow_noop: Count top-level `NoOp` markers as records.
+    :type allow_noop: bool
+    :param spec: UBJSON specification. Supported Draft-8, Draft-9 and
+                 Draft-12 specifications by ``draft-8``,
+                 ``draft-9`` or ``draft-12`` keys.
+    :type spec: str
+    """
+    index = RecordIndex(step, spec, allow_noop)
+    index.update(source)
+    return index
+
+
+def main(argv=None):
+    """index.py - builds or updates sidecar offset index of UBJSON records
+    file.
+
+    Usage:
+        index.py [options] FILE [INDEX]
+
+        -h, --help      Prints this help
+        -s, --step=     Index every N-th record. Existing index built with
+                        other step is rebuilt only with --force.
+                        Default: 1.
+        --spec=         UBJSON specification. Existing index built for
+                        other spec is rebuilt only with --force.
+                        Default: draft9.
+        -f, --force     Rebuild existing index instead of updating it.
+
+    If the last record is truncated, all the preceding records are still
+    indexed and saved, but exit status is 1.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    try:
+        opts, args = getopt.getopt(argv, 'hs:f',
+                                   ['help', 'step=', 'spec=', 'force'])
+    except getopt.GetoptError:
+        print(main.__doc__)
+        sys.exit(2)
+    step = None
+    spec = None
+    force = False
+    for key, value in opts:
+        if key in ('-h', '--help'):
+            print(main.__doc__)
+            sys.exit()
+        elif key in ('-s', '--step'):
+            step = int(value)
+        elif key == '--spec':
+            spec = value
+        elif key in ('-f', '--force'):
+            force = True
+        else:
+            assert False, 'unhandled option %s' % key
+    if len(args) not in (1, 2):
+        print(main.__doc__)
+        sys.exit(2)
+    path = args[0]
+    idx_path = args[1] if len(args) == 2 else index_path(path)
+    if os.path.exists(idx_path) and not force:
+        index = RecordIndex.load(idx_path)
+        if step is not None and step != index.step:
+            sys.exit('%s is built with step %d, use --force to rebuild it'
+                     ' with step %d' % (idx_path, index.step, step))
+        if spec is not None and RecordIndex(spec=spec).spec != index.spec:
+            sys.exit('%s is built for %s, use --force to rebuild it for %s'
+                     '' % (idx_path, index.spec, spec))
+    else:
+        index = RecordIndex(step or 1, spec or 'draft9')
+    start = len(index)
+    error = None
+    with open(path, 'rb') as source:
+        try:
+            index.update(source)
+        except DecodeError as err:
+            # Keep the records indexed before the truncated one
+            error = err
+    index.save(idx_path)
+    print('%d records indexed, %d total' % (len(index) - start, len(index)))
+    if error is not None:
+        sys.exit('record at offset %d is truncated or invalid: %s'
+                 '' % (index.end, error))
+
+if __name__ == '__main__':
+    main()
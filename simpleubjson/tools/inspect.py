@@ -60,9 +60,16 @@ def pprint(data, output=sys.stdout, allow_noop=True,
             # sized containers
             elif length is not None and value is None:
                 maybe_write('[%s] [%s]\n' % (utag, length), level)
-                if utag in 'oO':
-                    length = length == 255 and length or length * 2
-                inspect_draft8(decoder, level + 1, length)
+                if max_level is not None and level >= max_level:
+                    # Nested items wouldn't be shown, so there is no reason
+                    # to decode them
+                    decoder.skip_value(tag, length)
+                    if length == 255 and utag in 'ao':
+                        maybe_write('[E]\n', level)
+                else:
+                    if utag in 'oO':
+                        length = length == 255 and length or length * 2
+                    inspect_draft8(decoder, level + 1, length)
 
             # plane values
             elif length is None and value is not None:
@@ -92,7 +99,13 @@ def pprint(data, output=sys.stdout, allow_noop=True,
                     level -= 1
                 maybe_write('[%s]\n' % (utag,), level)
                 if utag in '{[':
-                    level += 1
+                    if max_level is not None and level >= max_level:
+                        # Nested items wouldn't be shown, so there is no
+                        # reason to decode them
+                        decoder.skip_value(tag)
+                        maybe_write('[%s]\n' % (']}'[utag == '{'],), level)
+                    else:
+                        level += 1
 
             # plane values
             elif length is None and value is not None: